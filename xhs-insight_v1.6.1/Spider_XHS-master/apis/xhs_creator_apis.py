@@ -1,17 +1,49 @@
+import os
 import requests
-from xhs_utils.cookie_util import trans_cookies
+from requests.adapters import HTTPAdapter
+from loguru import logger
 from xhs_utils.xhs_creator_util import get_common_headers, generate_xs, splice_str
-from xhs_utils.xhs_util import generate_x_b3_traceid
+from xhs_utils.xhs_util import get_signing_context
+from xhs_utils.rate_limit_util import default_rate_limiter, cookie_key, send_throttled
 
 
 class XHS_Creator_Apis():
-    def __init__(self):
-        self.base_url = "https://edith.xiaohongshu.com"
+    def __init__(self, rate_limiter=None, max_retries: int = 2, base_url: str = None, pool_size: int = 10):
+        """
+            :param rate_limiter: 限速器, 默认使用进程内共享的限速器, 传 False 关闭限速
+            :param max_retries: 被限流后退避重试的次数
+            :param base_url: 接口地址, 默认读取环境变量 XHS_BASE_URL, 否则为 edith.xiaohongshu.com
+            :param pool_size: 连接池大小, 并发翻页时复用连接
+        """
+        self.base_url = base_url or os.environ.get('XHS_BASE_URL') or "https://edith.xiaohongshu.com"
+        self.rate_limiter = default_rate_limiter if rate_limiter is None else rate_limiter
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
 
+    def _request(self, api: str, cookies_str: str, proxies: dict = None):
+        """
+            签名并发送 GET 请求, 和 XHS_Apis 共用 send_throttled 的限速、退避重试和耗时指标
+            :param api: 带参数的接口路径
+            返回响应的json
+        """
+        context = get_signing_context(cookies_str)
+        cookies = context.cookies
+        ck = cookie_key(cookies)
 
-    # page: 页数
-    # time: 最近几天的时间
-    def get_publish_note_info(self, page, cookies_str):
+        def send(proxies):
+            headers = get_common_headers()
+            xs, xt, _ = generate_xs(context.a1, api, '')
+            headers['x-s'], headers['x-t'] = xs, str(xt)
+            return self.session.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies, verify=False)
+
+        return send_throttled(self.rate_limiter, self.max_retries, api.split('?')[0], 'GET', lambda: (ck, proxies), send)[0]
+
+    # page: 页数, None 为第一页
+    # 返回的 data.page 是下一页的页数, -1 表示没有更多
+    def get_publish_note_info(self, page, cookies_str, proxies: dict = None):
         success = False
         msg = '成功'
         res_json = None
@@ -21,32 +53,28 @@ class XHS_Creator_Apis():
             params = {
                 "tab": '0',
             }
-            if page >= 0:
+            if page is not None and page >= 0:
                 params["page"] = str(page)
-            splice_api = splice_str(api, params)
-            headers = get_common_headers()
-            cookies = trans_cookies(cookies_str)
-            xs, xt, _ = generate_xs(cookies['a1'], splice_api, '')
-            headers['x-s'], headers['x-t'] = xs, str(xt)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, verify=False)
-            res_json = response.json()
+            res_json = self._request(splice_str(api, params), cookies_str, proxies)
             success = res_json["success"]
+            if not success:
+                msg = res_json.get('msg', '失败')
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, res_json
 
 
-    # 获取全部的发布信息
-    def get_all_publish_note_info(self, cookies_str):
+    # 获取全部的发布信息 (逐页顺序请求, 大量导出请用 pipelines.creator_export.Creator_Exporter 并发翻页)
+    def get_all_publish_note_info(self, cookies_str, proxies: dict = None):
         page = None
         notes = []
         while True:
-            success, msg, res_json = self.get_publish_note_info(page, cookies_str)
-            print(success, msg, res_json)
+            success, msg, res_json = self.get_publish_note_info(page, cookies_str, proxies)
             if not success:
                 return False, msg, notes
             notes += res_json['data']['notes']
             page = res_json['data']['page']
+            logger.debug(f'创作者笔记: 已获取 {len(notes)} 篇, 下一页 {page}')
             if page == -1:
                 break
         return True, '成功', notes
@@ -1,9 +1,18 @@
 # encoding: utf-8
 import json
+import os
 import re
 import urllib
 import requests
-from xhs_utils.xhs_util import splice_str, generate_request_params, generate_x_b3_traceid, get_common_headers
+from requests.adapters import HTTPAdapter
+from xhs_utils.xhs_util import splice_str, generate_request_params, generate_x_b3_traceid, get_common_headers, get_signing_context
+from xhs_utils.rate_limit_util import default_rate_limiter, cookie_key, send_throttled
+from xhs_utils.proxy_util import Proxy_Pool
+from xhs_utils.url_util import default_resolver
+from xhs_utils.flight_util import default_single_flight
+from xhs_utils.record_util import Comment
+from xhs_utils import codec_util
+import time
 from loguru import logger
 
 """
@@ -11,8 +20,72 @@ from loguru import logger
     :param cookies_str: 你的cookies
 """
 class XHS_Apis():
-    def __init__(self):
-        self.base_url = "https://edith.xiaohongshu.com"
+    def __init__(self, rate_limiter=None, max_retries: int = 2, base_url: str = None, pool_size: int = 10, single_flight=None):
+        """
+            :param rate_limiter: 限速器 (xhs_utils.rate_limit_util.Rate_Limiter), 默认使用进程内共享的限速器, 传 False 关闭限速
+            :param max_retries: 被限流 (429 / 461 / 访问频繁) 后退避重试的次数
+            :param base_url: 接口地址, 默认读取环境变量 XHS_BASE_URL (本地模拟服务器), 否则为 edith.xiaohongshu.com
+            :param pool_size: 连接池大小, 多线程共用一个实例时复用连接
+            :param single_flight: 相同请求合并 (xhs_utils.flight_util.Single_Flight), 默认使用进程内共享的实例, 传 False 关闭
+        """
+        self.base_url = base_url or os.environ.get('XHS_BASE_URL') or "https://edith.xiaohongshu.com"
+        self.rate_limiter = default_rate_limiter if rate_limiter is None else rate_limiter
+        self.single_flight = default_single_flight if single_flight is None else single_flight
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _request(self, method: str, api: str, cookies_str: str, data='', proxies: dict = None):
+        """
+            签名并发送请求, 所有接口统一经过这里限速和记录耗时指标
+            被限流时限速器会降低速率并退避, 然后重新签名重试
+            同一时刻完全相同的只读请求 (接口 + 规范化参数) 只发出一次, 其余调用共用它的响应
+            :param method: GET / POST
+            :param api: 带参数的接口路径
+            :param data: POST 的数据
+            :param proxies: requests 的 proxies 字典, 或 Proxy_Pool (按 cookie 绑定出口)
+            返回响应的json
+        """
+        key = self.single_flight.key(method, api, data, cookies_str) if self.single_flight else None
+        if key is None:
+            return self._send(method, api, cookies_str, data, proxies)[0]
+        (res_json, content), shared = self.single_flight.do(
+            key, lambda: self._send(method, api, cookies_str, data, proxies), ok=lambda value: value[0].get('success')
+        )
+        # 共用的响应从原始字节各自解码一份, 调用方原地修改不会互相影响
+        return codec_util.loads(content) if shared else res_json
+
+    def _send(self, method: str, api: str, cookies_str: str, data='', proxies: dict = None):
+        """
+            _request 的实际发送部分, 返回 (响应的json, 响应的原始字节)
+        """
+        proxy_pool = proxies if isinstance(proxies, Proxy_Pool) else None
+        ck = cookie_key(get_signing_context(cookies_str).cookies)
+
+        def route():
+            return ck, proxy_pool.pick(ck) if proxy_pool is not None else proxies
+
+        def send(picked):
+            headers, cookies, trans_data = generate_request_params(cookies_str, api, data, method)
+            started = time.perf_counter()
+            try:
+                if method == 'GET':
+                    response = self.session.get(self.base_url + api, headers=headers, cookies=cookies, proxies=picked)
+                else:
+                    response = self.session.post(self.base_url + api, headers=headers, data=trans_data, cookies=cookies, proxies=picked)
+            except requests.RequestException:
+                if proxy_pool is not None:
+                    proxy_pool.report(picked, ok=False)
+                raise
+            if proxy_pool is not None:
+                proxy_pool.report(picked, time.perf_counter() - started, response.status_code < 500)
+            return response
+
+        # 指标标签不带查询参数, 避免每个 note_id / cursor 一条时间序列
+        res_json, response = send_throttled(self.rate_limiter, self.max_retries, api.split('?')[0], method, route, send)
+        return res_json, response.content
 
     def get_homefeed_all_channel(self, cookies_str: str, proxies: dict = None):
         """
@@ -22,9 +95,7 @@ class XHS_Apis():
         res_json = None
         try:
             api = "/api/sns/web/v1/homefeed/category"
-            headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -62,9 +133,7 @@ class XHS_Apis():
                 ],
                 "need_filter_image": False
             }
-            headers, cookies, trans_data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=trans_data, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('POST', api, cookies_str, data, proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -86,7 +155,7 @@ class XHS_Apis():
                 success, msg, res_json = self.get_homefeed_recommend(category, cursor_score, refresh_type, note_index, cookies_str, proxies)
                 if not success:
                     raise Exception(msg)
-                if "items" not in res_json["data"]:
+                if not res_json["data"].get("items"):
                     break
                 notes = res_json["data"]["items"]
                 note_list.extend(notes)
@@ -116,9 +185,7 @@ class XHS_Apis():
                 "target_user_id": user_id
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -134,9 +201,7 @@ class XHS_Apis():
         res_json = None
         try:
             api = f"/api/sns/web/v1/user/selfinfo"
-            headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -153,9 +218,7 @@ class XHS_Apis():
         res_json = None
         try:
             api = f"/api/sns/web/v2/user/me"
-            headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -182,9 +245,7 @@ class XHS_Apis():
                 "xsec_source": xsec_source,
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -192,11 +253,13 @@ class XHS_Apis():
         return success, msg, res_json
 
 
-    def get_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict = None):
+    def get_user_all_notes(self, user_url: str, cookies_str: str, proxies: dict = None, stop_note_ids=None, xsec_tokens: dict = None):
         """
            获取用户所有笔记
            :param user_id: 你想要获取的用户的id
            :param cookies_str: 你的cookies
+           :param stop_note_ids: 可选, 已知笔记id的集合, 遇到第一篇已知的 (非置顶) 笔记就停止翻页
+           :param xsec_tokens: 可选, 传入字典时填入翻过的每一页上所有笔记的 {note_id: xsec_token}, 包括停止那一页上的已知笔记
            返回用户的所有笔记
         """
         cursor = ''
@@ -213,6 +276,15 @@ class XHS_Apis():
                 if not success:
                     raise Exception(msg)
                 notes = res_json["data"]["notes"]
+                if xsec_tokens is not None:
+                    xsec_tokens.update((note['note_id'], note['xsec_token']) for note in notes if note.get('xsec_token'))
+                if stop_note_ids:
+                    # 笔记按发布时间倒序, 置顶笔记除外
+                    known_index = next((i for i, note in enumerate(notes) if note['note_id'] in stop_note_ids
+                                        and not note.get('interact_info', {}).get('sticky')), None)
+                    if known_index is not None:
+                        note_list.extend(notes[:known_index])
+                        break
                 if 'cursor' in res_json["data"]:
                     cursor = str(res_json["data"]["cursor"])
                 else:
@@ -245,9 +317,7 @@ class XHS_Apis():
                 "xsec_source": xsec_source,
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -308,9 +378,7 @@ class XHS_Apis():
                 "xsec_source": xsec_source,
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -354,20 +422,20 @@ class XHS_Apis():
     def get_note_info(self, url: str, cookies_str: str, proxies: dict = None):
         """
             获取笔记的详细
-            :param url: 你想要获取的笔记的url
+            :param url: 你想要获取的笔记的url, 也可以是 xhslink.com 短链
             :param cookies_str: 你的cookies
             :param xsec_source: 你的xsec_source 默认为pc_search pc_user pc_feed
             返回笔记的详细
         """
         res_json = None
         try:
-            urlParse = urllib.parse.urlparse(url)
-            note_id = urlParse.path.split("/")[-1]
-            kvs = urlParse.query.split('&')
-            kvDist = {kv.split('=')[0]: kv.split('=')[1] for kv in kvs}
+            # xhslink 短链先解析 (有缓存), 查询参数按 url 编码解码
+            note_url = default_resolver.resolve(url, proxies if isinstance(proxies, dict) else None)
+            if not note_url.xsec_token:
+                raise Exception('链接缺少 xsec_token')
             api = f"/api/sns/web/v1/feed"
             data = {
-                "source_note_id": note_id,
+                "source_note_id": note_url.note_id,
                 "image_formats": [
                     "jpg",
                     "webp",
@@ -376,12 +444,10 @@ class XHS_Apis():
                 "extra": {
                     "need_body_topic": "1"
                 },
-                "xsec_source": kvDist['xsec_source'] if 'xsec_source' in kvDist else "pc_search",
-                "xsec_token": kvDist['xsec_token']
+                "xsec_source": note_url.xsec_source or "pc_search",
+                "xsec_token": note_url.xsec_token
             }
-            headers, cookies, data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=data, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('POST', api, cookies_str, data, proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -403,9 +469,7 @@ class XHS_Apis():
                 "keyword": urllib.parse.quote(word)
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -460,7 +524,7 @@ class XHS_Apis():
         elif pos_distance == 2:
             filter_pos_distance = "附近"
         if geo:
-            geo = json.dumps(geo, separators=(',', ':'))
+            geo = codec_util.dumps_str(geo)
         try:
             api = "/api/sns/web/v1/search/notes"
             data = {
@@ -510,9 +574,7 @@ class XHS_Apis():
                     "avif"
                 ]
             }
-            headers, cookies, data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('POST', api, cookies_str, data, proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -540,7 +602,7 @@ class XHS_Apis():
                 success, msg, res_json = self.search_note(query, cookies_str, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies)
                 if not success:
                     raise Exception(msg)
-                if "items" not in res_json["data"]:
+                if not res_json["data"].get("items"):
                     break
                 notes = res_json["data"]["items"]
                 note_list.extend(notes)
@@ -575,9 +637,7 @@ class XHS_Apis():
                     "request_id": "22471139-1723999898524"
                 }
             }
-            headers, cookies, data = generate_request_params(cookies_str, api, data, 'POST')
-            response = requests.post(self.base_url + api, headers=headers, data=data.encode('utf-8'), cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('POST', api, cookies_str, data, proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -632,9 +692,7 @@ class XHS_Apis():
                 "xsec_token": xsec_token
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -689,9 +747,7 @@ class XHS_Apis():
                 "xsec_token": xsec_token
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -753,6 +809,75 @@ class XHS_Apis():
             msg = str(e)
         return success, msg, out_comment_list
 
+    def iter_note_comments(self, url: str, cookies_str: str, proxies: dict = None):
+        """
+            边爬边产出一篇笔记的全部评论 (record_util.Comment), 一级评论之后紧跟它的全部二级评论
+            一级评论产出时 sub_comments 为空, 二级评论的 parent_id 为回复的目标评论
+            同一时间只持有一页响应, 内存占用和评论总数无关; 请求失败时抛出异常
+            :param url: 笔记的url (带 xsec_token) 或 xhslink 短链
+            :param cookies_str: 你的cookies
+        """
+        note_url = default_resolver.resolve(url, proxies if isinstance(proxies, dict) else None)
+        note_id, xsec_token = note_url.note_id, note_url.xsec_token
+        cursor = ''
+        while True:
+            success, msg, res_json = self.get_note_out_comment(note_id, cursor, xsec_token, cookies_str, proxies)
+            if not success:
+                raise Exception(msg)
+            data = res_json["data"]
+            for raw in data["comments"]:
+                comment = Comment.from_raw(raw, url, note_id)
+                root_id = comment.comment_id
+                inline, comment.sub_comments = comment.sub_comments, ()
+                yield comment
+                for sub in inline:
+                    # 没有 target_comment 的回复视为直接回复一级评论
+                    sub.parent_id = sub.parent_id or root_id
+                    yield sub
+                if not raw.get('sub_comment_has_more'):
+                    continue
+                sub_cursor = raw['sub_comment_cursor']
+                while True:
+                    success, msg, sub_json = self.get_note_inner_comment(raw, sub_cursor, xsec_token, cookies_str, proxies)
+                    if not success:
+                        raise Exception(msg)
+                    for raw_sub in sub_json["data"]["comments"]:
+                        sub = Comment.from_raw(raw_sub, url, note_id)
+                        sub.parent_id = sub.parent_id or root_id
+                        yield sub
+                    if 'cursor' not in sub_json["data"] or not sub_json["data"]["has_more"]:
+                        break
+                    sub_cursor = str(sub_json["data"]["cursor"])
+            if 'cursor' not in data or not data["has_more"] or not data["comments"]:
+                break
+            cursor = str(data["cursor"])
+
+    def get_note_all_comment_records(self, url: str, cookies_str: str, proxies: dict = None):
+        """
+            获取一篇笔记的所有评论, 返回 record_util.Comment 列表 (一级评论的 sub_comments 为二级评论)
+            每页解析成紧凑记录后原始响应即可释放, 评论很多的笔记内存占用远小于 get_note_all_comment
+            只需要逐条写出时用 iter_note_comments, 不必持有整棵评论树
+            :param url: 笔记的url (带 xsec_token) 或 xhslink 短链
+            :param cookies_str: 你的cookies
+        """
+        success, msg, comments = True, 'success', []
+        try:
+            subs = None
+            for comment in self.iter_note_comments(url, cookies_str, proxies):
+                if comment.parent_id is None:
+                    subs = comment.sub_comments = []
+                    comments.append(comment)
+                else:
+                    subs.append(comment)
+            for comment in comments:
+                # 没有回复的一级评论仍以共享的 () 保存
+                if not comment.sub_comments:
+                    comment.sub_comments = ()
+        except Exception as e:
+            success = False
+            msg = str(e)
+        return success, msg, comments
+
     def get_unread_message(self, cookies_str: str, proxies: dict = None):
         """
             获取未读消息
@@ -762,9 +887,7 @@ class XHS_Apis():
         res_json = None
         try:
             api = "/api/sns/web/unread_count"
-            headers, cookies, data = generate_request_params(cookies_str, api, '', 'GET')
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -786,9 +909,7 @@ class XHS_Apis():
                 "cursor": cursor
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -836,9 +957,7 @@ class XHS_Apis():
                 "cursor": cursor
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -886,9 +1005,7 @@ class XHS_Apis():
                 "cursor": cursor
             }
             splice_api = splice_str(api, params)
-            headers, cookies, data = generate_request_params(cookies_str, splice_api, '', 'GET')
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            res_json = self._request('GET', splice_api, cookies_str, '', proxies)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success = False
@@ -3,12 +3,21 @@ import os
 from loguru import logger
 from apis.xhs_pc_apis import XHS_Apis
 from xhs_utils.common_util import init
-from xhs_utils.data_util import handle_note_info, download_note, save_to_xlsx
+from xhs_utils.data_util import handle_note_info, download_note, save_to_xlsx, XLSX_HEADERS
+from xhs_utils.export_util import XLSX_Writer
+from xhs_utils.record_util import Note
+from pipelines.user_sync import User_Sync
+from pipelines.comment_export import Comment_Exporter
+from xhs_utils.url_util import parse_note_url
 
 
 class Data_Spider():
-    def __init__(self):
+    def __init__(self, dedup=None):
+        """
+        :param dedup: 可选, xhs_utils.dedup_util.Dedup_Service, 跳过已经爬取过的笔记 / 评论 (持久化时跨运行生效)
+        """
         self.xhs_apis = XHS_Apis()
+        self.dedup = dedup
 
     def spider_note(self, note_url: str, cookies_str: str, proxies=None):
         """
@@ -30,6 +39,11 @@ class Data_Spider():
         logger.info(f'爬取笔记信息 {note_url}: {success}, msg: {msg}')
         return success, msg, note_info
 
+    @staticmethod
+    def _note_key(note_url: str):
+        note = parse_note_url(note_url)
+        return note.note_id if note is not None else note_url
+
     def spider_some_note(self, notes: list, cookies_str: str, base_path: dict, save_choice: str, excel_name: str = '', proxies=None):
         """
         爬取一些笔记的信息
@@ -40,6 +54,11 @@ class Data_Spider():
         """
         if (save_choice == 'all' or save_choice == 'excel') and excel_name == '':
             raise ValueError('excel_name 不能为空')
+        if self.dedup is not None:
+            known = self.dedup.check('note', [self._note_key(note_url) for note_url in notes])
+            if any(known):
+                logger.info(f'跳过已爬取的笔记 {sum(known)} 篇')
+            notes = [note_url for note_url, k in zip(notes, known) if not k]
         note_list = []
         for note_url in notes:
             success, msg, note_info = self.spider_note(note_url, cookies_str, proxies)
@@ -50,7 +69,17 @@ class Data_Spider():
                 download_note(note_info, base_path['media'], save_choice)
         if save_choice == 'all' or save_choice == 'excel':
             file_path = os.path.abspath(os.path.join(base_path['excel'], f'{excel_name}.xlsx'))
-            save_to_xlsx(note_list, file_path)
+            if self.dedup is None:
+                save_to_xlsx(note_list, file_path)
+            elif note_list:
+                # 跳过了已爬取的笔记, 这次只有新笔记: 追加到上次的 excel 后面, 不能覆盖
+                writer = XLSX_Writer(file_path, Note.FIELDS, XLSX_HEADERS['note']).append()
+                writer.write(note_list)
+                writer.close()
+        if self.dedup is not None:
+            # 下载和保存都完成之后才记录为已见, 爬取 / 保存失败的笔记下次继续爬
+            self.dedup.add('note', [note_info['note_id'] for note_info in note_list])
+            self.dedup.flush()
 
 
     def spider_user_all_note(self, user_url: str, cookies_str: str, base_path: dict, save_choice: str, excel_name: str = '', proxies=None):
@@ -78,6 +107,44 @@ class Data_Spider():
         logger.info(f'爬取用户所有视频 {user_url}: {success}, msg: {msg}')
         return note_list, success, msg
 
+    def spider_user_new_note(self, user_url: str, cookies_str: str, base_path: dict, save_choice: str, excel_name: str = '', recent_window: int = 5, proxies=None):
+        """
+        增量爬取一个用户的笔记: 只爬取上次同步之后的新笔记, 并刷新最近 recent_window 篇笔记的数据
+        :param user_url:
+        :param cookies_str:
+        :param base_path:
+        :param recent_window:
+        :return:
+        """
+        user_sync = User_Sync(cookies_str, xhs_apis=self.xhs_apis, recent_window=recent_window, proxies=proxies)
+        success, msg, result = user_sync.sync(user_url)
+        for note_info in result['new']:
+            if save_choice == 'all' or 'media' in save_choice:
+                download_note(note_info, base_path['media'], save_choice)
+        note_list = result['new'] + result['refreshed']
+        if (save_choice == 'all' or save_choice == 'excel') and note_list:
+            excel_name = excel_name or user_url.split('/')[-1].split('?')[0]
+            file_path = os.path.abspath(os.path.join(base_path['excel'], f'{excel_name}.xlsx'))
+            # 和 spider_user_all_note 是同一个文件: 刷新的笔记原地更新, 新笔记追加, 其余行保留
+            writer = XLSX_Writer(file_path, Note.FIELDS, XLSX_HEADERS['note']).upsert(note_list, 'note_id')
+            writer.close()
+        logger.info(f'增量爬取用户笔记 {user_url}: {success}, msg: {msg}')
+        return note_list, success, msg
+
+    def spider_note_all_comment(self, note_url: str, cookies_str: str, base_path: dict, excel_name: str = '', proxies=None):
+        """
+        爬取一篇笔记的全部评论, 边爬边按批写入 excel (一级评论和回复展开成行, 带父评论id / 根评论id / 层级)
+        :param note_url:
+        :param cookies_str:
+        :param base_path:
+        :return:
+        """
+        excel_name = excel_name or note_url.split('?')[0].split('/')[-1] + '_comments'
+        file_path = os.path.abspath(os.path.join(base_path['excel'], f'{excel_name}.xlsx'))
+        exporter = Comment_Exporter(cookies_str, xhs_apis=self.xhs_apis, proxies=proxies, dedup=self.dedup)
+        success, msg, result = exporter.export(note_url, [file_path])
+        return result['rows'], success, msg
+
     def spider_some_search_note(self, query: str, require_num: int, cookies_str: str, base_path: dict, save_choice: str, sort_type_choice=0, note_type=0, note_time=0, note_range=0, pos_distance=0, geo: dict = None,  excel_name: str = '', proxies=None):
         """
             指定数量搜索笔记，设置排序方式和笔记类型和笔记数量
@@ -115,11 +182,15 @@ if __name__ == '__main__':
         此文件为爬虫的入口文件，可以直接运行
         apis/xhs_pc_apis.py 为爬虫的api文件，包含小红书的全部数据接口，可以继续封装
         apis/xhs_creator_apis.py 为小红书创作者中心的api文件
+        大批量爬取请用 python -m pipelines.orchestrator (持久化任务队列 + 多进程)
         感谢star和follow
     """
 
     cookies_str, base_path = init()
     data_spider = Data_Spider()
+    # 跨运行跳过已爬取的笔记 / 评论:
+    # from xhs_utils.dedup_util import Dedup_Service
+    # data_spider = Data_Spider(dedup=Dedup_Service(os.path.join(os.path.dirname(base_path['excel']), 'dedup')))
     """
         save_choice: all: 保存所有的信息, media: 保存视频和图片（media-video只下载视频, media-image只下载图片，media都下载）, excel: 保存到excel
         save_choice 为 excel 或者 all 时，excel_name 不能为空
@@ -135,6 +206,11 @@ if __name__ == '__main__':
     # 2 爬取用户的所有笔记信息 用户链接 如下所示 注意此url会过期！
     user_url = 'https://www.xiaohongshu.com/user/profile/64c3f392000000002b009e45?xsec_token=AB-GhAToFu07JwNk_AMICHnp7bSTjVz2beVIDBwSyPwvM=&xsec_source=pc_feed'
     data_spider.spider_user_all_note(user_url, cookies_str, base_path, 'all')
+    # 2.1 增量爬取用户的新笔记 (第一次运行等同于全量, 之后只爬新笔记)
+    # data_spider.spider_user_new_note(user_url, cookies_str, base_path, 'excel')
+
+    # 2.2 爬取一篇笔记的全部评论 (流式写入 excel, 评论很多也不会占满内存)
+    # data_spider.spider_note_all_comment(notes[0], cookies_str, base_path)
 
     # 3 搜索指定关键词的笔记
     query = "榴莲"
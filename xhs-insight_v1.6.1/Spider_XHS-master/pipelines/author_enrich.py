@@ -0,0 +1,197 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from loguru import logger
+from apis.xhs_pc_apis import XHS_Apis
+from pipelines.orchestrator import DEFAULT_OUTPUT_PATH
+from xhs_utils import codec_util
+from xhs_utils.export_util import SQLite_Writer
+from xhs_utils.record_util import User
+
+USER_FIELDS = User.FIELDS + ('fetched_at',)
+# 并入笔记记录的作者字段
+ENRICH_FIELDS = ('author_fans', 'author_follows', 'author_interaction', 'engagement_per_fan')
+DEFAULT_TTL = 3 * 24 * 3600
+
+
+def engagement_per_fan(note: dict, fans):
+    """
+        (点赞 + 收藏 + 评论 + 分享) / 作者粉丝数, 没有粉丝数时为 None
+    """
+    if not fans:
+        return None
+    engagement = sum(note.get(field) or 0 for field in ('liked_count', 'collected_count', 'comment_count', 'share_count'))
+    return round(engagement / fans, 4)
+
+
+class Author_Cache():
+    """
+        作者信息缓存: sqlite 的 users 表 (handle_user_info 的字段 + fetched_at), 按 user_id upsert
+        超过 ttl 秒的记录视为过期, 需要重新获取; 默认和编排器的笔记放在同一个库里, 方便 join
+        只能在创建它的线程里使用
+    """
+    def __init__(self, db_path: str = DEFAULT_OUTPUT_PATH, ttl: float = DEFAULT_TTL):
+        """
+            :param db_path: sqlite 文件
+            :param ttl: 缓存秒数
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.writer = SQLite_Writer(db_path, USER_FIELDS, table='users', primary_key='user_id').open()
+        self.conn = self.writer.conn
+
+    def _select(self, columns: str, user_ids: list, fresh_only: bool):
+        rows = []
+        since = time.time() - self.ttl if fresh_only else 0
+        for start in range(0, len(user_ids), 500):
+            chunk = user_ids[start:start + 500]
+            rows += self.conn.execute(
+                f'SELECT {columns} FROM users WHERE fetched_at >= ? AND user_id IN ({",".join("?" * len(chunk))})',
+                [since, *chunk]
+            ).fetchall()
+        return rows
+
+    def stale_ids(self, user_ids: list):
+        """
+            过滤出没有缓存或缓存已过期的 id, 保持原有顺序
+        """
+        fresh = {row[0] for row in self._select('user_id', user_ids, True)}
+        return [user_id for user_id in user_ids if user_id not in fresh]
+
+    def get_many(self, user_ids: list, fresh_only: bool = False):
+        """
+            返回 {user_id: 作者信息}, 没有缓存的 id 不在结果里
+            :param fresh_only: 是否只返回没有过期的
+        """
+        columns = ', '.join(f'"{field}"' for field in User.FIELDS)
+        users = {}
+        for row in self._select(columns, user_ids, fresh_only):
+            user = users[row[0]] = dict(zip(User.FIELDS, row))
+            # 列表字段以 json 保存
+            user['tags'] = codec_util.loads(user['tags']) if user['tags'] else []
+        return users
+
+    def put_many(self, users: list):
+        now = int(time.time())
+        self.writer.write([{**user, 'fetched_at': now} for user in users])
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+
+class Author_Enricher():
+    """
+        笔记 / 评论作者的信息补全
+        - 从一批记录里取出不重复的作者 id, 只获取缓存里没有或已过期的作者
+        - 作者信息在线程池里并发获取, 请求仍然经过 XHS_Apis 的限速器, 并发数只决定同时等待响应的请求数
+        - 获取到的作者按批写入 users 表, 失败的作者不写入, 下次再取
+        - enrich 把粉丝数等字段 (ENRICH_FIELDS) 并入笔记记录, enrich_db 在库里建 notes_with_author 视图
+    """
+    def __init__(self, cookies_str: str, xhs_apis: XHS_Apis = None, cache: Author_Cache = None, concurrency: int = 4,
+                 batch_size: int = 100, proxies=None):
+        """
+            :param cookies_str: 你的cookies
+            :param cache: 作者信息缓存, 默认 datas/crawl.db 的 users 表, 缓存 3 天
+            :param concurrency: 同时获取的作者数
+            :param batch_size: 每次写入缓存的作者数
+        """
+        self.cookies_str = cookies_str
+        self.xhs_apis = xhs_apis if xhs_apis is not None else XHS_Apis()
+        self.cache = cache if cache is not None else Author_Cache()
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.proxies = proxies
+
+    @staticmethod
+    def author_ids(records):
+        """
+            记录 (dict 或 Note / Comment) 里不重复的作者 id, 保持首次出现的顺序
+        """
+        seen = {}
+        for record in records:
+            user_id = record.get('user_id') if isinstance(record, dict) else getattr(record, 'user_id', None)
+            if user_id:
+                seen[user_id] = None
+        return list(seen)
+
+    def _fetch(self, user_id: str):
+        success, msg, res_json = self.xhs_apis.get_user_info(user_id, self.cookies_str, self.proxies)
+        if not success:
+            raise Exception(msg)
+        return User.from_raw(res_json['data'], user_id).to_dict()
+
+    def refresh(self, user_ids: list):
+        """
+            获取没有缓存或缓存过期的作者信息并写入缓存
+            返回 success, msg, {'authors': 作者数, 'cached': 命中缓存数, 'fetched': 获取数, 'failed': 失败数}
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        stale = self.cache.stale_ids(user_ids)
+        stats = {'authors': len(user_ids), 'cached': len(user_ids) - len(stale), 'fetched': 0, 'failed': 0}
+        batch, last_error = [], None
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix='author') as pool:
+            futures = {pool.submit(self._fetch, user_id): user_id for user_id in stale}
+            # sqlite 连接只在当前线程使用: 工作线程只发请求, 结果回到这里按批写入
+            for future in as_completed(futures):
+                try:
+                    batch.append(future.result())
+                except Exception as e:
+                    stats['failed'] += 1
+                    last_error = str(e)
+                    logger.warning(f'获取作者 {futures[future]} 信息失败: {e}')
+                    continue
+                if len(batch) >= self.batch_size:
+                    self.cache.put_many(batch)
+                    stats['fetched'] += len(batch)
+                    batch = []
+        if batch:
+            self.cache.put_many(batch)
+            stats['fetched'] += len(batch)
+        logger.info(f'补全作者信息: {stats}')
+        if stats['failed']:
+            return False, last_error, stats
+        return True, '成功', stats
+
+    def enrich(self, notes: list):
+        """
+            补全笔记作者信息, 返回带上 ENRICH_FIELDS 的笔记字典列表 (不修改传入的记录)
+            获取失败的作者字段为 None
+            :param notes: handle_note_info 的结果或 Note 记录
+        """
+        notes = [note if isinstance(note, dict) else note.to_dict() for note in notes]
+        user_ids = self.author_ids(notes)
+        self.refresh(user_ids)
+        users = self.cache.get_many(user_ids)
+        result = []
+        for note in notes:
+            user = users.get(note.get('user_id')) or {}
+            fans = user.get('fans')
+            result.append({**note, 'author_fans': fans, 'author_follows': user.get('follows'),
+                           'author_interaction': user.get('interaction'), 'engagement_per_fan': engagement_per_fan(note, fans)})
+        return result
+
+    def enrich_db(self, table: str = 'notes', view: str = 'notes_with_author'):
+        """
+            补全缓存所在库 (默认编排器的 datas/crawl.db) 里所有笔记的作者, 并建立笔记和作者 join 的视图
+            其他库里的笔记传入 cache=Author_Cache(那个库) 即可
+            返回 success, msg, refresh 的统计
+        """
+        conn = self.cache.conn
+        user_ids = [row[0] for row in conn.execute(f'SELECT DISTINCT user_id FROM "{table}" WHERE user_id IS NOT NULL')]
+        success, msg, stats = self.refresh(user_ids)
+        with conn:
+            conn.execute(f'DROP VIEW IF EXISTS "{view}"')
+            conn.execute(
+                f'CREATE VIEW "{view}" AS SELECT n.*, u.fans AS author_fans, u.follows AS author_follows, '
+                f'u.interaction AS author_interaction, CASE WHEN u.fans > 0 THEN ROUND((COALESCE(n.liked_count, 0) + '
+                f'COALESCE(n.collected_count, 0) + COALESCE(n.comment_count, 0) + COALESCE(n.share_count, 0)) * 1.0 / u.fans, 4) '
+                f'END AS engagement_per_fan FROM "{table}" n LEFT JOIN users u ON u.user_id = n.user_id'
+            )
+        return success, msg, stats
+
+
+if __name__ == '__main__':
+    from xhs_utils.common_util import init
+    cookies_str, base_path = init()
+    # 补全编排器爬到的笔记 (datas/crawl.db) 的作者信息, 之后查询 notes_with_author 视图
+    Author_Enricher(cookies_str).enrich_db()
@@ -0,0 +1,139 @@
+from loguru import logger
+from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils.export_util import open_writer
+from xhs_utils.record_util import Comment
+
+# handle_comment_info 的字段之后追加评论树的位置
+FIELDS = Comment.FIELDS + ('parent_id', 'root_id', 'depth')
+HEADERS = ('笔记id', '笔记url', '评论id', '用户id', '用户主页url', '昵称', '头像url', '评论内容', '评论标签', '点赞数量',
+           '上传时间', 'ip归属地', '图片地址url列表', '父评论id', '根评论id', '层级')
+# 计算层级时记住的最近回复数, 目标回复超出这个范围时层级按 2 (回复的回复) 计
+DEPTH_WINDOW = 10000
+
+
+def walk_comments(comments):
+    """
+        把评论树展开成 "一级评论, 它的全部回复, 下一条一级评论 ..." 的顺序
+        :param comments: Comment 的可迭代对象; 一级评论的 sub_comments 为空 (iter_note_comments) 或为回复列表
+                         (get_note_all_comment_records) 都可以, get_note_all_comment 的原始字典可以先用
+                         (Comment.from_raw(c, note_url) for c in comments) 转换
+    """
+    for comment in comments:
+        yield comment
+        for sub in comment.sub_comments:
+            if sub.parent_id is None:
+                sub.parent_id = comment.comment_id
+            yield sub
+
+
+def flatten_comments(comments):
+    """
+        产出导出用的行: handle_comment_info 的字段 + parent_id / root_id / depth
+        一级评论 depth 为 0, parent_id 为空; 回复一级评论为 1, 回复某条回复为它的层级 + 1
+        只记录当前这条一级评论下最近 DEPTH_WINDOW 条回复的层级, 内存占用和楼层大小无关
+        :param comments: 同 walk_comments
+    """
+    root_id, depths = None, {}
+    for comment in walk_comments(comments):
+        row = comment.to_dict()
+        if comment.parent_id is None:
+            root_id, depths = comment.comment_id, {}
+            depth = 0
+        elif comment.parent_id == root_id:
+            depth = 1
+        else:
+            # 只记录层级 >= 2 的回复: 查不到的目标按层级 1 算 (直接回复一级评论, 或已移出窗口 / 已删除)
+            depth = depths.get(comment.parent_id, 1) + 1
+        if depth > 1:
+            depths[comment.comment_id] = depth
+            if len(depths) > DEPTH_WINDOW:
+                del depths[next(iter(depths))]
+        row['parent_id'] = comment.parent_id
+        row['root_id'] = root_id
+        row['depth'] = depth
+        yield row
+
+
+class Comment_Exporter():
+    """
+        笔记评论的流式导出
+        - 评论边爬边展开成行, 每攒够 batch_size 行写入一次导出文件 (jsonl / xlsx / db) 并落盘
+        - 同一时间只持有一页响应和一批行, 几万条评论的笔记内存占用也不变
+        - 写入 db 时表为 comments, 按 comment_id upsert, 重复导出同一篇笔记不会产生重复行
+        - 传入 dedup 时只写出没见过的评论 (scope "comment"), 并追加到已有的导出文件后面, 不覆盖上次导出的行;
+          评论在写入落盘之后才记录为已见 (xlsx 在 close 之后), 写入失败的评论下次还会导出 (至少一次, db 按主键去重)
+    """
+    def __init__(self, cookies_str: str, xhs_apis: XHS_Apis = None, batch_size: int = 500, proxies=None, dedup=None):
+        """
+            :param cookies_str: 你的cookies
+            :param batch_size: 每次写入的行数
+            :param dedup: 可选, xhs_utils.dedup_util.Dedup_Service
+        """
+        self.cookies_str = cookies_str
+        self.xhs_apis = xhs_apis if xhs_apis is not None else XHS_Apis()
+        self.batch_size = max(1, batch_size)
+        self.proxies = proxies
+        self.dedup = dedup
+
+    def iter_rows(self, url: str):
+        return flatten_comments(self.xhs_apis.iter_note_comments(url, self.cookies_str, self.proxies))
+
+    def export(self, url: str, paths: list):
+        """
+            导出一篇笔记的全部评论
+            :param url: 笔记的url (带 xsec_token) 或 xhslink 短链
+            :param paths: 导出文件列表, 按扩展名写入 .jsonl / .xlsx / .db
+            返回 success, msg, {'rows': 导出行数, 'comments': 一级评论数, 'skipped': 已见而跳过的行数}
+            中途失败时已写入的行保留在文件里
+        """
+        writers = [open_writer(path, FIELDS, HEADERS, table='comments', primary_key='comment_id') for path in paths]
+        for writer in writers:
+            if self.dedup is not None:
+                writer.append()
+            else:
+                writer.open()
+        success, msg, rows, roots = True, '成功', 0, 0
+        self._skipped = 0
+        # 有 xlsx 这种 close 之后才落盘的写入器时, 已写出的评论 id 等 close 之后再记录
+        self._durable = all(writer.durable for writer in writers)
+        self._pending = []
+        batch = []
+        try:
+            for row in self.iter_rows(url):
+                batch.append(row)
+                if row['depth'] == 0:
+                    roots += 1
+                if len(batch) >= self.batch_size:
+                    rows += self._write(writers, batch)
+                    batch = []
+        except Exception as e:
+            success, msg = False, str(e)
+        finally:
+            rows += self._write(writers, batch)
+            for writer in writers:
+                writer.close()
+            if self.dedup is not None:
+                self.dedup.add('comment', self._pending)
+                self._pending = []
+                self.dedup.flush()
+        logger.info(f'导出笔记评论 {url}: {rows} 行 ({roots} 条一级评论, 跳过 {self._skipped} 行): {success}, msg: {msg}')
+        return success, msg, {'rows': rows, 'comments': roots, 'skipped': self._skipped}
+
+    def _write(self, writers, batch):
+        if self.dedup is not None and batch:
+            known = self.dedup.check('comment', [row['comment_id'] for row in batch])
+            self._skipped += sum(known)
+            batch = [row for row, is_known in zip(batch, known) if not is_known]
+        if not batch:
+            return 0
+        for writer in writers:
+            writer.write(batch)
+            writer.flush()
+        if self.dedup is not None:
+            # 写入落盘之后才记录为已见
+            ids = [row['comment_id'] for row in batch]
+            if self._durable:
+                self.dedup.add('comment', ids)
+            else:
+                self._pending.extend(ids)
+        return len(batch)
@@ -0,0 +1,163 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+from apis.xhs_creator_apis import XHS_Creator_Apis
+from xhs_utils.cookie_util import trans_cookies
+from xhs_utils.data_util import norm_count, timestamp_to_str
+from xhs_utils.export_util import open_writer
+from xhs_utils.rate_limit_util import cookie_key
+from xhs_utils.state_util import StateStore
+
+
+class CreatorNote():
+    """
+        创作者中心的一篇已发布笔记, 导出时的一行
+    """
+    FIELDS = ('note_id', 'note_url', 'note_type', 'title', 'publish_time', 'view_count', 'liked_count',
+              'collected_count', 'comment_count', 'share_count', 'cover', 'level', 'xsec_token')
+    HEADERS = ('笔记id', '笔记url', '笔记类型', '标题', '发布时间', '浏览数量', '点赞数量',
+               '收藏数量', '评论数量', '分享数量', '封面url', '笔记等级', 'xsec_token')
+    __slots__ = FIELDS
+
+    def __init__(self, **kwargs):
+        for field in self.FIELDS:
+            setattr(self, field, kwargs.get(field))
+
+    @classmethod
+    def from_raw(cls, data: dict):
+        note_id = data.get('id') or data.get('note_id')
+        publish_time = data.get('time')
+        if isinstance(publish_time, (int, float)):
+            publish_time = timestamp_to_str(publish_time)
+        images = data.get('images_list') or []
+        return cls(
+            note_id=note_id,
+            note_url=f'https://www.xiaohongshu.com/explore/{note_id}',
+            note_type='视频' if data.get('type') == 'video' else '图集',
+            title=data.get('display_title') or '无标题',
+            publish_time=publish_time,
+            view_count=norm_count(data.get('view_count')),
+            liked_count=norm_count(data.get('likes')),
+            collected_count=norm_count(data.get('collected_count')),
+            comment_count=norm_count(data.get('comments_count')),
+            share_count=norm_count(data.get('shared_count')),
+            cover=images[0].get('url') if images else None,
+            level=data.get('level'),
+            xsec_token=data.get('xsec_token'),
+        )
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+class Creator_Exporter():
+    """
+        创作者中心已发布笔记的批量导出
+        - 翻页参数是连续的页码, 拿到第一页后同时预取后面 concurrency 页, 按页码顺序产出;
+          返回的下一页不是 page + 1 时丢弃预取结果, 退回逐页请求
+        - 每页规范化为 CreatorNote 后直接写入导出文件 (jsonl / xlsx / db), 不在内存里攒全部笔记
+        - 每页落盘后在 StateStore 记录断点, 中断后再次导出从断点继续
+        预取最多会在最后一页之后多请求 concurrency - 1 页, 请求速率仍受限速器控制
+    """
+    def __init__(self, cookies_str: str, creator_apis: XHS_Creator_Apis = None, store: StateStore = None,
+                 concurrency: int = 4, proxies=None):
+        """
+            :param cookies_str: 创作者中心的cookies
+            :param store: 断点保存位置, 默认 datas/state.db
+            :param concurrency: 同时请求的页数, 1 为逐页请求
+        """
+        self.cookies_str = cookies_str
+        self.creator_apis = creator_apis if creator_apis is not None else XHS_Creator_Apis()
+        self.store = store if store is not None else StateStore()
+        self.concurrency = max(1, concurrency)
+        self.proxies = proxies
+        self.scope = f'creator_export:{cookie_key(trans_cookies(cookies_str))}'
+
+    def _fetch(self, page):
+        success, msg, res_json = self.creator_apis.get_publish_note_info(page, self.cookies_str, self.proxies)
+        if not success:
+            raise Exception(msg)
+        return res_json['data']['notes'], res_json['data']['page']
+
+    def iter_pages(self, start_page: int = None):
+        """
+            按顺序产出 (页码, 原始笔记列表, 下一页页码), 下一页为 -1 时结束
+            :param start_page: 从哪一页开始, None 为第一页
+        """
+        page = start_page
+        if page is None:
+            # 第一页不带页码, 它返回的下一页页码决定预取从哪里开始
+            notes, next_page = self._fetch(None)
+            yield None, notes, next_page
+            if next_page == -1 or not notes:
+                return
+            page = next_page
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='creator-page') as pool:
+            pending = {}
+            try:
+                while True:
+                    for p in range(page, page + self.concurrency):
+                        if p not in pending:
+                            pending[p] = pool.submit(self._fetch, p)
+                    notes, next_page = pending.pop(page).result()
+                    yield page, notes, next_page
+                    if next_page == -1 or not notes:
+                        return
+                    if next_page != page + 1:
+                        logger.warning(f'创作者笔记页码不连续 ({page} -> {next_page}), 丢弃预取')
+                        for future in pending.values():
+                            future.cancel()
+                        pending.clear()
+                    page = next_page
+            finally:
+                for future in pending.values():
+                    future.cancel()
+
+    def iter_notes(self, start_page: int = None):
+        for _, notes, _ in self.iter_pages(start_page):
+            for note in notes:
+                yield CreatorNote.from_raw(note)
+
+    def _checkpoint_key(self, paths):
+        return 'checkpoint:' + hashlib.sha1('|'.join(sorted(os.path.abspath(p) for p in paths)).encode('utf-8')).hexdigest()[:16]
+
+    def export(self, paths: list, resume: bool = True):
+        """
+            导出全部已发布笔记
+            :param paths: 导出文件列表, 按扩展名写入 .jsonl / .xlsx / .db
+            :param resume: 有未完成的断点时从断点继续, 否则重新导出
+            返回 success, msg, {'rows': 导出行数, 'pages': 本次请求的页数}
+        """
+        key = self._checkpoint_key(paths)
+        checkpoint = self.store.get(self.scope, key) if resume else None
+        if checkpoint and checkpoint.get('done'):
+            checkpoint = None
+        page, rows = (checkpoint['page'], checkpoint['rows']) if checkpoint else (None, 0)
+        if checkpoint:
+            logger.info(f'从断点继续导出: 第 {page} 页, 已导出 {rows} 行')
+
+        writers = [open_writer(path, CreatorNote.FIELDS, CreatorNote.HEADERS, table='creator_notes', primary_key='note_id') for path in paths]
+        durable = all(writer.durable for writer in writers)
+        for writer in writers:
+            writer.open(rows)
+        success, msg, pages = True, '成功', 0
+        try:
+            for _, notes, next_page in self.iter_pages(page):
+                batch = [CreatorNote.from_raw(note).to_dict() for note in notes]
+                for writer in writers:
+                    writer.write(batch)
+                rows, page, pages = rows + len(batch), next_page, pages + 1
+                if durable:
+                    for writer in writers:
+                        writer.flush()
+                    self.store.set(self.scope, key, {'page': page, 'rows': rows, 'done': False})
+        except Exception as e:
+            success, msg = False, str(e)
+        finally:
+            for writer in writers:
+                writer.close()
+        # xlsx 在 close 之后才落盘, 这时再记录最终断点
+        self.store.set(self.scope, key, {'page': page, 'rows': rows, 'done': success})
+        logger.info(f'导出创作者笔记 {rows} 行 ({pages} 页): {success}, msg: {msg}')
+        return success, msg, {'rows': rows, 'pages': pages}
@@ -0,0 +1,255 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils.data_util import norm_count, timestamp_to_str
+from xhs_utils.dedup_util import make_seen_set
+from xhs_utils.export_util import open_writer
+from xhs_utils.record_util import Note
+
+FIELDS = ('note_id', 'note_url', 'channel', 'note_type', 'title', 'user_id', 'nickname', 'liked_count', 'xsec_token', 'seen_time')
+HEADERS = ('笔记id', '笔记url', '频道', '笔记类型', '标题', '用户id', '昵称', '点赞数量', 'xsec_token', '采集时间')
+NOTE_URL = 'https://www.xiaohongshu.com/explore/{note_id}?xsec_token={xsec_token}&xsec_source=pc_feed'
+
+_DONE = object()
+
+
+def feed_row(item: dict, channel: str):
+    """
+        首页推荐的一条笔记转换为导出的一行
+    """
+    card = item.get('note_card') or {}
+    user = card.get('user') or {}
+    xsec_token = item.get('xsec_token', '')
+    return {
+        'note_id': item['id'],
+        'note_url': NOTE_URL.format(note_id=item['id'], xsec_token=xsec_token),
+        'channel': channel,
+        'note_type': '视频' if card.get('type') == 'video' else '图集',
+        'title': card.get('display_title') or '无标题',
+        'user_id': user.get('user_id'),
+        'nickname': user.get('nickname') or user.get('nick_name'),
+        'liked_count': norm_count((card.get('interact_info') or {}).get('liked_count')),
+        'xsec_token': xsec_token,
+        'seen_time': timestamp_to_str(int(time.time() * 1000)),
+    }
+
+
+class Channel_Cursor():
+    """
+        一个频道的翻页状态, 每个频道独立翻页
+    """
+    __slots__ = ('channel', 'cursor_score', 'refresh_type', 'note_index', 'pages', 'new', 'seen')
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self.cursor_score = ''
+        self.refresh_type = 1
+        self.note_index = 0
+        self.pages = 0
+        self.new = 0
+        self.seen = 0
+
+    def advance(self, data: dict, count: int):
+        # 和 get_homefeed_recommend_by_num 相同的翻页方式: 第一页 refresh_type=1, 之后为 3
+        self.cursor_score = data.get('cursor_score', '')
+        self.refresh_type = 3
+        self.note_index += count
+        self.pages += 1
+
+
+class Feed_Harvester():
+    """
+        首页推荐的多频道并发采集
+        - 每个频道一个线程、各自维护游标, 所有频道同时翻页
+        - 笔记跨频道、跨轮次去重: 默认精确集合, 长时间采样时传 seen_capacity 换成固定大小的 Bloom 过滤器
+        - 新笔记以事件流的形式产出, export 边采集边按批写入导出文件
+        - fetch_detail 时只对没见过的笔记爬取详情, 在单独的线程池里执行, 不阻塞翻页
+        事件: {'type': 'new_note' | 'note_detail' | 'channel_done' | 'error', 'channel': ..., 'time': ..., ...}
+    """
+    def __init__(self, cookies_str: str, xhs_apis: XHS_Apis = None, max_pages: int = 5, concurrency: int = 8,
+                 fetch_detail: bool = False, detail_concurrency: int = 4, seen=None, seen_capacity: int = None, proxies=None):
+        """
+            :param cookies_str: 你的cookies
+            :param max_pages: 每个频道每轮最多翻的页数
+            :param concurrency: 同时翻页的频道数
+            :param fetch_detail: 是否爬取新笔记的详情
+            :param detail_concurrency: 同时爬取详情的数量
+            :param seen: 已见笔记集合 (dedup_util.Seen_Set / Bloom_Filter, 或 Dedup_Service.scope('feed')), 多个采集器可以共用
+            :param seen_capacity: 不传 seen 时, None 为精确集合, 否则为这个容量的 Bloom 过滤器
+        """
+        self.cookies_str = cookies_str
+        self.xhs_apis = xhs_apis if xhs_apis is not None else XHS_Apis()
+        self.max_pages = max_pages
+        self.concurrency = max(1, concurrency)
+        self.fetch_detail = fetch_detail
+        self.detail_concurrency = max(1, detail_concurrency)
+        self.seen = seen if seen is not None else make_seen_set(seen_capacity)
+        self.proxies = proxies
+
+    @staticmethod
+    def _event(type, channel, **kwargs):
+        return {'type': type, 'channel': channel, 'time': int(time.time() * 1000), **kwargs}
+
+    def get_channels(self):
+        """
+            返回全部频道 id
+        """
+        success, msg, res_json = self.xhs_apis.get_homefeed_all_channel(self.cookies_str, self.proxies)
+        if not success:
+            raise Exception(msg)
+        return [c['id'] for c in res_json['data']['categories']]
+
+    def _crawl_detail(self, row):
+        success, msg, res_json = self.xhs_apis.get_note_info(row['note_url'], self.cookies_str, self.proxies)
+        if not success:
+            raise Exception(msg)
+        note_info = res_json['data']['items'][0]
+        note_info['url'] = row['note_url']
+        return Note.from_raw(note_info).to_dict()
+
+    def harvest(self, channels: list = None):
+        """
+            所有频道并发采集一轮, 产出事件
+            :param channels: 频道 id 列表, None 为全部频道
+        """
+        channels = channels if channels is not None else self.get_channels()
+        if not channels:
+            return
+        events = queue.Queue()
+        stop = threading.Event()
+        pending_lock = threading.Lock()
+        pending = [len(channels)]
+        detail_pool = ThreadPoolExecutor(self.detail_concurrency, thread_name_prefix='feed-detail') if self.fetch_detail else None
+
+        def detail(row, channel):
+            try:
+                events.put(self._event('note_detail', channel, note_id=row['note_id'], data=self._crawl_detail(row)))
+            except Exception as e:
+                events.put(self._event('error', channel, note_id=row['note_id'], msg=str(e)))
+            finally:
+                events.put(_DONE)
+
+        def crawl(cursor):
+            try:
+                while cursor.pages < self.max_pages and not stop.is_set():
+                    success, msg, res_json = self.xhs_apis.get_homefeed_recommend(
+                        cursor.channel, cursor.cursor_score, cursor.refresh_type, cursor.note_index, self.cookies_str, self.proxies
+                    )
+                    if not success:
+                        events.put(self._event('error', cursor.channel, page=cursor.pages, msg=msg))
+                        break
+                    data = res_json.get('data') or {}
+                    items = [i for i in data.get('items') or [] if i.get('model_type') == 'note']
+                    if not items:
+                        break
+                    cursor.advance(data, len(data['items']))
+                    for item, new in zip(items, self.seen.add_many([item['id'] for item in items])):
+                        if not new:
+                            cursor.seen += 1
+                            continue
+                        cursor.new += 1
+                        row = feed_row(item, cursor.channel)
+                        events.put(self._event('new_note', cursor.channel, note_id=item['id'], data=row))
+                        if detail_pool is not None:
+                            with pending_lock:
+                                pending[0] += 1
+                            detail_pool.submit(detail, row, cursor.channel)
+            except Exception as e:
+                events.put(self._event('error', cursor.channel, page=cursor.pages, msg=str(e)))
+            finally:
+                events.put(self._event('channel_done', cursor.channel, pages=cursor.pages, new=cursor.new, seen=cursor.seen))
+                events.put(_DONE)
+
+        pool = ThreadPoolExecutor(min(self.concurrency, max(1, len(channels))), thread_name_prefix='feed-channel')
+        try:
+            for channel in channels:
+                pool.submit(crawl, Channel_Cursor(channel))
+            while True:
+                event = events.get()
+                if event is _DONE:
+                    with pending_lock:
+                        pending[0] -= 1
+                        if pending[0] == 0:
+                            break
+                    continue
+                yield event
+        finally:
+            # 提前关闭生成器时让频道线程在当前页结束后退出
+            stop.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+            if detail_pool is not None:
+                detail_pool.shutdown(wait=True, cancel_futures=True)
+
+    def export(self, paths: list, detail_paths: list = None, channels: list = None, batch_size: int = 200):
+        """
+            采集一轮并把新笔记边采集边写入导出文件
+            :param paths: 新笔记 (首页卡片) 的导出文件, 按扩展名写入 .jsonl / .xlsx / .db
+            :param detail_paths: 笔记详情的导出文件, 需要 fetch_detail
+            返回 success, msg, {'new': 新笔记数, 'details': 详情数, 'pages': 请求的页数, 'errors': 错误数}
+        """
+        writers = [open_writer(path, FIELDS, HEADERS, table='feed_notes', primary_key='note_id') for path in paths]
+        detail_writers = [open_writer(path, Note.FIELDS, table='notes', primary_key='note_id') for path in detail_paths or []]
+        batches = {'new_note': ([], writers), 'note_detail': ([], detail_writers)}
+        for writer in writers + detail_writers:
+            writer.open()
+        stats = {'new': 0, 'details': 0, 'pages': 0, 'errors': 0}
+        success, msg = True, '成功'
+
+        def flush(batch, targets):
+            for writer in targets:
+                writer.write(batch)
+                writer.flush()
+            batch.clear()
+
+        try:
+            for event in self.harvest(channels):
+                if event['type'] in batches:
+                    batch, targets = batches[event['type']]
+                    batch.append(event['data'])
+                    stats['new' if event['type'] == 'new_note' else 'details'] += 1
+                    if len(batch) >= batch_size:
+                        flush(batch, targets)
+                elif event['type'] == 'channel_done':
+                    stats['pages'] += event['pages']
+                elif event['type'] == 'error':
+                    stats['errors'] += 1
+                    logger.warning(f"首页频道 {event['channel']} 采集出错: {event['msg']}")
+        except Exception as e:
+            success, msg = False, str(e)
+        finally:
+            for batch, targets in batches.values():
+                if batch:
+                    flush(batch, targets)
+            for writer in writers + detail_writers:
+                writer.close()
+        logger.info(f'首页采集: {stats}, 已见笔记 {len(self.seen)}')
+        return success, msg, stats
+
+    def run(self, interval: int = 300, rounds: int = None, channels: list = None):
+        """
+            周期性采样, 作为一个无限事件流; 已见集合跨轮次保留, 每轮只产出新笔记
+            :param interval: 两轮之间的间隔 (秒)
+            :param rounds: 轮数, None 为一直运行
+        """
+        round_index = 0
+        while rounds is None or round_index < rounds:
+            started = time.time()
+            try:
+                yield from self.harvest(channels)
+            except Exception as e:
+                yield self._event('error', None, msg=str(e))
+            round_index += 1
+            if rounds is not None and round_index >= rounds:
+                break
+            time.sleep(max(0.0, interval - (time.time() - started)))
+
+
+if __name__ == '__main__':
+    from xhs_utils.common_util import init
+    cookies_str, base_path = init()
+    harvester = Feed_Harvester(cookies_str, seen_capacity=10000000)
+    for event in harvester.run(interval=600):
+        logger.info(f"{event['type']} {event['channel']} {event.get('note_id', '')}")
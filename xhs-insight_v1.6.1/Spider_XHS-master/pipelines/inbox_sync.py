@@ -0,0 +1,233 @@
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from loguru import logger
+from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils.cookie_util import trans_cookies
+from xhs_utils.data_util import timestamp_to_str
+from xhs_utils.export_util import open_writer
+from xhs_utils.rate_limit_util import cookie_key
+from xhs_utils.state_util import StateStore
+
+# 消息流: 评论和@ / 赞和收藏 / 新增关注
+STREAMS = ('mentions', 'likes', 'connections')
+FIELDS = ('message_id', 'account', 'stream', 'type', 'title', 'time', 'user_id', 'nickname', 'note_id', 'comment_id', 'content', 'sync_time')
+HEADERS = ('消息id', '账号', '消息类型', '类型', '标题', '时间', '用户id', '昵称', '笔记id', '评论id', '内容', '同步时间')
+
+_DONE = object()
+
+
+def message_row(message: dict, account: str, stream: str):
+    """
+        一条通知消息转换为导出的一行, 三种消息结构不同, 取不到的字段为 None
+    """
+    user = message.get('user_info') or message.get('user') or {}
+    item = message.get('item_info') or {}
+    comment = message.get('comment_info') or {}
+    msg_time = message.get('time')
+    return {
+        'message_id': str(message['id']),
+        'account': account,
+        'stream': stream,
+        'type': message.get('type'),
+        'title': message.get('title'),
+        # 消息时间是秒级时间戳
+        'time': timestamp_to_str(int(msg_time) * 1000) if msg_time else None,
+        'user_id': user.get('userid') or user.get('user_id'),
+        'nickname': user.get('nickname'),
+        'note_id': item.get('id'),
+        'comment_id': comment.get('id'),
+        'content': comment.get('content'),
+        'sync_time': timestamp_to_str(int(time.time() * 1000)),
+    }
+
+
+class Inbox_Sync():
+    """
+        通知消息的增量同步
+        - 每个账号每种消息记住最新消息的 id / 时间和最近 KNOWN_KEPT 条消息 id (StateStore, scope "inbox:<账号>:<消息类型>"),
+          从最新一页往后翻, 遇到已知消息或更早的消息即停止, 只取新消息; 首次同步最多翻 max_pages 页
+        - 三种消息各一个线程同时翻页
+        - 新消息以事件流的形式产出, export 按批写入导出文件
+        - 游标在这种消息的 stream_done 事件被处理之后才保存: 翻页出错或中途退出时下次重新取这些消息 (至少一次),
+          写入 db 时按 message_id upsert, 不会重复
+        事件: {'type': 'new_message' | 'stream_done' | 'error', 'stream': ..., 'account': ..., 'time': ..., ...}
+    """
+    KNOWN_KEPT = 50
+
+    def __init__(self, cookies_str: str, store: StateStore = None, xhs_apis: XHS_Apis = None, account: str = None,
+                 streams: list = STREAMS, max_pages: int = 20, proxies=None):
+        """
+            :param cookies_str: 你的cookies
+            :param store: 持久化状态, 默认 datas/state.db
+            :param account: 账号标识, 默认取 cookie 里的 a1
+            :param streams: 同步的消息类型, mentions / likes / connections
+            :param max_pages: 每种消息每次最多翻的页数
+        """
+        self.cookies_str = cookies_str
+        self.store = store if store is not None else StateStore()
+        self.xhs_apis = xhs_apis if xhs_apis is not None else XHS_Apis()
+        self.account = account or cookie_key(trans_cookies(cookies_str))
+        unknown = set(streams) - set(STREAMS)
+        if unknown:
+            raise ValueError(f'未知的消息类型: {sorted(unknown)}')
+        self.streams = list(streams)
+        self.max_pages = max_pages
+        self.proxies = proxies
+        self._fetchers = {
+            'mentions': self.xhs_apis.get_metions,
+            'likes': self.xhs_apis.get_likesAndcollects,
+            'connections': self.xhs_apis.get_new_connections,
+        }
+
+    def _event(self, type, stream, **kwargs):
+        return {'type': type, 'stream': stream, 'account': self.account, 'time': int(time.time() * 1000), **kwargs}
+
+    def _scope(self, stream: str):
+        return f'inbox:{self.account}:{stream}'
+
+    def get_state(self, stream: str):
+        """
+            返回一种消息保存的同步状态: newest_id / newest_time / known_ids / synced_at
+        """
+        scope = self._scope(stream)
+        return {key: self.store.get(scope, key) for key in ('newest_id', 'newest_time', 'known_ids', 'synced_at')}
+
+    def _save_state(self, stream: str, state: dict):
+        scope = self._scope(stream)
+        for key, value in state.items():
+            self.store.set(scope, key, value)
+
+    def fetch_new(self, stream: str):
+        """
+            取一种消息里上次同步之后的新消息
+            返回 (新消息列表 (新的在前), 请求的页数, 新的同步状态)
+        """
+        state = self.get_state(stream)
+        known_ids = set(state['known_ids'] or [])
+        newest_time = state['newest_time']
+        fetch = self._fetchers[stream]
+        cursor, pages, messages = '', 0, []
+        while pages < self.max_pages:
+            success, msg, res_json = fetch(cursor, self.cookies_str, self.proxies)
+            pages += 1
+            if not success:
+                raise Exception(msg)
+            data = res_json.get('data') or {}
+            reached_known = False
+            for message in data.get('message_list') or []:
+                message_id = str(message['id'])
+                # 消息按时间倒序: 已知消息或比最新已知消息更早的消息之后都是旧消息 (最新一条被删除时按时间判断)
+                if message_id in known_ids or (newest_time and message.get('time') and int(message['time']) < newest_time):
+                    reached_known = True
+                    break
+                messages.append(message)
+            if reached_known or not data.get('has_more') or 'cursor' not in data:
+                break
+            cursor = str(data['cursor'])
+        new_state = {'synced_at': int(time.time())}
+        if messages:
+            new_ids = [str(message['id']) for message in messages]
+            new_state['known_ids'] = (new_ids + (state['known_ids'] or []))[:self.KNOWN_KEPT]
+            new_state['newest_id'] = new_ids[0]
+            new_state['newest_time'] = max(int(message.get('time') or 0) for message in messages) or newest_time
+        return messages, pages, new_state
+
+    def sync(self):
+        """
+            所有消息类型并发同步一次, 产出事件
+        """
+        events = queue.Queue()
+        states = {}
+
+        def crawl(stream):
+            try:
+                messages, pages, states[stream] = self.fetch_new(stream)
+                for message in messages:
+                    events.put(self._event('new_message', stream, message_id=str(message['id']),
+                                           data=message_row(message, self.account, stream), raw=message))
+                events.put(self._event('stream_done', stream, new=len(messages), pages=pages))
+            except Exception as e:
+                events.put(self._event('error', stream, msg=str(e)))
+            finally:
+                events.put(_DONE)
+
+        pending = len(self.streams)
+        with ThreadPoolExecutor(max(1, pending), thread_name_prefix='inbox') as pool:
+            for stream in self.streams:
+                pool.submit(crawl, stream)
+            while pending:
+                event = events.get()
+                if event is _DONE:
+                    pending -= 1
+                    continue
+                yield event
+                if event['type'] == 'stream_done':
+                    # 调用方处理完这种消息的所有事件后才推进游标
+                    self._save_state(event['stream'], states.pop(event['stream']))
+
+    def export(self, paths: list, batch_size: int = 200):
+        """
+            同步一次并把新消息按批写入导出文件
+            :param paths: 导出文件, 按扩展名写入 .jsonl / .xlsx / .db (表 inbox_messages)
+            返回 success, msg, {消息类型: 新消息数, ..., 'errors': 错误数}
+        """
+        writers = [open_writer(path, FIELDS, HEADERS, table='inbox_messages', primary_key='message_id') for path in paths]
+        for writer in writers:
+            writer.open()
+        stats = {stream: 0 for stream in self.streams}
+        stats['errors'] = 0
+        success, msg, batch = True, '成功', []
+
+        def flush():
+            for writer in writers:
+                writer.write(batch)
+                writer.flush()
+            batch.clear()
+
+        try:
+            for event in self.sync():
+                if event['type'] == 'new_message':
+                    batch.append(event['data'])
+                    stats[event['stream']] += 1
+                    if len(batch) >= batch_size:
+                        flush()
+                elif event['type'] == 'stream_done':
+                    # 游标在这个事件之后保存, 先把这种消息的新行写出去
+                    if batch:
+                        flush()
+                elif event['type'] == 'error':
+                    stats['errors'] += 1
+                    logger.warning(f"同步消息 {event['stream']} 出错: {event['msg']}")
+        except Exception as e:
+            success, msg = False, str(e)
+        finally:
+            if batch:
+                flush()
+            for writer in writers:
+                writer.close()
+        logger.info(f'同步账号 {self.account} 的消息: {stats}')
+        return success, msg, stats
+
+    def run(self, interval: int = 300, rounds: int = None):
+        """
+            周期性同步, 作为一个无限事件流
+            :param interval: 两次同步之间的间隔 (秒)
+            :param rounds: 同步次数, None 为一直运行
+        """
+        round_index = 0
+        while rounds is None or round_index < rounds:
+            started = time.time()
+            yield from self.sync()
+            round_index += 1
+            if rounds is not None and round_index >= rounds:
+                break
+            time.sleep(max(0.0, interval - (time.time() - started)))
+
+
+if __name__ == '__main__':
+    from xhs_utils.common_util import init
+    cookies_str, base_path = init()
+    inbox = Inbox_Sync(cookies_str)
+    for event in inbox.run(interval=180):
+        logger.info(f"{event['type']} {event['stream']} {event.get('message_id', '')}")
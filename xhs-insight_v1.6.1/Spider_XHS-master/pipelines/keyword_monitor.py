@@ -0,0 +1,152 @@
+import time
+from loguru import logger
+from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils.data_util import handle_note_info
+from xhs_utils.state_util import StateStore
+
+
+class Keyword_Monitor():
+    """
+        关键词趋势监控
+        按 "最新" 排序周期性地搜索保存的关键词, 每个关键词维护已见过的笔记 id,
+        只有新笔记才会进入详情爬取和分析; 某一页全部是已知笔记时立即停止翻页
+        所有结果以事件流 (dict) 的形式产出:
+            {'type': 'new_note' | 'note_detail' | 'note_analyzed' | 'poll_done' | 'error', 'keyword': ..., ...}
+    """
+    SORT_LATEST = 1
+
+    def __init__(self, cookies_str: str, store: StateStore = None, xhs_apis: XHS_Apis = None,
+                 max_pages: int = 5, fetch_detail: bool = True, analyzer=None, proxies=None):
+        """
+            :param cookies_str: 你的cookies
+            :param store: 持久化状态, 默认 datas/state.db
+            :param max_pages: 每次轮询最多翻的页数 (首次轮询时所有笔记都是新的)
+            :param fetch_detail: 是否爬取新笔记的详情
+            :param analyzer: 可选, 对新笔记详情做分析的函数 analyzer(note_info) -> 结果
+        """
+        self.cookies_str = cookies_str
+        self.store = store if store is not None else StateStore()
+        self.xhs_apis = xhs_apis if xhs_apis is not None else XHS_Apis()
+        self.max_pages = max_pages
+        self.fetch_detail = fetch_detail
+        self.analyzer = analyzer
+        self.proxies = proxies
+
+    # ---------- 保存的搜索 ----------
+    def get_keywords(self):
+        return self.store.get('monitor', 'keywords', {})
+
+    def add_keyword(self, keyword: str, note_type=0, note_time=0, note_range=0):
+        """
+            保存一个需要监控的关键词及其筛选条件
+            :param note_type 笔记类型 0 不限, 1 视频笔记, 2 普通笔记
+            :param note_time 笔记时间 0 不限, 1 一天内, 2 一周内天, 3 半年内
+            :param note_range 笔记范围 0 不限, 1 已看过, 2 未看过, 3 已关注
+        """
+        keywords = self.get_keywords()
+        keywords[keyword] = {'note_type': note_type, 'note_time': note_time, 'note_range': note_range}
+        self.store.set('monitor', 'keywords', keywords)
+
+    def remove_keyword(self, keyword: str):
+        keywords = self.get_keywords()
+        keywords.pop(keyword, None)
+        self.store.set('monitor', 'keywords', keywords)
+
+    # ---------- 轮询 ----------
+    @staticmethod
+    def _event(type, keyword, **kwargs):
+        return {'type': type, 'keyword': keyword, 'time': int(time.time() * 1000), **kwargs}
+
+    def _crawl_detail(self, note):
+        note_url = f"https://www.xiaohongshu.com/explore/{note['id']}?xsec_token={note['xsec_token']}&xsec_source=pc_search"
+        success, msg, res_json = self.xhs_apis.get_note_info(note_url, self.cookies_str, self.proxies)
+        if not success:
+            raise Exception(msg)
+        note_info = res_json['data']['items'][0]
+        note_info['url'] = note_url
+        return handle_note_info(note_info)
+
+    def poll(self, keyword: str, filters: dict = None):
+        """
+            对一个关键词做一次增量轮询
+            :param keyword: 关键词
+            :param filters: add_keyword 保存的筛选条件
+            产出事件
+        """
+        filters = filters or self.get_keywords().get(keyword, {})
+        scope = f'search:{keyword}'
+        page, new_count, requests_count = 1, 0, 0
+        while page <= self.max_pages:
+            success, msg, res_json = self.xhs_apis.search_note(
+                keyword, self.cookies_str, page, self.SORT_LATEST,
+                filters.get('note_type', 0), filters.get('note_time', 0), filters.get('note_range', 0),
+                0, '', self.proxies
+            )
+            requests_count += 1
+            if not success:
+                yield self._event('error', keyword, page=page, msg=msg)
+                break
+            data = res_json.get('data') or {}
+            notes = [n for n in data.get('items', []) if n.get('model_type') == 'note']
+            unseen_ids = set(self.store.filter_unseen(scope, [n['id'] for n in notes]))
+            if not unseen_ids:
+                # 按最新排序, 一整页都是已知笔记说明后面都是旧的
+                break
+
+            for note in notes:
+                if note['id'] not in unseen_ids:
+                    continue
+                new_count += 1
+                yield self._event('new_note', keyword, note_id=note['id'], data=note)
+                if self.fetch_detail:
+                    try:
+                        note_info = self._crawl_detail(note)
+                        requests_count += 1
+                    except Exception as e:
+                        # 详情失败的不标记为已见, 下次轮询重试
+                        yield self._event('error', keyword, note_id=note['id'], msg=str(e))
+                        continue
+                    yield self._event('note_detail', keyword, note_id=note['id'], data=note_info)
+                    if self.analyzer is not None:
+                        try:
+                            yield self._event('note_analyzed', keyword, note_id=note['id'], data=self.analyzer(note_info))
+                        except Exception as e:
+                            yield self._event('error', keyword, note_id=note['id'], msg=str(e))
+                self.store.mark_seen(scope, [note['id']])
+
+            if not data.get('has_more'):
+                break
+            page += 1
+        logger.info(f'监控关键词 {keyword}: 新笔记 {new_count}, 请求数 {requests_count}')
+        yield self._event('poll_done', keyword, new_count=new_count, requests=requests_count)
+
+    def poll_all(self):
+        """
+            对所有保存的关键词轮询一次
+        """
+        for keyword, filters in self.get_keywords().items():
+            yield from self.poll(keyword, filters)
+
+    def run(self, interval: int = 300, rounds: int = None):
+        """
+            周期性轮询, 作为一个无限事件流
+            :param interval: 两次轮询之间的间隔 (秒)
+            :param rounds: 轮询次数, None 为一直运行
+        """
+        round_index = 0
+        while rounds is None or round_index < rounds:
+            started = time.time()
+            yield from self.poll_all()
+            round_index += 1
+            if rounds is not None and round_index >= rounds:
+                break
+            time.sleep(max(0.0, interval - (time.time() - started)))
+
+
+if __name__ == '__main__':
+    from xhs_utils.common_util import init
+    cookies_str, base_path = init()
+    monitor = Keyword_Monitor(cookies_str)
+    monitor.add_keyword('榴莲')
+    for event in monitor.run(interval=600):
+        logger.info(f"{event['type']} {event['keyword']} {event.get('note_id', '')}")
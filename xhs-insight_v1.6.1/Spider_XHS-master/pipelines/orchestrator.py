@@ -0,0 +1,361 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from loguru import logger
+from xhs_utils.queue_util import Job_Queue, DEFAULT_QUEUE_PATH, JOB_TYPES
+
+DEFAULT_OUTPUT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../datas/crawl.db'))
+DEFAULT_MEDIA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../datas/media_datas'))
+
+NOTE_URL = 'https://www.xiaohongshu.com/explore/{note_id}?xsec_token={xsec_token}&xsec_source={source}'
+
+
+class Crawl_Worker():
+    """
+        一个工作进程: 循环从任务队列领取任务并执行
+        - 每个进程有自己的 XHS_Apis (签名上下文缓存、连接池) 和限速器, 互不共享状态
+        - 执行期间后台线程按 lease / 3 的间隔续租; 进程崩溃后租约过期, 任务由其他进程重新执行
+        - search / user 任务把结果展开成 note 任务, note 任务按 payload 里的 comments / media 继续展开
+        - 笔记和评论写入 output_path (sqlite) 的 notes / comments 表, 按 id upsert, 任务重复执行不会产生重复行
+    """
+    def __init__(self, worker_id: str, cookies_str: str, queue_path: str = DEFAULT_QUEUE_PATH,
+                 output_path: str = DEFAULT_OUTPUT_PATH, media_path: str = DEFAULT_MEDIA_PATH, types: list = None,
+                 lease: float = 60.0, rate_share: float = 1.0, poll_interval: float = 1.0, proxies=None):
+        """
+            :param worker_id: 工作进程标识, 记录在任务的租约里
+            :param types: 只执行这些类型的任务, None 为全部
+            :param lease: 租约秒数
+            :param rate_share: 本进程分到的请求速率比例, N 个进程时为 1 / N, 整机速率和单进程一致; 0 为不限速
+            :param poll_interval: 队列为空时的等待秒数
+        """
+        self.worker_id = worker_id
+        self.cookies_str = cookies_str
+        self.queue_path = queue_path
+        self.output_path = output_path
+        self.media_path = media_path
+        self.types = types
+        self.lease = lease
+        self.rate_share = rate_share
+        self.poll_interval = poll_interval
+        self.proxies = proxies
+        self.handlers = {
+            'search': self._handle_search,
+            'user': self._handle_user,
+            'note': self._handle_note,
+            'comments': self._handle_comments,
+            'media': self._handle_media,
+        }
+
+    def setup(self):
+        # 在子进程里创建, 连接和签名上下文不跨进程
+        from apis.xhs_pc_apis import XHS_Apis
+        from xhs_utils.export_util import SQLite_Writer
+        from xhs_utils.rate_limit_util import Rate_Limiter
+        from xhs_utils.record_util import Note
+
+        rate_limiter = False
+        if self.rate_share:
+            # Rate_Limiter 默认速率按进程数平分
+            rate_limiter = Rate_Limiter(global_rate=10.0 * self.rate_share, cookie_rate=2.0 * self.rate_share,
+                                        proxy_rate=5.0 * self.rate_share)
+        self.xhs_apis = XHS_Apis(rate_limiter=rate_limiter)
+        self.queue = Job_Queue(self.queue_path)
+        self.notes = SQLite_Writer(self.output_path, Note.FIELDS, table='notes', primary_key='note_id').open()
+        return self
+
+    def close(self):
+        self.notes.close()
+        self.queue.close()
+
+    # ---------- 任务 ----------
+    @staticmethod
+    def _fan_out_options(payload):
+        return {'comments': payload.get('comments', False), 'media': payload.get('media', False)}
+
+    def _queue_notes(self, notes, options):
+        jobs = [{'type': 'note', 'payload': {'url': url, **options}, 'dedupe_key': f'note:{note_id}'} for note_id, url in notes]
+        return self.queue.put_many(jobs)
+
+    def _handle_search(self, payload):
+        success, msg, notes = self.xhs_apis.search_some_note(
+            payload['query'], payload.get('require_num', 20), self.cookies_str, payload.get('sort_type', 0),
+            payload.get('note_type', 0), payload.get('note_time', 0), payload.get('note_range', 0), 0, None, self.proxies
+        )
+        if not success:
+            raise Exception(msg)
+        notes = [(n['id'], NOTE_URL.format(note_id=n['id'], xsec_token=n['xsec_token'], source='pc_search'))
+                 for n in notes if n.get('model_type') == 'note']
+        return {'notes': len(notes), 'queued': self._queue_notes(notes, self._fan_out_options(payload))}
+
+    def _handle_user(self, payload):
+        success, msg, notes = self.xhs_apis.get_user_all_notes(payload['url'], self.cookies_str, self.proxies)
+        if not success:
+            raise Exception(msg)
+        notes = [(n['note_id'], NOTE_URL.format(note_id=n['note_id'], xsec_token=n['xsec_token'], source='pc_user')) for n in notes]
+        return {'notes': len(notes), 'queued': self._queue_notes(notes, self._fan_out_options(payload))}
+
+    def _handle_note(self, payload):
+        from xhs_utils.record_util import Note
+
+        url = payload['url']
+        success, msg, res_json = self.xhs_apis.get_note_info(url, self.cookies_str, self.proxies)
+        if not success:
+            raise Exception(msg)
+        note_info = res_json['data']['items'][0]
+        note_info['url'] = url
+        note = Note.from_raw(note_info).to_dict()
+        self.notes.write([note])
+        self.notes.flush()
+        if payload.get('media'):
+            self.queue.put('media', {'note': note, 'save_choice': 'media'}, dedupe_key=f"media:{note['note_id']}")
+        if payload.get('comments'):
+            self.queue.put('comments', {'url': url}, dedupe_key=f"comments:{note['note_id']}")
+        return {'note_id': note['note_id']}
+
+    def _handle_comments(self, payload):
+        from pipelines.comment_export import Comment_Exporter
+
+        exporter = Comment_Exporter(self.cookies_str, xhs_apis=self.xhs_apis, proxies=self.proxies)
+        success, msg, result = exporter.export(payload['url'], [self.output_path])
+        if not success:
+            raise Exception(msg)
+        return result
+
+    def _handle_media(self, payload):
+        from xhs_utils.data_util import download_note
+
+        return {'path': download_note(payload['note'], self.media_path, payload.get('save_choice', 'media'))}
+
+    # ---------- 执行 ----------
+    def _keep_alive(self, job, done: threading.Event):
+        while not done.wait(self.lease / 3):
+            if not self.queue.heartbeat(job.id, self.worker_id, self.lease):
+                logger.warning(f'{self.worker_id} 失去任务 {job} 的租约, 结果将被丢弃')
+                return
+
+    def run_job(self, job):
+        """
+            执行一个已领取的任务并提交结果, 返回是否成功
+        """
+        done = threading.Event()
+        keep_alive = threading.Thread(target=self._keep_alive, args=(job, done), daemon=True)
+        keep_alive.start()
+        try:
+            result = self.handlers[job.type](job.payload)
+        except Exception as e:
+            logger.warning(f'{self.worker_id} 执行 {job} 失败: {e}')
+            self.queue.fail(job.id, self.worker_id, str(e))
+            return False
+        finally:
+            done.set()
+            keep_alive.join()
+        self.queue.complete(job.id, self.worker_id, result)
+        return True
+
+    def run(self, stop_event=None, until_idle: bool = False):
+        """
+            :param stop_event: 设置后执行完当前任务即退出
+            :param until_idle: 队列里没有可领取的任务时退出
+            返回执行的任务数
+        """
+        self.setup()
+        count = 0
+        try:
+            while stop_event is None or not stop_event.is_set():
+                job = self.queue.claim(self.worker_id, self.lease, self.types)
+                if job is None:
+                    if until_idle:
+                        break
+                    if stop_event is not None:
+                        stop_event.wait(self.poll_interval)
+                    else:
+                        time.sleep(self.poll_interval)
+                    continue
+                self.run_job(job)
+                count += 1
+        finally:
+            self.close()
+        logger.info(f'{self.worker_id} 退出, 共执行 {count} 个任务')
+        return count
+
+
+def _worker_main(options: dict, stop_event):
+    Crawl_Worker(**options).run(stop_event)
+
+
+class Crawl_Orchestrator():
+    """
+        多进程爬取调度
+        - 任务持久化在 sqlite 队列里, 重启之后未完成的任务继续执行, 已完成的不会重复执行
+        - 启动 workers 个工作进程, 每个进程平分限速器的速率; 进程异常退出时重新拉起
+        - 任务按类型优先级执行 (queue_util.DEFAULT_PRIORITIES), 入队时可以单独指定
+    """
+    def __init__(self, cookies_str: str, queue_path: str = DEFAULT_QUEUE_PATH, output_path: str = DEFAULT_OUTPUT_PATH,
+                 media_path: str = DEFAULT_MEDIA_PATH, workers: int = None, lease: float = 60.0, types: list = None,
+                 rate_limit: bool = True, proxies=None):
+        """
+            :param cookies_str: 你的cookies
+            :param workers: 工作进程数, 默认为 cpu 核数
+            :param types: 工作进程只执行这些类型的任务, None 为全部
+            :param rate_limit: 是否限速
+        """
+        self.cookies_str = cookies_str
+        self.queue_path = queue_path
+        self.output_path = output_path
+        self.media_path = media_path
+        self.workers = workers or os.cpu_count() or 1
+        self.lease = lease
+        self.types = types
+        self.rate_limit = rate_limit
+        self.proxies = proxies
+        self.queue = Job_Queue(queue_path)
+
+    # ---------- 入队 ----------
+    def add_note(self, url: str, comments: bool = False, media: bool = False, priority: int = None):
+        return self.queue.put('note', {'url': url, 'comments': comments, 'media': media}, priority)
+
+    def add_user(self, url: str, comments: bool = False, media: bool = False, priority: int = None):
+        return self.queue.put('user', {'url': url, 'comments': comments, 'media': media}, priority)
+
+    def add_search(self, query: str, require_num: int = 20, sort_type: int = 0, note_type: int = 0, note_time: int = 0,
+                   note_range: int = 0, comments: bool = False, media: bool = False, priority: int = None):
+        """
+            :param sort_type 排序方式 0 综合排序, 1 最新, 2 最多点赞, 3 最多评论, 4 最多收藏
+            :param note_type 笔记类型 0 不限, 1 视频笔记, 2 普通笔记
+            :param note_time 笔记时间 0 不限, 1 一天内, 2 一周内天, 3 半年内
+            :param note_range 笔记范围 0 不限, 1 已看过, 2 未看过, 3 已关注
+        """
+        payload = {'query': query, 'require_num': require_num, 'sort_type': sort_type, 'note_type': note_type,
+                   'note_time': note_time, 'note_range': note_range, 'comments': comments, 'media': media}
+        return self.queue.put('search', payload, priority)
+
+    def add_comments(self, url: str, priority: int = None):
+        return self.queue.put('comments', {'url': url}, priority)
+
+    # ---------- 运行 ----------
+    def _worker_options(self, index):
+        return {
+            'worker_id': f'{socket.gethostname()}-{os.getpid()}-{index}',
+            'cookies_str': self.cookies_str,
+            'queue_path': self.queue_path,
+            'output_path': self.output_path,
+            'media_path': self.media_path,
+            'types': self.types,
+            'lease': self.lease,
+            'rate_share': 1.0 / self.workers if self.rate_limit else 0,
+            'proxies': self.proxies,
+        }
+
+    def run(self, until_idle: bool = True, poll_interval: float = 1.0):
+        """
+            启动工作进程并监控, Ctrl+C 时等当前任务执行完再退出
+            :param until_idle: 队列里的任务全部结束后退出, False 为一直运行等待新任务
+            返回队列统计 queue.stats()
+        """
+        # spawn: 子进程不继承父进程的连接和线程
+        context = multiprocessing.get_context('spawn')
+        stop_event = context.Event()
+        processes = {}
+
+        def start(index):
+            process = context.Process(target=_worker_main, args=(self._worker_options(index), stop_event),
+                                      name=f'crawl-worker-{index}', daemon=True)
+            process.start()
+            processes[index] = process
+
+        for index in range(self.workers):
+            start(index)
+        logger.info(f'启动 {self.workers} 个工作进程, 队列 {self.queue_path}')
+        try:
+            while True:
+                time.sleep(poll_interval)
+                requeued = self.queue.requeue_expired()
+                if requeued:
+                    logger.warning(f'{requeued} 个任务租约过期, 已重新入队')
+                for index, process in list(processes.items()):
+                    if not process.is_alive():
+                        logger.warning(f'工作进程 {process.name} 退出 (exitcode {process.exitcode}), 重新启动')
+                        start(index)
+                if until_idle and self.queue.pending() == 0:
+                    break
+        except KeyboardInterrupt:
+            logger.info('收到中断, 等待当前任务完成')
+        finally:
+            stop_event.set()
+            for process in processes.values():
+                process.join()
+        stats = self.queue.stats()
+        logger.info(f'调度结束: {stats}')
+        return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m pipelines.orchestrator', description='多进程爬取调度')
+    parser.add_argument('--queue', default=DEFAULT_QUEUE_PATH, help='任务队列文件')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT_PATH, help='笔记 / 评论写入的 sqlite 文件')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def fan_out(sub):
+        sub.add_argument('--comments', action='store_true', help='同时爬取评论')
+        sub.add_argument('--media', action='store_true', help='同时下载图片和视频')
+        sub.add_argument('--priority', type=int, default=None)
+
+    sub = commands.add_parser('add-note', help='添加笔记任务')
+    sub.add_argument('urls', nargs='+')
+    fan_out(sub)
+    sub = commands.add_parser('add-user', help='添加用户全部笔记任务')
+    sub.add_argument('urls', nargs='+')
+    fan_out(sub)
+    sub = commands.add_parser('add-search', help='添加搜索任务')
+    sub.add_argument('query')
+    sub.add_argument('--num', type=int, default=20, help='搜索的数量')
+    sub.add_argument('--sort', type=int, default=0, help='0 综合排序, 1 最新, 2 最多点赞, 3 最多评论, 4 最多收藏')
+    sub.add_argument('--note-type', type=int, default=0, help='0 不限, 1 视频笔记, 2 普通笔记')
+    fan_out(sub)
+    sub = commands.add_parser('add-comments', help='添加评论任务')
+    sub.add_argument('urls', nargs='+')
+    sub.add_argument('--priority', type=int, default=None)
+    sub = commands.add_parser('run', help='启动工作进程')
+    sub.add_argument('--workers', type=int, default=None, help='工作进程数, 默认为 cpu 核数')
+    sub.add_argument('--types', default=None, help=f'只执行这些类型的任务, 逗号分隔: {",".join(JOB_TYPES)}')
+    sub.add_argument('--lease', type=float, default=60.0, help='租约秒数')
+    sub.add_argument('--forever', action='store_true', help='队列为空时继续等待新任务')
+    commands.add_parser('stats', help='查看队列统计')
+    sub = commands.add_parser('retry', help='把失败的任务重新入队')
+    sub.add_argument('--type', default=None)
+    args = parser.parse_args(argv)
+
+    if args.command in ('stats', 'retry'):
+        queue = Job_Queue(args.queue)
+        if args.command == 'stats':
+            for type, counts in sorted(queue.stats().items()):
+                print(type, ' '.join(f'{status}={count}' for status, count in sorted(counts.items())))
+        else:
+            print(f'重新入队 {queue.retry_failed(args.type)} 个任务')
+        return
+
+    from xhs_utils.common_util import load_env
+    orchestrator = Crawl_Orchestrator(
+        load_env(), args.queue, args.output, workers=getattr(args, 'workers', None), lease=getattr(args, 'lease', 60.0),
+        types=args.types.split(',') if getattr(args, 'types', None) else None,
+    )
+    if args.command == 'add-note':
+        ids = [orchestrator.add_note(url, args.comments, args.media, args.priority) for url in args.urls]
+    elif args.command == 'add-user':
+        ids = [orchestrator.add_user(url, args.comments, args.media, args.priority) for url in args.urls]
+    elif args.command == 'add-search':
+        ids = [orchestrator.add_search(args.query, args.num, args.sort, args.note_type, comments=args.comments,
+                                       media=args.media, priority=args.priority)]
+    elif args.command == 'add-comments':
+        ids = [orchestrator.add_comments(url, args.priority) for url in args.urls]
+    else:
+        orchestrator.run(until_idle=not args.forever)
+        return
+    print(f'已入队任务: {ids}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import urllib.parse
+from loguru import logger
+from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils.data_util import handle_note_info
+from xhs_utils.state_util import StateStore
+
+
+class User_Sync():
+    """
+        用户主页增量同步
+        记住每个用户最近的笔记id, 翻页遇到已知笔记即停止, 只爬取新笔记的详情,
+        并刷新最近 recent_window 篇已知笔记的互动数据
+        xsec_token 会过期: 已知笔记优先使用这次翻到的页面上的 token, 页面上没有时才用保存的 token
+    """
+    # 保存的最近笔记数量, 用来判断停止位置 (最新一篇被删除时仍然能停下)
+    KNOWN_NOTES_KEPT = 30
+
+    def __init__(self, cookies_str: str, store: StateStore = None, xhs_apis: XHS_Apis = None, recent_window: int = 5, proxies=None):
+        """
+            :param cookies_str: 你的cookies
+            :param store: 持久化状态, 默认 datas/state.db
+            :param recent_window: 每次同步刷新互动数据的最近已知笔记数量, 0 为不刷新
+        """
+        self.cookies_str = cookies_str
+        self.store = store if store is not None else StateStore()
+        self.xhs_apis = xhs_apis if xhs_apis is not None else XHS_Apis()
+        self.recent_window = recent_window
+        self.proxies = proxies
+
+    @staticmethod
+    def parse_user_id(user_url: str):
+        return urllib.parse.urlparse(user_url).path.split("/")[-1]
+
+    def get_newest_note_id(self, user_id: str):
+        return self.store.get(f'user:{user_id}', 'newest_note_id')
+
+    def _note_detail(self, note_id: str, xsec_token: str):
+        note_url = f"https://www.xiaohongshu.com/explore/{note_id}?xsec_token={xsec_token}&xsec_source=pc_user"
+        success, msg, res_json = self.xhs_apis.get_note_info(note_url, self.cookies_str, self.proxies)
+        if not success:
+            raise Exception(msg)
+        note_info = res_json['data']['items'][0]
+        note_info['url'] = note_url
+        return handle_note_info(note_info)
+
+    def sync(self, user_url: str):
+        """
+            增量同步一个用户
+            :param user_url: 用户主页url (带 xsec_token)
+            返回 success, msg, {'new': 新笔记详情列表, 'refreshed': 刷新的已知笔记详情列表}
+        """
+        result = {'new': [], 'refreshed': []}
+        user_id = self.parse_user_id(user_url)
+        scope = f'user:{user_id}'
+        known_notes = self.store.get(scope, 'known_notes', [])
+        known_ids = {note['note_id'] for note in known_notes}
+
+        page_tokens = {}
+        success, msg, notes = self.xhs_apis.get_user_all_notes(user_url, self.cookies_str, self.proxies, stop_note_ids=known_ids,
+                                                               xsec_tokens=page_tokens)
+        if not success:
+            return False, msg, result
+        known_notes = [{**note, 'xsec_token': page_tokens.get(note['note_id'], note['xsec_token'])} for note in known_notes]
+        new_notes = [
+            {'note_id': note['note_id'], 'xsec_token': note['xsec_token'], 'sticky': bool(note.get('interact_info', {}).get('sticky'))}
+            for note in notes if note['note_id'] not in known_ids
+        ]
+
+        try:
+            for note in new_notes:
+                result['new'].append(self._note_detail(note['note_id'], note['xsec_token']))
+        except Exception as e:
+            # 有新笔记没爬到就不推进游标, 下次从头再同步这些新笔记
+            return False, str(e), result
+
+        for note in known_notes[:self.recent_window]:
+            try:
+                result['refreshed'].append(self._note_detail(note['note_id'], note['xsec_token']))
+            except Exception as e:
+                logger.warning(f'刷新笔记 {note["note_id"]} 失败: {e}')
+
+        merged = (new_notes + known_notes)[:self.KNOWN_NOTES_KEPT]
+        if merged:
+            self.store.set(scope, 'known_notes', merged)
+            newest = next((note for note in merged if not note.get('sticky')), merged[0])
+            self.store.set(scope, 'newest_note_id', newest['note_id'])
+        logger.info(f'同步用户 {user_id}: 新笔记 {len(result["new"])}, 刷新 {len(result["refreshed"])}')
+        return True, '成功', result
@@ -92,7 +92,8 @@ function b64CustomEncode(s) {
 function buildContentString(method, uri, payload) {
   payload = payload || {};
   if (method === "POST") {
-    return uri + JSON.stringify(payload);
+    // python 端已经序列化好的请求体原样参与签名, 保证签名的就是发送的字节
+    return uri + (typeof payload === "string" ? payload : JSON.stringify(payload));
   }
   const entries = Object.entries(payload);
   if (!entries.length) return uri;
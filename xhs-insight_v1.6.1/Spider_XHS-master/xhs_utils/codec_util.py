@@ -0,0 +1,92 @@
+"""
+    JSON 编解码层, 请求体、响应和导出统一经过这里
+    - 有 orjson / msgspec 时用它们, 否则用标准库 json, 输出格式一致: 紧凑分隔符、中文不转义、utf-8
+    - dumps 直接返回 bytes: 签名和发送用的是同一份序列化结果
+    - loads 直接解析响应的 bytes, 不先解码成 str
+    环境变量 XHS_JSON_CODEC 或 set_codec() 可以指定后端 (orjson / msgspec / json)
+"""
+import json
+import os
+
+
+class Codec():
+    name = 'json'
+
+    def dumps(self, obj) -> bytes:
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class Orjson_Codec(Codec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        # 和标准库一样允许 int 等非字符串键
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj) -> bytes:
+        return self._orjson.dumps(obj, option=self._option)
+
+    def loads(self, data):
+        # orjson.JSONDecodeError 是 ValueError 的子类
+        return self._orjson.loads(data)
+
+
+class Msgspec_Codec(Codec):
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+        self._encoder = msgspec.json.Encoder()
+        self._decoder = msgspec.json.Decoder()
+        self._error = msgspec.DecodeError
+
+    def dumps(self, obj) -> bytes:
+        return self._encoder.encode(obj)
+
+    def loads(self, data):
+        try:
+            return self._decoder.decode(data)
+        except self._error as e:
+            raise ValueError(str(e)) from e
+
+
+CODECS = {'orjson': Orjson_Codec, 'msgspec': Msgspec_Codec, 'json': Codec}
+
+
+def make_codec(name: str = None) -> Codec:
+    """
+        :param name: 指定后端, None 时按 orjson -> msgspec -> json 选第一个可用的
+    """
+    if name:
+        return CODECS[name]()
+    for cls in CODECS.values():
+        try:
+            return cls()
+        except ImportError:
+            continue
+
+
+codec = make_codec(os.environ.get('XHS_JSON_CODEC') or None)
+
+
+def set_codec(name: str = None):
+    global codec
+    codec = make_codec(name)
+    return codec
+
+
+def dumps(obj) -> bytes:
+    return codec.dumps(obj)
+
+
+def dumps_str(obj) -> str:
+    return codec.dumps(obj).decode('utf-8')
+
+
+def loads(data):
+    return codec.loads(data)
@@ -1,11 +1,12 @@
 import json
 import os
 import re
-import time
-import openpyxl
 import requests
 from loguru import logger
 from retry import retry
+# 互动数 / 时间的转换只依赖标准库, 放在 norm_util, API 和 record_util 都从那里导入
+from xhs_utils.norm_util import COUNT_UNITS, COUNT_RE, norm_count, norm_counts, timestamp_to_str
+from xhs_utils.record_util import Comment, Note, User
 
 
 def norm_str(str):
@@ -18,172 +19,47 @@ def norm_text(text):
     return text
 
 
-def timestamp_to_str(timestamp):
-    time_local = time.localtime(timestamp / 1000)
-    dt = time.strftime("%Y-%m-%d %H:%M:%S", time_local)
-    return dt
+NOTE_COUNT_FIELDS = ('liked_count', 'collected_count', 'comment_count', 'share_count')
+COMMENT_COUNT_FIELDS = ('like_count', 'sub_comment_count')
+USER_COUNT_FIELDS = ('follows', 'fans', 'interaction')
+
+def normalize_counts(records, fields):
+    """
+        批量把一组字典中的互动数字段转换为整数 (原地修改)
+        :param records: handle_note_info / handle_comment_info / handle_user_info 的结果列表
+        :param fields: 需要转换的字段, 如 NOTE_COUNT_FIELDS
+        返回 records
+    """
+    if isinstance(records, dict):
+        records = [records]
+    for field in fields:
+        present = [record for record in records if field in record]
+        for record, value in zip(present, norm_counts([record[field] for record in present])):
+            record[field] = value
+    return records
 
 def handle_user_info(data, user_id):
-    home_url = f'https://www.xiaohongshu.com/user/profile/{user_id}'
-    nickname = data['basic_info']['nickname']
-    avatar = data['basic_info']['imageb']
-    red_id = data['basic_info']['red_id']
-    gender = data['basic_info']['gender']
-    if gender == 0:
-        gender = '男'
-    elif gender == 1:
-        gender = '女'
-    else:
-        gender = '未知'
-    ip_location = data['basic_info']['ip_location']
-    desc = data['basic_info']['desc']
-    follows = data['interactions'][0]['count']
-    fans = data['interactions'][1]['count']
-    interaction = data['interactions'][2]['count']
-    tags_temp = data['tags']
-    tags = []
-    for tag in tags_temp:
-        try:
-            tags.append(tag['name'])
-        except:
-            pass
-    return {
-        'user_id': user_id,
-        'home_url': home_url,
-        'nickname': nickname,
-        'avatar': avatar,
-        'red_id': red_id,
-        'gender': gender,
-        'ip_location': ip_location,
-        'desc': desc,
-        'follows': follows,
-        'fans': fans,
-        'interaction': interaction,
-        'tags': tags,
-    }
+    # 字段解析在 record_util.User, 这里返回和原来一样的字典
+    return User.from_raw(data, user_id).to_dict()
 
 def handle_note_info(data):
-    note_id = data['id']
-    note_url = data['url']
-    note_type = data['note_card']['type']
-    if note_type == 'normal':
-        note_type = '图集'
-    else:
-        note_type = '视频'
-    user_id = data['note_card']['user']['user_id']
-    home_url = f'https://www.xiaohongshu.com/user/profile/{user_id}'
-    nickname = data['note_card']['user']['nickname']
-    avatar = data['note_card']['user']['avatar']
-    title = data['note_card']['title']
-    if title.strip() == '':
-        title = f'无标题'
-    desc = data['note_card']['desc']
-    liked_count = data['note_card']['interact_info']['liked_count']
-    collected_count = data['note_card']['interact_info']['collected_count']
-    comment_count = data['note_card']['interact_info']['comment_count']
-    share_count = data['note_card']['interact_info']['share_count']
-    image_list_temp = data['note_card']['image_list']
-    image_list = []
-    for image in image_list_temp:
-        try:
-            image_list.append(image['info_list'][1]['url'])
-            # success, msg, img_url = XHS_Apis.get_note_no_water_img(image['info_list'][1]['url'])
-            # image_list.append(img_url)
-        except:
-            pass
-    if note_type == '视频':
-        video_cover = image_list[0]
-        video_addr = 'https://sns-video-bd.xhscdn.com/' + data['note_card']['video']['consumer']['origin_video_key']
-        # success, msg, video_addr = XHS_Apis.get_note_no_water_video(note_id)
-    else:
-        video_cover = None
-        video_addr = None
-    tags_temp = data['note_card']['tag_list']
-    tags = []
-    for tag in tags_temp:
-        try:
-            tags.append(tag['name'])
-        except:
-            pass
-    upload_time = timestamp_to_str(data['note_card']['time'])
-    if 'ip_location' in data['note_card']:
-        ip_location = data['note_card']['ip_location']
-    else:
-        ip_location = '未知'
-    return {
-        'note_id': note_id,
-        'note_url': note_url,
-        'note_type': note_type,
-        'user_id': user_id,
-        'home_url': home_url,
-        'nickname': nickname,
-        'avatar': avatar,
-        'title': title,
-        'desc': desc,
-        'liked_count': liked_count,
-        'collected_count': collected_count,
-        'comment_count': comment_count,
-        'share_count': share_count,
-        'video_cover': video_cover,
-        'video_addr': video_addr,
-        'image_list': image_list,
-        'tags': tags,
-        'upload_time': upload_time,
-        'ip_location': ip_location,
-    }
+    return Note.from_raw(data).to_dict()
 
 def handle_comment_info(data):
-    note_id = data['note_id']
-    note_url = data['note_url']
-    comment_id = data['id']
-    user_id = data['user_info']['user_id']
-    home_url = f'https://www.xiaohongshu.com/user/profile/{user_id}'
-    nickname = data['user_info']['nickname']
-    avatar = data['user_info']['image']
-    content = data['content']
-    show_tags = data['show_tags']
-    like_count = data['like_count']
-    upload_time = timestamp_to_str(data['create_time'])
-    try:
-        ip_location = data['ip_location']
-    except:
-        ip_location = '未知'
-    pictures = []
-    try:
-        pictures_temp = data['pictures']
-        for picture in pictures_temp:
-            try:
-                pictures.append(picture['info_list'][1]['url'])
-                # success, msg, img_url = XHS_Apis.get_note_no_water_img(picture['info_list'][1]['url'])
-                # pictures.append(img_url)
-            except:
-                pass
-    except:
-        pass
-    return {
-        'note_id': note_id,
-        'note_url': note_url,
-        'comment_id': comment_id,
-        'user_id': user_id,
-        'home_url': home_url,
-        'nickname': nickname,
-        'avatar': avatar,
-        'content': content,
-        'show_tags': show_tags,
-        'like_count': like_count,
-        'upload_time': upload_time,
-        'ip_location': ip_location,
-        'pictures': pictures,
-    }
+    return Comment.from_raw(data).to_dict()
+
+XLSX_HEADERS = {
+    'note': ['笔记id', '笔记url', '笔记类型', '用户id', '用户主页url', '昵称', '头像url', '标题', '描述', '点赞数量', '收藏数量', '评论数量', '分享数量', '视频封面url', '视频地址url', '图片地址url列表', '标签', '上传时间', 'ip归属地'],
+    'user': ['用户id', '用户主页url', '用户名', '头像url', '小红书号', '性别', 'ip地址', '介绍', '关注数量', '粉丝数量', '作品被赞和收藏数量', '标签'],
+    'comment': ['笔记id', '笔记url', '评论id', '用户id', '用户主页url', '昵称', '头像url', '评论内容', '评论标签', '点赞数量', '上传时间', 'ip归属地', '图片地址url列表'],
+}
+
 def save_to_xlsx(datas, file_path, type='note'):
+    # openpyxl 导入要一百多毫秒, 只有真正导出 excel 时才加载
+    import openpyxl
     wb = openpyxl.Workbook()
     ws = wb.active
-    if type == 'note':
-        headers = ['笔记id', '笔记url', '笔记类型', '用户id', '用户主页url', '昵称', '头像url', '标题', '描述', '点赞数量', '收藏数量', '评论数量', '分享数量', '视频封面url', '视频地址url', '图片地址url列表', '标签', '上传时间', 'ip归属地']
-    elif type == 'user':
-        headers = ['用户id', '用户主页url', '用户名', '头像url', '小红书号', '性别', 'ip地址', '介绍', '关注数量', '粉丝数量', '作品被赞和收藏数量', '标签']
-    else:
-        headers = ['笔记id', '笔记url', '评论id', '用户id', '用户主页url', '昵称', '头像url', '评论内容', '评论标签', '点赞数量', '上传时间', 'ip归属地', '图片地址url列表']
+    headers = XLSX_HEADERS.get(type, XLSX_HEADERS['comment'])
     ws.append(headers)
     for data in datas:
         data = {k: norm_text(str(v)) for k, v in data.items()}
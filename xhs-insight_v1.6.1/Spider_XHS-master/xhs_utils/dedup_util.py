@@ -0,0 +1,340 @@
+import hashlib
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+
+"""
+    已见 id 的集合, 用于跨频道 / 跨轮次 / 跨运行去重
+    - Seen_Set: 精确集合, 适合一次性的小规模爬取
+    - Bloom_Filter: 固定大小的位数组, 百万级 id 只占几 MB; 有 error_rate 的误判率 (新 id 被当成已见), 不会漏判
+      传 path 时位数组放在 mmap 映射的文件里, 由操作系统按页换入换出, 进程重启后继续使用
+    - Scalable_Bloom_Filter: 装满后追加一个容量翻倍、误判率减半的 Bloom_Filter, 总误判率仍不超过 error_rate
+    - Dedup_Service: 按 scope ("note" "comment" "feed" ...) 管理上面的集合
+    接口相同: add(id) / add_many(ids) 返回是否为新 id, `id in seen` / contains_many(ids) 判断是否见过, 都是线程安全的
+"""
+
+_HEADER = struct.Struct('<8sIIQQQd')
+_MAGIC = b'XHSBLOOM'
+_VERSION = 1
+
+
+class Seen_Set():
+    def __init__(self):
+        self._items = set()
+        self._lock = threading.Lock()
+
+    def add(self, item_id: str):
+        with self._lock:
+            if item_id in self._items:
+                return False
+            self._items.add(item_id)
+            return True
+
+    def add_many(self, item_ids):
+        items = self._items
+        result = []
+        with self._lock:
+            for item_id in item_ids:
+                new = item_id not in items
+                if new:
+                    items.add(item_id)
+                result.append(new)
+        return result
+
+    def contains_many(self, item_ids):
+        return [item_id in self._items for item_id in item_ids]
+
+    def __contains__(self, item_id):
+        return item_id in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class Bloom_Filter():
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.001, path: str = None):
+        """
+            :param capacity: 预计的 id 数量, 超过后误判率会上升
+            :param error_rate: 达到 capacity 时的误判率
+            :param path: 持久化文件, 已存在时读取文件里的参数 (忽略 capacity / error_rate), None 为只在内存里
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._mmap = None
+        if path is not None and os.path.exists(path):
+            self._open(path)
+            return
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.count = 0
+        nbytes = (self.size + 7) // 8
+        if path is None:
+            self.bits = bytearray(nbytes)
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(self._header())
+            f.truncate(_HEADER.size + nbytes)
+        self._open(path)
+
+    def _header(self):
+        return _HEADER.pack(_MAGIC, _VERSION, self.hashes, self.size, self.capacity, self.count, self.error_rate)
+
+    def _open(self, path):
+        self._file = open(path, 'r+b')
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        magic, version, self.hashes, self.size, self.capacity, self.count, self.error_rate = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f'不是 Bloom 过滤器文件: {path}')
+        # 位数组直接是文件映射的一段, 读写不经过 Python 对象
+        self.bits = memoryview(self._mmap)[_HEADER.size:]
+
+    def _positions(self, item_id: str):
+        # 一次 blake2b 得到两个 64 位哈希, 双重哈希 h1 + i * h2 生成 k 个位置, 这里只返回起点和步长
+        digest = hashlib.blake2b(item_id.encode('utf-8'), digest_size=16).digest()
+        size = self.size
+        return int.from_bytes(digest[:8], 'little') % size, (int.from_bytes(digest[8:], 'little') | 1) % size
+
+    def _add(self, positions):
+        bits, size = self.bits, self.size
+        p, step = positions
+        new = False
+        for _ in range(self.hashes):
+            mask = 1 << (p & 7)
+            if not bits[p >> 3] & mask:
+                bits[p >> 3] |= mask
+                new = True
+            p += step
+            if p >= size:
+                p -= size
+        if new:
+            self.count += 1
+        return new
+
+    def _contains(self, positions):
+        bits, size = self.bits, self.size
+        p, step = positions
+        for _ in range(self.hashes):
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+            p += step
+            if p >= size:
+                p -= size
+        return True
+
+    def add(self, item_id: str):
+        positions = self._positions(item_id)
+        with self._lock:
+            return self._add(positions)
+
+    def add_many(self, item_ids):
+        # 哈希在锁外计算, 整批只加一次锁
+        positions = [self._positions(i) for i in item_ids]
+        with self._lock:
+            return [self._add(p) for p in positions]
+
+    def contains_many(self, item_ids):
+        return [self._contains(self._positions(i)) for i in item_ids]
+
+    def __contains__(self, item_id):
+        return self._contains(self._positions(item_id))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+    @property
+    def nbytes(self):
+        return (self.size + 7) // 8
+
+    def flush(self):
+        if self._mmap is not None:
+            with self._lock:
+                self._mmap[:_HEADER.size] = self._header()
+                self._mmap.flush()
+
+    def close(self):
+        if self._mmap is not None:
+            self.flush()
+            self.bits.release()
+            self._mmap.close()
+            self._file.close()
+            self._mmap = None
+
+
+class Scalable_Bloom_Filter():
+    """
+        容量不用预先估计的 Bloom 过滤器: 当前一层装满后追加一层, 容量乘以 growth, 误判率乘以 tightening
+        各层误判率是等比数列, 总误判率不超过 error_rate; 持久化时每层一个文件 path.0, path.1, ...
+    """
+    def __init__(self, initial_capacity: int = 1000000, error_rate: float = 0.001, path: str = None,
+                 growth: int = 2, tightening: float = 0.5):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.path = path
+        self.growth = growth
+        self.tightening = tightening
+        self._lock = threading.Lock()
+        self.filters = []
+        if path is not None:
+            index = 0
+            while os.path.exists(self._layer_path(index)):
+                self.filters.append(Bloom_Filter(path=self._layer_path(index)))
+                index += 1
+        if not self.filters:
+            self._grow()
+
+    def _layer_path(self, index):
+        return f'{self.path}.{index}' if self.path is not None else None
+
+    def _grow(self):
+        index = len(self.filters)
+        capacity = self.initial_capacity * self.growth ** index
+        error_rate = self.error_rate * (1 - self.tightening) * self.tightening ** index
+        self.filters.append(Bloom_Filter(capacity, error_rate, self._layer_path(index)))
+
+    def __contains__(self, item_id):
+        return any(item_id in f for f in self.filters)
+
+    def contains_many(self, item_ids):
+        return [item_id in self for item_id in item_ids]
+
+    def add(self, item_id: str):
+        return self.add_many([item_id])[0]
+
+    def add_many(self, item_ids):
+        result = []
+        with self._lock:
+            for item_id in item_ids:
+                if any(item_id in f for f in self.filters[:-1]):
+                    result.append(False)
+                    continue
+                if self.filters[-1].full:
+                    if item_id in self.filters[-1]:
+                        result.append(False)
+                        continue
+                    self._grow()
+                result.append(self.filters[-1].add(item_id))
+        return result
+
+    def __len__(self):
+        return sum(len(f) for f in self.filters)
+
+    @property
+    def nbytes(self):
+        return sum(f.nbytes for f in self.filters)
+
+    def flush(self):
+        for f in self.filters:
+            f.flush()
+
+    def close(self):
+        for f in self.filters:
+            f.close()
+
+
+def make_seen_set(capacity: int = None, error_rate: float = 0.001, path: str = None):
+    """
+        :param capacity: None 为精确集合 (传 path 时为可扩容的 Bloom 过滤器), 否则为容量 capacity 的 Bloom_Filter
+        :param path: 持久化文件
+    """
+    if capacity is None:
+        return Seen_Set() if path is None else Scalable_Bloom_Filter(error_rate=error_rate, path=path)
+    return Bloom_Filter(capacity, error_rate, path)
+
+
+class Dedup_Service():
+    """
+        按 scope 管理已见集合, 供各个爬取阶段跳过已经处理过的笔记 / 评论
+        - path 为 None 时每个 scope 是内存里的精确集合, 只在本次运行内去重
+        - 否则每个 scope 是 path 目录下 mmap 持久化的 Scalable_Bloom_Filter, 跨运行去重,
+          千万级 id 只占几十 MB, 误判率 error_rate (极少数新 id 会被跳过)
+        check 只查询, add 记录并返回哪些是新的, filter_new 两者合一
+    """
+    def __init__(self, path: str = None, initial_capacity: int = 1000000, error_rate: float = 0.001):
+        """
+            :param path: 持久化目录, 默认不持久化
+            :param initial_capacity: 每个 scope 第一层 Bloom 过滤器的容量
+            :param error_rate: 误判率
+        """
+        self.path = path
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self._scopes = {}
+        self._lock = threading.Lock()
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    def scope(self, name: str):
+        """
+            返回 scope 的已见集合, 可以直接传给 Feed_Harvester(seen=...) 等
+        """
+        with self._lock:
+            seen = self._scopes.get(name)
+            if seen is None:
+                if self.path is None:
+                    seen = Seen_Set()
+                else:
+                    # scope 里可能有 ":" 等字符, 文件名只保留安全字符再加上哈希避免冲突
+                    safe = re.sub(r'[^0-9A-Za-z_\-]+', '_', name)[:40]
+                    digest = hashlib.blake2b(name.encode('utf-8'), digest_size=4).hexdigest()
+                    seen = Scalable_Bloom_Filter(self.initial_capacity, self.error_rate, os.path.join(self.path, f'{safe}-{digest}.bloom'))
+                self._scopes[name] = seen
+            return seen
+
+    def check(self, scope: str, item_ids: list):
+        """
+            返回每个 id 是否已见, 不记录
+        """
+        return self.scope(scope).contains_many(item_ids)
+
+    def add(self, scope: str, item_ids: list):
+        """
+            记录 id, 返回每个 id 是否为新的
+        """
+        return self.scope(scope).add_many(item_ids)
+
+    def filter_new(self, scope: str, item_ids: list, mark: bool = True):
+        """
+            过滤出没见过的 id, 保持原有顺序; 同一批里重复的 id 只保留第一个
+            :param mark: 是否同时记录为已见; 处理成功后才记录的话传 False, 之后再调用 add
+        """
+        if mark:
+            return [i for i, new in zip(item_ids, self.add(scope, item_ids)) if new]
+        result, batch = [], set()
+        for item_id, known in zip(item_ids, self.check(scope, item_ids)):
+            if not known and item_id not in batch:
+                batch.add(item_id)
+                result.append(item_id)
+        return result
+
+    def stats(self):
+        with self._lock:
+            scopes = dict(self._scopes)
+        return {name: {'count': len(seen), 'bytes': getattr(seen, 'nbytes', None)} for name, seen in scopes.items()}
+
+    def flush(self):
+        with self._lock:
+            scopes = list(self._scopes.values())
+        for seen in scopes:
+            seen.flush()
+
+    def close(self):
+        with self._lock:
+            scopes, self._scopes = list(self._scopes.values()), {}
+        for seen in scopes:
+            seen.close()
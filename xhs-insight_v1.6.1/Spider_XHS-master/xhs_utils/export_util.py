@@ -0,0 +1,222 @@
+import abc
+import os
+import sqlite3
+
+from loguru import logger
+
+from xhs_utils import codec_util
+from xhs_utils.data_util import norm_text
+
+
+class Export_Writer(abc.ABC):
+    """
+        流式导出的写入器, 一次写一批行 (dict), 不在内存里攒全部数据
+        - fields 决定列顺序, 行里缺少的字段写空
+        - open(resume_rows) 从断点续写: 只保留前 resume_rows 行, 之后的行会被重新写入
+        - append() 保留文件里已有的全部行, 之后写入的行追加在后面 (增量导出用, 不会用部分数据覆盖上次的导出)
+        - flush() 之后已写入的行才算落盘, 导出器在 flush 之后才推进断点
+        - durable=False 的写入器 (xlsx) 只有 close 之后才落盘, 导出器在完成时才记录断点
+    """
+    durable = True
+
+    def __init__(self, path: str, fields: list):
+        self.path = path
+        self.fields = list(fields)
+        self.rows = 0
+
+    @abc.abstractmethod
+    def open(self, resume_rows: int = 0):
+        pass
+
+    @abc.abstractmethod
+    def write(self, rows: list):
+        pass
+
+    def existing_rows(self):
+        """
+            文件里已有的完整行数, 文件不存在时为 0
+        """
+        return 0
+
+    def append(self):
+        return self.open(self.existing_rows())
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JSONL_Writer(Export_Writer):
+    """
+        每行一个 json 对象, 续写时截断到断点所在的字节位置再追加
+    """
+    def open(self, resume_rows: int = 0):
+        dirname = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(dirname, exist_ok=True)
+        if resume_rows and os.path.exists(self.path):
+            self.file = open(self.path, 'r+b')
+            for _ in range(resume_rows):
+                if not self.file.readline():
+                    break
+                self.rows += 1
+            self.file.truncate(self.file.tell())
+        else:
+            self.file = open(self.path, 'wb')
+        return self
+
+    def existing_rows(self):
+        if not os.path.exists(self.path):
+            return 0
+        rows = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                # 中途崩溃留下的半行不算, 续写时会被截掉
+                if line.endswith(b'\n'):
+                    rows += 1
+        return rows
+
+    def write(self, rows: list):
+        lines = [codec_util.dumps({k: row.get(k) for k in self.fields}) for row in rows]
+        if lines:
+            self.file.write(b'\n'.join(lines) + b'\n')
+        self.rows += len(lines)
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class XLSX_Writer(Export_Writer):
+    """
+        openpyxl write_only 模式, 每行写完即可释放, 内存占用和行数无关
+        xlsx 不能追加: 续写时把旧文件的前 resume_rows 行流式拷贝进新文件, close 时原子替换
+        upsert(rows, key) 同样流式拷贝旧文件, 其中 key 相同的行换成新数据, 其余新行追加在后面
+    """
+    durable = False
+
+    def __init__(self, path: str, fields: list, headers: list = None):
+        super().__init__(path, fields)
+        self.headers = headers or fields
+
+    def open(self, resume_rows: int = 0):
+        # openpyxl 导入要一百多毫秒, 只有真正导出 excel 时才加载
+        import openpyxl
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append(self.headers)
+        if resume_rows and os.path.exists(self.path):
+            old = openpyxl.load_workbook(self.path, read_only=True)
+            for values in old.active.iter_rows(min_row=2, max_row=resume_rows + 1, values_only=True):
+                self.sheet.append(list(values))
+                self.rows += 1
+            old.close()
+        return self
+
+    def existing_rows(self):
+        if not os.path.exists(self.path):
+            return 0
+        import openpyxl
+        old = openpyxl.load_workbook(self.path, read_only=True)
+        try:
+            return sum(1 for _ in old.active.iter_rows(min_row=2, values_only=True))
+        finally:
+            old.close()
+
+    def upsert(self, rows: list, key: str):
+        """
+            打开写入器, 旧文件里 key 列与 rows 相同的行原地替换, 没出现过的行追加在末尾, 之后照常 close
+        """
+        import openpyxl
+        index = self.fields.index(key)
+        pending = {row[key]: row for row in rows}
+        self.open()
+        if os.path.exists(self.path):
+            old = openpyxl.load_workbook(self.path, read_only=True)
+            for values in old.active.iter_rows(min_row=2, values_only=True):
+                row = pending.pop(values[index], None) if index < len(values) else None
+                if row is None:
+                    self.sheet.append(list(values))
+                    self.rows += 1
+                else:
+                    self.write([row])
+            old.close()
+        self.write(list(pending.values()))
+        return self
+
+    def write(self, rows: list):
+        for row in rows:
+            self.sheet.append([norm_text(str(row[k])) if row.get(k) is not None else None for k in self.fields])
+        self.rows += len(rows)
+
+    def close(self):
+        tmp_path = self.path + '.tmp'
+        self.workbook.save(tmp_path)
+        os.replace(tmp_path, self.path)
+        logger.info(f'数据保存至 {self.path}')
+
+
+class SQLite_Writer(Export_Writer):
+    """
+        写入 sqlite 表, 按主键 upsert, 重复写入同一行不会产生重复数据
+        列表 / 字典类型的值以 json 保存
+    """
+    def __init__(self, path: str, fields: list, table: str, primary_key: str):
+        super().__init__(path, fields)
+        self.table = table
+        self.primary_key = primary_key
+
+    def open(self, resume_rows: int = 0):
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        quoted = [f'"{f}"' for f in self.fields]
+        columns = ', '.join(q + (' PRIMARY KEY' if f == self.primary_key else '') for f, q in zip(self.fields, quoted))
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{self.table}" ({columns})')
+        placeholders = ', '.join('?' for _ in self.fields)
+        self._insert = f'INSERT OR REPLACE INTO "{self.table}" ({", ".join(quoted)}) VALUES ({placeholders})'
+        self.rows = resume_rows
+        return self
+
+    @staticmethod
+    def _value(value):
+        if isinstance(value, (list, dict)):
+            return codec_util.dumps_str(value)
+        return value
+
+    def write(self, rows: list):
+        self.conn.executemany(self._insert, [tuple(self._value(row.get(f)) for f in self.fields) for row in rows])
+        self.rows += len(rows)
+
+    def flush(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def open_writer(path: str, fields: list, headers: list = None, table: str = None, primary_key: str = None):
+    """
+        按扩展名选择写入器: .jsonl / .xlsx / .db .sqlite
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.jsonl':
+        return JSONL_Writer(path, fields)
+    if ext == '.xlsx':
+        return XLSX_Writer(path, fields, headers)
+    if ext in ('.db', '.sqlite', '.sqlite3'):
+        return SQLite_Writer(path, fields, table or 'export', primary_key or fields[0])
+    raise ValueError(f'不支持的导出格式: {path}')
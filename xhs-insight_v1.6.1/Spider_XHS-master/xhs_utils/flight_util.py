@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+
+from xhs_utils import metrics_util as metrics
+
+"""
+    相同请求合并 (single-flight) 和短时响应缓存
+    同一时刻多个线程请求同一篇笔记 / 同一个用户 / 同一页搜索时, 只有第一个真正发出请求, 其余等待并共用它的响应
+"""
+
+# 允许合并的只读接口; 默认只合并同一个 cookie 的相同请求, 不同账号之间共用响应要显式打开 share_cookies
+# 首页推荐每次刷新结果不同, 消息 / 个人信息和账号相关, 都不合并
+SHARED_ENDPOINTS = frozenset((
+    '/api/sns/web/v1/feed',
+    '/api/sns/web/v1/user/otherinfo',
+    '/api/sns/web/v1/user_posted',
+    '/api/sns/web/v1/search/notes',
+    '/api/sns/web/v1/search/usersearch',
+    '/api/sns/web/v1/search/recommend',
+    '/api/sns/web/v2/comment/page',
+    '/api/sns/web/v2/comment/sub/page',
+))
+# 不影响响应内容的参数: 每次随机生成的 search_id, 以及只标记来源页面的 xsec_source
+# xsec_token 决定这次请求能不能看到笔记 (过期 / 属于别的账号时接口返回失败), 必须留在键里
+VOLATILE_PARAMS = frozenset(('search_id', 'xsec_source'))
+
+FLIGHT_TOTAL = metrics.REGISTRY.counter('xhs_single_flight', '请求合并结果 (leader 发出请求 / shared 共用进行中的请求 / cached 命中缓存 / fallback 共用失败后自己请求)', ('endpoint', 'result'))
+
+
+def canonical_key(method: str, api: str, data=None):
+    """
+        请求的规范化键: (方法, 接口, 排序后的查询参数, 排序后的请求体), 忽略 VOLATILE_PARAMS
+    """
+    endpoint, _, query = api.partition('?')
+    params = tuple(sorted((k, v) for k, v in urllib.parse.parse_qsl(query, keep_blank_values=True) if k not in VOLATILE_PARAMS))
+    body = ''
+    if isinstance(data, dict):
+        body = json.dumps({k: v for k, v in data.items() if k not in VOLATILE_PARAMS}, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    elif data:
+        body = data if isinstance(data, str) else repr(data)
+    return method, endpoint, params, body
+
+
+class _Call():
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class Single_Flight():
+    """
+        - do(key, fn): 同一个 key 同时只执行一次 fn, 并发的调用等待并共用结果
+        - 共用的结果没有通过 ok 检查 (异常或接口返回失败, 比如那个 cookie 失效了) 时, 等待者各自重新执行 fn,
+          一个坏 cookie 不会连累其他调用
+        - ttl > 0 时通过检查的结果再缓存 ttl 秒 (LRU, 最多 maxsize 条), 默认不缓存, 只合并进行中的请求
+        - 默认键里带 cookie, 只有同一个账号的相同请求才合并; share_cookies=True 时不同账号也共用,
+          一个账号拿到的响应会交给另一个账号, 失效的 cookie 也可能拿到别人的成功响应, 只在所有 cookie 属于同一方时使用
+    """
+    def __init__(self, ttl: float = 0, maxsize: int = 2048, endpoints=SHARED_ENDPOINTS, share_cookies: bool = False):
+        """
+            :param ttl: 响应缓存秒数, 0 为不缓存
+            :param maxsize: 缓存条数上限
+            :param endpoints: 允许合并的接口
+            :param share_cookies: 不同 cookie 的相同请求是否合并, 默认 False, 键里带上 cookie
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.endpoints = frozenset(endpoints)
+        self.share_cookies = share_cookies
+        self._calls = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self.counts = {'leader': 0, 'shared': 0, 'cached': 0, 'fallback': 0}
+
+    def key(self, method: str, api: str, data=None, cookie: str = None):
+        """
+            返回请求的合并键, 接口不允许合并时返回 None
+        """
+        key = canonical_key(method, api, data)
+        if key[1] not in self.endpoints:
+            return None
+        return key if self.share_cookies else key + (cookie,)
+
+    def _count(self, key, result):
+        with self._count_lock:
+            self.counts[result] += 1
+        FLIGHT_TOTAL.inc(endpoint=key[1], result=result)
+
+    def do(self, key, fn, ok=None):
+        """
+            :param key: key() 的返回值
+            :param fn: 真正发出请求的函数, 无参数
+            :param ok: ok(value) 为 False 的结果不共用给等待者、不缓存, None 为都共用
+            返回 (value, shared), shared 为 True 表示结果来自其他调用或缓存, 调用方不应原地修改它
+        """
+        with self._lock:
+            if self.ttl > 0:
+                entry = self._cache.get(key)
+                if entry is not None:
+                    if entry[1] > time.monotonic():
+                        self._cache.move_to_end(key)
+                        self._count(key, 'cached')
+                        return entry[0], True
+                    del self._cache[key]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.event.wait()
+            if call.error is None and (ok is None or ok(call.value)):
+                self._count(key, 'shared')
+                return call.value, True
+            self._count(key, 'fallback')
+            return fn(), False
+
+        self._count(key, 'leader')
+        try:
+            call.value = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if self.ttl > 0 and call.error is None and (ok is None or ok(call.value)):
+                    self._cache[key] = (call.value, time.monotonic() + self.ttl)
+                    while len(self._cache) > self.maxsize:
+                        self._cache.popitem(last=False)
+            call.event.set()
+        return call.value, False
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            size, inflight = len(self._cache), len(self._calls)
+        with self._count_lock:
+            return {'cache_size': size, 'inflight': inflight, **self.counts}
+
+
+# 进程内共享, 和 default_rate_limiter 一样按需替换
+# 默认只合并进行中的请求, 环境变量 XHS_RESPONSE_CACHE_TTL (秒) 可以打开响应缓存
+default_single_flight = Single_Flight(ttl=float(os.environ.get('XHS_RESPONSE_CACHE_TTL') or 0))
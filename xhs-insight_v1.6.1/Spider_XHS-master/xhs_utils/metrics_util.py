@@ -0,0 +1,272 @@
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+# 默认分桶 (秒), 覆盖签名的几十毫秒到 Gemini 的十几秒
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter():
+    """
+        只增不减的计数器
+    """
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        name = f'{self.name}_total'
+        lines = [f'# HELP {name} {self.documentation}', f'# TYPE {name} counter']
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f'{name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Gauge():
+    """
+        可增可减的当前值, 例如队列长度
+    """
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram():
+    """
+        耗时分布, 按 Prometheus 的累计分桶输出
+    """
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][i] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for key, state in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state['counts']):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f'{self.name}_sum{labels} {_format_value(state["sum"])}')
+                lines.append(f'{self.name}_count{labels} {state["count"]}')
+        return lines
+
+
+class Registry():
+    """
+        进程内的指标注册表, render() 输出 Prometheus 文本格式
+    """
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class TraceExporter():
+    """
+        把 span 按 OTLP/JSON (ExportTraceServiceRequest) 每行一条追加写入文件,
+        可以直接交给 OpenTelemetry Collector 的 otlpjsonfile receiver 或 Jaeger 导入
+    """
+    def __init__(self, path: str, service_name: str = 'xhs-insight'):
+        self.path = path
+        self.service_name = service_name
+        self.lock = threading.Lock()
+
+    def export(self, span: dict):
+        attributes = [{'key': k, 'value': {'stringValue': str(v)}} for k, v in span['attributes'].items()]
+        otlp_span = {
+            'traceId': span['trace_id'],
+            'spanId': span['span_id'],
+            'name': span['name'],
+            'kind': 1,
+            'startTimeUnixNano': str(span['start_ns']),
+            'endTimeUnixNano': str(span['end_ns']),
+            'attributes': attributes,
+            'status': {'code': 2 if span['error'] else 1},
+        }
+        if span['parent_id']:
+            otlp_span['parentSpanId'] = span['parent_id']
+        line = json.dumps({'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+            'scopeSpans': [{'scope': {'name': 'xhs_utils.metrics_util'}, 'spans': [otlp_span]}],
+        }]}, ensure_ascii=False)
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram('xhs_stage_duration_seconds', '各阶段耗时 (签名 / 选cookie / 抓取 / 写库等)', ('stage', 'status'))
+HTTP_SECONDS = REGISTRY.histogram('xhs_http_request_duration_seconds', '小红书接口请求耗时', ('endpoint', 'method', 'status'))
+HTTP_REQUESTS = REGISTRY.counter('xhs_http_requests', '小红书接口请求次数', ('endpoint', 'method', 'status'))
+HTTP_THROTTLED = REGISTRY.counter('xhs_http_throttled', '被限流 (429 / 461 / 访问频繁) 的请求次数', ('endpoint',))
+
+# 设置环境变量 XHS_TRACE_FILE 即开启 trace 导出
+_exporter = TraceExporter(os.environ['XHS_TRACE_FILE']) if os.environ.get('XHS_TRACE_FILE') else None
+_current_span = contextvars.ContextVar('xhs_current_span', default=None)
+
+
+def configure_trace_export(path: str = None, service_name: str = 'xhs-insight'):
+    """
+        开启 (path) 或关闭 (None) trace 文件导出
+    """
+    global _exporter
+    _exporter = TraceExporter(path, service_name) if path else None
+
+
+@contextmanager
+def span(name: str, histogram: Histogram = None, **labels):
+    """
+        计时一段代码, 结果记入直方图, 开启导出时同时写出一个 trace span
+        :param name: 阶段名称, 未指定 histogram 时作为 xhs_stage_duration_seconds 的 stage 标签
+        :param histogram: 记入的直方图, 默认 STAGE_SECONDS
+        :param labels: 直方图标签, 也作为 span 属性; 代码块里可以修改 yield 出的字典 (例如填入 status)
+        出异常时 status 记为 error
+    """
+    parent = _current_span.get()
+    current = {
+        'name': name,
+        'trace_id': parent['trace_id'] if parent else secrets.token_hex(16),
+        'span_id': secrets.token_hex(8),
+        'parent_id': parent['span_id'] if parent else None,
+    }
+    token = _current_span.set(current)
+    start_ns = time.time_ns()
+    started = time.perf_counter()
+    error = False
+    try:
+        yield labels
+    except BaseException:
+        error = True
+        labels['status'] = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        _current_span.reset(token)
+        labels.setdefault('status', 'ok')
+        if histogram is None:
+            STAGE_SECONDS.observe(elapsed, stage=name, status=labels['status'])
+        else:
+            histogram.observe(elapsed, **labels)
+        if _exporter is not None:
+            current.update(start_ns=start_ns, end_ns=start_ns + int(elapsed * 1e9), attributes=labels, error=error)
+            try:
+                _exporter.export(current)
+            except OSError:
+                pass
+
+
+def timed(name: str):
+    """
+        span 的装饰器版本
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_prometheus():
+    return REGISTRY.render()
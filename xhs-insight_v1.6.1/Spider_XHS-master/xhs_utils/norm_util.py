@@ -0,0 +1,55 @@
+import re
+import time
+
+# 小红书返回的互动数是展示用字符串, 如 "1.2万" "10万+" "3,456"
+COUNT_UNITS = {'': 1, '千': 1000, 'k': 1000, 'K': 1000, '万': 10000, 'w': 10000, 'W': 10000, '亿': 100000000}
+COUNT_RE = re.compile(r'^\s*(\d[\d,]*(?:\.\d+)?)\s*([千kK万wW亿]?)\+?\s*$')
+
+
+def norm_count(value):
+    """
+        把互动数转换为整数
+        :param value: 原始互动数 "1.2万" / "10万+" / 123 / None
+        无法解析的值返回 0
+    """
+    if value is None or isinstance(value, bool):
+        return 0
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdecimal():
+        # 绝大多数互动数是纯数字, 不走正则; isdigit 会放过上标数字 "²", int() 解析不了
+        return int(value)
+    if isinstance(value, float):
+        return 0 if value != value else int(value)
+    match = COUNT_RE.match(str(value))
+    if not match:
+        return 0
+    number = float(match.group(1).replace(',', ''))
+    return int(round(number * COUNT_UNITS[match.group(2)]))
+
+def norm_counts(values):
+    """
+        批量转换互动数, 同一个原始值只解析一次
+        :param values: 原始互动数的列表 (或 numpy 数组)
+        返回整数列表, 传入 numpy 数组时返回 int64 数组
+    """
+    cache = {}
+
+    def lookup(value):
+        try:
+            return cache[value]
+        except KeyError:
+            parsed = cache[value] = norm_count(value)
+            return parsed
+        except TypeError:
+            return norm_count(value)
+
+    if type(values).__module__ == 'numpy':
+        import numpy as np
+        return np.fromiter(map(lookup, values.ravel()), dtype=np.int64, count=values.size).reshape(values.shape)
+    return list(map(lookup, values))
+
+def timestamp_to_str(timestamp):
+    time_local = time.localtime(timestamp / 1000)
+    dt = time.strftime("%Y-%m-%d %H:%M:%S", time_local)
+    return dt
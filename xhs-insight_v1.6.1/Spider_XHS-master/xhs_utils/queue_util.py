@@ -0,0 +1,247 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_QUEUE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../datas/jobs.db'))
+
+JOB_TYPES = ('search', 'user', 'note', 'comments', 'media')
+# 数字越大越先执行: 搜索 / 用户任务会展开出笔记任务, 评论和媒体下载最耗时, 放在最后
+DEFAULT_PRIORITIES = {'search': 40, 'user': 30, 'note': 20, 'comments': 10, 'media': 0}
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+class Job():
+    """
+        队列里的一个任务
+    """
+    __slots__ = ('id', 'type', 'payload', 'priority', 'attempts', 'max_attempts')
+
+    def __init__(self, id, type, payload, priority, attempts, max_attempts):
+        self.id = id
+        self.type = type
+        self.payload = payload
+        self.priority = priority
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+
+    def __repr__(self):
+        return f'Job({self.id}, {self.type}, attempt {self.attempts}/{self.max_attempts})'
+
+
+class Job_Queue():
+    """
+        持久化任务队列 (sqlite), 多个进程各自打开同一个文件即可共享
+        - claim 在一个写事务里选出优先级最高的任务并写入租约 (worker_id, lease_until)
+        - 执行期间 heartbeat 续租; 进程崩溃后租约过期, 任务回到队列由其他进程重新领取
+        - 失败按指数退避重试, 领取次数达到 max_attempts 后标记为 failed
+        - dedupe_key 相同的任务只入队一次 (如同一篇笔记被多个搜索任务展开)
+    """
+    def __init__(self, db_path: str = DEFAULT_QUEUE_PATH, retry_base: float = 5.0, retry_max: float = 300.0):
+        """
+            :param db_path: 队列文件, 默认 datas/jobs.db
+            :param retry_base: 第一次失败后等待的秒数, 之后每次翻倍
+            :param retry_max: 最长等待秒数
+        """
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._lock = threading.Lock()
+        # 事务手动控制: claim 需要 BEGIN IMMEDIATE 先拿到写锁, 避免两个进程领到同一个任务
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        with self._lock:
+            if db_path != ':memory:':
+                self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, type TEXT NOT NULL, payload TEXT NOT NULL, '
+                'priority INTEGER NOT NULL, status TEXT NOT NULL, dedupe_key TEXT UNIQUE, '
+                'attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, '
+                'available_at REAL NOT NULL, worker_id TEXT, lease_until REAL, '
+                'result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+            self.conn.execute('CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, id)')
+
+    def _write(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params)
+
+    # ---------- 生产者 ----------
+    def put(self, type: str, payload: dict, priority: int = None, max_attempts: int = 3, dedupe_key: str = None):
+        """
+            入队一个任务
+            :param type: search / user / note / comments / media
+            :param payload: 任务参数, 以 json 保存
+            :param priority: 优先级, 默认按 DEFAULT_PRIORITIES
+            :param dedupe_key: 去重键, 已存在时不重复入队
+            返回任务 id, 重复时返回 None
+        """
+        if type not in JOB_TYPES:
+            raise ValueError(f'未知的任务类型: {type}')
+        now = time.time()
+        priority = DEFAULT_PRIORITIES[type] if priority is None else priority
+        cursor = self._write(
+            'INSERT OR IGNORE INTO jobs (type, payload, priority, status, dedupe_key, max_attempts, available_at, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (type, json.dumps(payload, ensure_ascii=False), priority, QUEUED, dedupe_key, max_attempts, now, now, now)
+        )
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def put_many(self, jobs: list):
+        """
+            批量入队, jobs 为 put 的关键字参数字典列表, 返回新入队的数量
+        """
+        return sum(self.put(**job) is not None for job in jobs)
+
+    # ---------- 消费者 ----------
+    def _requeue_expired(self, now):
+        # 租约过期 = 执行它的进程已经不在了; 次数用完的直接失败
+        return self.conn.execute(
+            'UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, '
+            'error = COALESCE(error, ?), worker_id = NULL, lease_until = NULL, updated_at = ? '
+            'WHERE status = ? AND lease_until < ?',
+            (FAILED, QUEUED, '租约过期', now, RUNNING, now)
+        ).rowcount
+
+    def requeue_expired(self):
+        """
+            把租约过期的任务放回队列, 返回处理的任务数 (claim 时也会顺带处理)
+        """
+        now = time.time()
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                changed = self._requeue_expired(now)
+                self.conn.execute('COMMIT')
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+        return changed
+
+    def claim(self, worker_id: str, lease: float = 60.0, types: list = None):
+        """
+            领取一个可执行的任务 (优先级最高, 同优先级先入队的先执行)
+            :param worker_id: 领取者, 续租和提交时校验
+            :param lease: 租约秒数, 期间需要 heartbeat 续租
+            :param types: 只领取这些类型, None 为全部
+            返回 Job, 没有可执行的任务时返回 None
+        """
+        now = time.time()
+        sql = 'SELECT id, type, payload, priority, attempts, max_attempts FROM jobs WHERE status = ? AND available_at <= ?'
+        params = [QUEUED, now]
+        if types:
+            sql += f' AND type IN ({",".join("?" * len(types))})'
+            params += list(types)
+        sql += ' ORDER BY priority DESC, id LIMIT 1'
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._requeue_expired(now)
+                row = self.conn.execute(sql, params).fetchone()
+                if row is not None:
+                    self.conn.execute(
+                        'UPDATE jobs SET status = ?, worker_id = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?',
+                        (RUNNING, worker_id, now + lease, now, row[0])
+                    )
+                self.conn.execute('COMMIT')
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+        if row is None:
+            return None
+        return Job(row[0], row[1], json.loads(row[2]), row[3], row[4] + 1, row[5])
+
+    def heartbeat(self, job_id: int, worker_id: str, lease: float = 60.0):
+        """
+            续租, 返回 False 表示租约已经丢失 (过期后被其他进程领走)
+        """
+        now = time.time()
+        cursor = self._write(
+            'UPDATE jobs SET lease_until = ?, updated_at = ? WHERE id = ? AND worker_id = ? AND status = ?',
+            (now + lease, now, job_id, worker_id, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result=None):
+        cursor = self._write(
+            'UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = NULL, updated_at = ? '
+            'WHERE id = ? AND worker_id = ? AND status = ?',
+            (DONE, json.dumps(result, ensure_ascii=False), time.time(), job_id, worker_id, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str, retry: bool = True):
+        """
+            任务失败: 还有次数时退避后回到队列, 否则标记为 failed
+        """
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute('SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker_id = ? AND status = ?',
+                                    (job_id, worker_id, RUNNING)).fetchone()
+            if row is None:
+                return False
+            attempts, max_attempts = row
+            if retry and attempts < max_attempts:
+                delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+                status, available_at = QUEUED, now + delay
+            else:
+                status, available_at = FAILED, now
+            # 仍然校验租约, 两条语句之间租约过期被别人领走时不覆盖
+            cursor = self.conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, available_at = ?, worker_id = NULL, lease_until = NULL, updated_at = ? '
+                'WHERE id = ? AND worker_id = ? AND status = ?',
+                (status, str(error), available_at, now, job_id, worker_id, RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    # ---------- 管理 ----------
+    def stats(self):
+        """
+            返回 {type: {status: 数量}}
+        """
+        with self._lock:
+            rows = self.conn.execute('SELECT type, status, COUNT(*) FROM jobs GROUP BY type, status').fetchall()
+        stats = {}
+        for type, status, count in rows:
+            stats.setdefault(type, {})[status] = count
+        return stats
+
+    def pending(self):
+        """
+            还没有结束 (queued / running) 的任务数
+        """
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)', (QUEUED, RUNNING)).fetchone()[0]
+
+    def retry_failed(self, type: str = None):
+        """
+            把失败的任务重新放回队列, 领取次数清零
+        """
+        sql = 'UPDATE jobs SET status = ?, attempts = 0, available_at = ?, updated_at = ? WHERE status = ?'
+        params = [QUEUED, time.time(), time.time(), FAILED]
+        if type:
+            sql += ' AND type = ?'
+            params.append(type)
+        return self._write(sql, params).rowcount
+
+    def get(self, job_id: int):
+        with self._lock:
+            self.conn.row_factory = sqlite3.Row
+            try:
+                row = self.conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            finally:
+                self.conn.row_factory = None
+        if row is None:
+            return None
+        job = dict(row)
+        job['payload'] = json.loads(job['payload'])
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,258 @@
+import asyncio
+import hashlib
+import random
+import threading
+import time
+import requests
+from loguru import logger
+from xhs_utils import codec_util
+from xhs_utils import metrics_util as metrics
+
+# 小红书风控: HTTP 429 / 461, 或 success=False 且 code / msg 提示访问频繁
+THROTTLE_STATUS_CODES = (429, 461)
+THROTTLE_RES_CODES = (300012, 300013)
+THROTTLE_MSG_KEYWORDS = ('频繁', '频次', '风控', '验证', 'too many')
+
+
+def is_throttled(status_code=None, res_json=None):
+    """
+        判断一次响应是否触发了风控限流
+    """
+    if status_code in THROTTLE_STATUS_CODES:
+        return True
+    if isinstance(res_json, dict) and not res_json.get('success', True):
+        if res_json.get('code') in THROTTLE_RES_CODES:
+            return True
+        msg = str(res_json.get('msg') or '').lower()
+        return any(keyword in msg for keyword in THROTTLE_MSG_KEYWORDS)
+    return False
+
+
+def cookie_key(cookies):
+    """
+        限速用的 cookie 标识: 优先用 a1, 否则取 cookie 串的摘要
+    """
+    if isinstance(cookies, dict):
+        if cookies.get('a1'):
+            return cookies['a1']
+        cookies = ';'.join(f'{k}={v}' for k, v in sorted(cookies.items()))
+    if not cookies:
+        return None
+    return hashlib.sha1(cookies.encode('utf-8')).hexdigest()[:16]
+
+
+def proxy_key(proxies):
+    if not proxies:
+        return None
+    if isinstance(proxies, dict):
+        return proxies.get('https') or proxies.get('http')
+    return str(proxies)
+
+
+class TokenBucket():
+    """
+        令牌桶, rate 为每秒补充的令牌数, burst 为桶容量
+        wait_time() 只查看还要等多久才有一个令牌, take() 取走一个令牌; 多个桶一起限速时由 Rate_Limiter 决定何时取
+    """
+    def __init__(self, rate: float, burst: float = None, min_rate: float = 0.05, max_rate: float = None):
+        self.rate = rate
+        self.base_rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+
+    def increase(self, step: float):
+        """ AIMD 加性增 """
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + step)
+
+    def decrease(self, factor: float):
+        """ AIMD 乘性减 """
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.min_rate, self.rate * factor)
+
+
+class Rate_Limiter():
+    """
+        全局 / 每个 cookie / 每个代理 三级令牌桶限速
+        - 每次请求前 acquire, 三个桶都有令牌时才同时各取一个; 等待期间不占用其他桶的令牌
+        - 请求后 feedback: 正常响应加性提升速率, 429 / 461 / 风控提示乘性降低速率,
+          并对该 cookie 按指数退避 (带抖动) 暂停
+    """
+    def __init__(self, global_rate: float = 10.0, cookie_rate: float = 2.0, proxy_rate: float = 5.0,
+                 increase_step: float = 0.05, decrease_factor: float = 0.5,
+                 backoff_base: float = 2.0, backoff_max: float = 120.0, min_rate: float = 0.05):
+        """
+            :param global_rate: 整个进程每秒最多请求数
+            :param cookie_rate: 每个 cookie 每秒最多请求数
+            :param proxy_rate: 每个代理每秒最多请求数
+            :param increase_step: 每次正常响应后速率增加多少
+            :param decrease_factor: 被限流后速率乘以多少
+            :param backoff_base: 第一次被限流后暂停的秒数, 之后每次翻倍
+            :param backoff_max: 最长暂停秒数
+        """
+        self.cookie_rate = cookie_rate
+        self.proxy_rate = proxy_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.min_rate = min_rate
+        self.global_bucket = TokenBucket(global_rate, min_rate=min_rate)
+        self.buckets = {}
+        self.backoff_until = {}
+        self.failures = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, kind, key):
+        if key is None:
+            return None
+        with self.lock:
+            bucket = self.buckets.get((kind, key))
+            if bucket is None:
+                rate = self.cookie_rate if kind == 'cookie' else self.proxy_rate
+                bucket = self.buckets[(kind, key)] = TokenBucket(rate, min_rate=self.min_rate)
+            return bucket
+
+    def _buckets(self, cookie=None, proxy=None):
+        buckets = [self.global_bucket, self._bucket('cookie', cookie), self._bucket('proxy', proxy)]
+        return [bucket for bucket in buckets if bucket is not None]
+
+    def reserve(self, cookie=None, proxy=None):
+        """
+            尝试预定一次请求: 不在退避中且每个桶都有令牌时, 各取一个令牌并返回 0
+            否则一个令牌都不取, 返回最慢的那个桶 (或退避) 还要等的秒数, 调用方等待后重试
+            (慢的 cookie 桶不会提前扣掉全局桶的令牌, 让其他 cookie 的请求白白等待)
+        """
+        buckets = self._buckets(cookie, proxy)
+        with self.lock:
+            backoff_until = max(self.backoff_until.get(('cookie', cookie), 0), self.backoff_until.get(('proxy', proxy), 0))
+            delay = max([backoff_until - time.monotonic()] + [bucket.wait_time() for bucket in buckets])
+            if delay > 0:
+                return delay
+            for bucket in buckets:
+                bucket.take()
+        return 0.0
+
+    def acquire(self, cookie=None, proxy=None):
+        """
+            等到能发出一次请求为止, 返回总共等待的秒数
+        """
+        waited = 0.0
+        while True:
+            delay = self.reserve(cookie, proxy)
+            if delay <= 0:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self, cookie=None, proxy=None):
+        """
+            acquire 的协程版本, 等待时不阻塞事件循环
+        """
+        waited = 0.0
+        while True:
+            delay = self.reserve(cookie, proxy)
+            if delay <= 0:
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def backoff_delay(self, failures: int):
+        """ 指数退避 + 抖动 (0.5 ~ 1.5 倍) """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** max(0, failures - 1)))
+        return delay * random.uniform(0.5, 1.5)
+
+    def feedback(self, cookie=None, proxy=None, status_code=None, res_json=None):
+        """
+            根据响应调整速率
+            返回这次响应是否被限流
+        """
+        throttled = is_throttled(status_code, res_json)
+        buckets = self._buckets(cookie, proxy)
+        if throttled:
+            for bucket in buckets:
+                bucket.decrease(self.decrease_factor)
+            with self.lock:
+                for key in (('cookie', cookie), ('proxy', proxy)):
+                    if key[1] is None:
+                        continue
+                    self.failures[key] = self.failures.get(key, 0) + 1
+                    self.backoff_until[key] = time.monotonic() + self.backoff_delay(self.failures[key])
+        else:
+            for bucket in buckets:
+                bucket.increase(self.increase_step)
+            with self.lock:
+                for key in (('cookie', cookie), ('proxy', proxy)):
+                    self.failures.pop(key, None)
+        return throttled
+
+    def stats(self):
+        with self.lock:
+            return {
+                'global_rate': round(self.global_bucket.rate, 3),
+                'buckets': {f'{kind}:{key}': round(bucket.rate, 3) for (kind, key), bucket in self.buckets.items()},
+                'backoff': {f'{kind}:{key}': round(until - time.monotonic(), 3) for (kind, key), until in self.backoff_until.items() if until > time.monotonic()},
+            }
+
+
+def send_throttled(rate_limiter, max_retries: int, endpoint: str, method: str, route, send):
+    """
+        XHS_Apis / XHS_Creator_Apis 共用的发送循环: 限速, 发送并记录耗时指标, 按响应调整速率,
+        被限流时退避后重新签名重试
+        签名在限速等待之后才生成, 退避可能长达几分钟, 先签名再等会带着过期的 x-s / x-t 发出
+        :param rate_limiter: Rate_Limiter, None / False 不限速
+        :param endpoint: 指标标签用的接口路径, 不带查询参数
+        :param route: 每次尝试前调用, 返回 (cookie 标识, 这次使用的 proxies), 只用来选限速的桶, 不签名
+        :param send: send(proxies) 在等到令牌后签名并发出请求, 返回 response
+        返回 (响应的json, response)
+    """
+    res_json, status_code, response = None, None, None
+    for attempt in range(max_retries + 1):
+        ck, proxies = route()
+        pk = proxy_key(proxies)
+        if rate_limiter:
+            rate_limiter.acquire(ck, pk)
+        with metrics.span('xhs_request', metrics.HTTP_SECONDS, endpoint=endpoint, method=method) as labels:
+            try:
+                response = send(proxies)
+            except requests.RequestException:
+                metrics.HTTP_REQUESTS.inc(endpoint=endpoint, method=method, status='error')
+                raise
+            labels['status'] = response.status_code
+        metrics.HTTP_REQUESTS.inc(endpoint=endpoint, method=method, status=response.status_code)
+        status_code = response.status_code
+        try:
+            res_json = codec_util.loads(response.content)
+        except ValueError:
+            res_json = None
+        if not rate_limiter or not rate_limiter.feedback(ck, pk, status_code, res_json):
+            break
+        metrics.HTTP_THROTTLED.inc(endpoint=endpoint)
+        logger.warning(f'{endpoint} 被限流 (HTTP {status_code}), 第 {attempt + 1} 次退避')
+    if not isinstance(res_json, dict):
+        raise Exception(f'HTTP {status_code}: 响应不是json')
+    return res_json, response
+
+
+# 进程内共享的默认限速器, 所有未指定 rate_limiter 的 XHS_Apis 实例共用
+default_rate_limiter = Rate_Limiter()
@@ -0,0 +1,195 @@
+import sys
+
+from xhs_utils.norm_util import norm_count, timestamp_to_str
+
+"""
+    笔记 / 评论 / 用户的紧凑记录
+    - __slots__ 类, 没有每个对象的 __dict__, 只保留导出用到的字段, 原始响应里其他嵌套字段在解析后即可释放
+    - from_raw 直接读取接口返回的 json, to_dict 的结果和 handle_note_info / handle_comment_info / handle_user_info 完全一致
+    - 可以由字段推出的值 (主页url、上传时间字符串、视频地址) 在 to_dict 时才生成, 同一篇笔记的 note_id / note_url 在评论间共享
+"""
+
+HOME_URL = 'https://www.xiaohongshu.com/user/profile/{user_id}'
+VIDEO_URL = 'https://sns-video-bd.xhscdn.com/{key}'
+GENDERS = {0: '男', 1: '女'}
+
+# 重复出现的字符串 (评论者的id / 昵称 / 头像、ip 归属地) 驻留后所有记录共用一份
+_intern = sys.intern
+
+
+def _intern_or_none(value):
+    return _intern(value) if isinstance(value, str) else value
+
+
+def _picture_urls(items):
+    urls = []
+    for item in items:
+        try:
+            urls.append(item['info_list'][1]['url'])
+        except (KeyError, IndexError, TypeError):
+            pass
+    return urls
+
+
+def _names(items):
+    names = []
+    for item in items:
+        try:
+            names.append(item['name'])
+        except (KeyError, TypeError):
+            pass
+    return names
+
+
+class Note():
+    """
+        笔记详情, 对应 handle_note_info
+    """
+    FIELDS = ('note_id', 'note_url', 'note_type', 'user_id', 'home_url', 'nickname', 'avatar', 'title', 'desc',
+              'liked_count', 'collected_count', 'comment_count', 'share_count', 'video_cover', 'video_addr',
+              'image_list', 'tags', 'upload_time', 'ip_location')
+    __slots__ = ('note_id', 'note_url', 'note_type', 'user_id', 'nickname', 'avatar', 'title', 'desc',
+                 'liked_count', 'collected_count', 'comment_count', 'share_count', 'video_key',
+                 'image_list', 'tags', 'time', 'ip_location')
+
+    @classmethod
+    def from_raw(cls, data: dict):
+        """
+            :param data: feed 接口返回的 items[0], 需要带上 'url'
+        """
+        card = data['note_card']
+        user = card['user']
+        interact = card['interact_info']
+        self = cls.__new__(cls)
+        self.note_id = data['id']
+        self.note_url = data['url']
+        self.note_type = '图集' if card['type'] == 'normal' else '视频'
+        self.user_id = _intern(user['user_id'])
+        self.nickname = user['nickname']
+        self.avatar = user['avatar']
+        title = card['title']
+        self.title = '无标题' if title.strip() == '' else title
+        self.desc = card['desc']
+        self.liked_count = norm_count(interact['liked_count'])
+        self.collected_count = norm_count(interact['collected_count'])
+        self.comment_count = norm_count(interact['comment_count'])
+        self.share_count = norm_count(interact['share_count'])
+        self.image_list = _picture_urls(card['image_list'])
+        self.video_key = card['video']['consumer']['origin_video_key'] if self.note_type == '视频' else None
+        self.tags = _names(card['tag_list'])
+        self.time = card['time']
+        self.ip_location = _intern_or_none(card.get('ip_location', '未知'))
+        return self
+
+    @property
+    def home_url(self):
+        return HOME_URL.format(user_id=self.user_id)
+
+    @property
+    def upload_time(self):
+        return timestamp_to_str(self.time)
+
+    @property
+    def video_cover(self):
+        return self.image_list[0] if self.video_key is not None and self.image_list else None
+
+    @property
+    def video_addr(self):
+        return VIDEO_URL.format(key=self.video_key) if self.video_key is not None else None
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+class Comment():
+    """
+        评论, 对应 handle_comment_info; 一级评论的 sub_comments 为二级评论的 Comment 列表
+        parent_id 为回复的目标评论 (target_comment), 一级评论为 None; 不在 FIELDS 里, 由评论导出展开成行时使用
+    """
+    FIELDS = ('note_id', 'note_url', 'comment_id', 'user_id', 'home_url', 'nickname', 'avatar', 'content',
+              'show_tags', 'like_count', 'upload_time', 'ip_location', 'pictures')
+    __slots__ = ('note_id', 'note_url', 'comment_id', 'user_id', 'nickname', 'avatar', 'content', 'show_tags',
+                 'like_count', 'create_time', 'ip_location', 'pictures', 'parent_id', 'sub_comments')
+
+    @classmethod
+    def from_raw(cls, data: dict, note_url: str = None, note_id: str = None):
+        """
+            :param data: 评论接口返回的一条评论
+            :param note_url: 笔记url, 不传时读取 data['note_url']
+            :param note_id: 传入后同一篇笔记的所有评论共用这个字符串
+        """
+        user = data['user_info']
+        self = cls.__new__(cls)
+        self.note_id = note_id if note_id is not None else data['note_id']
+        self.note_url = note_url if note_url is not None else data['note_url']
+        self.comment_id = data['id']
+        self.user_id = _intern(user['user_id'])
+        self.nickname = _intern(user['nickname'])
+        self.avatar = _intern(user['image'])
+        self.content = data['content']
+        show_tags = data['show_tags']
+        self.show_tags = () if show_tags == [] else show_tags
+        self.like_count = norm_count(data['like_count'])
+        self.create_time = data['create_time']
+        self.ip_location = _intern_or_none(data.get('ip_location', '未知'))
+        pictures = data.get('pictures')
+        self.pictures = (_picture_urls(pictures) or ()) if pictures else ()
+        target = data.get('target_comment')
+        self.parent_id = target.get('id') if target else None
+        subs = data.get('sub_comments')
+        self.sub_comments = [cls.from_raw(sub, self.note_url, self.note_id) for sub in subs] if subs else ()
+        return self
+
+    @property
+    def home_url(self):
+        return HOME_URL.format(user_id=self.user_id)
+
+    @property
+    def upload_time(self):
+        return timestamp_to_str(self.create_time)
+
+    def to_dict(self):
+        row = {field: getattr(self, field) for field in self.FIELDS}
+        # 空列表以共享的 () 保存, 导出时还原成 list
+        if row['show_tags'] == ():
+            row['show_tags'] = []
+        row['pictures'] = list(row['pictures'])
+        return row
+
+
+class User():
+    """
+        用户信息, 对应 handle_user_info
+    """
+    FIELDS = ('user_id', 'home_url', 'nickname', 'avatar', 'red_id', 'gender', 'ip_location', 'desc',
+              'follows', 'fans', 'interaction', 'tags')
+    __slots__ = ('user_id', 'nickname', 'avatar', 'red_id', 'gender', 'ip_location', 'desc',
+                 'follows', 'fans', 'interaction', 'tags')
+
+    @classmethod
+    def from_raw(cls, data: dict, user_id: str):
+        """
+            :param data: otherinfo 接口返回的 data
+        """
+        basic = data['basic_info']
+        interactions = data['interactions']
+        self = cls.__new__(cls)
+        self.user_id = user_id
+        self.nickname = basic['nickname']
+        self.avatar = basic['imageb']
+        self.red_id = basic['red_id']
+        self.gender = GENDERS.get(basic['gender'], '未知')
+        self.ip_location = _intern_or_none(basic['ip_location'])
+        self.desc = basic['desc']
+        self.follows = norm_count(interactions[0]['count'])
+        self.fans = norm_count(interactions[1]['count'])
+        self.interaction = norm_count(interactions[2]['count'])
+        self.tags = _names(data['tags'])
+        return self
+
+    @property
+    def home_url(self):
+        return HOME_URL.format(user_id=self.user_id)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
@@ -0,0 +1,80 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_STATE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../datas/state.db'))
+
+
+class StateStore():
+    """
+        增量爬取的持久化状态 (sqlite)
+        seen_ids: 每个 scope (如 "search:榴莲" "user:xxx") 已经处理过的 id
+        kv: 每个 scope 的游标 / 配置等小数据, 值以 json 保存
+    """
+    def __init__(self, db_path: str = DEFAULT_STATE_PATH):
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self.conn:
+            if db_path != ':memory:':
+                self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS seen_ids ('
+                'scope TEXT NOT NULL, item_id TEXT NOT NULL, first_seen INTEGER NOT NULL, '
+                'PRIMARY KEY (scope, item_id)) WITHOUT ROWID'
+            )
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS kv ('
+                'scope TEXT NOT NULL, key TEXT NOT NULL, value TEXT, updated_at INTEGER NOT NULL, '
+                'PRIMARY KEY (scope, key)) WITHOUT ROWID'
+            )
+
+    def filter_unseen(self, scope: str, item_ids: list):
+        """
+            过滤出没有处理过的 id, 保持原有顺序
+        """
+        item_ids = [i for i in item_ids if i]
+        if not item_ids:
+            return []
+        seen = set()
+        with self._lock:
+            for start in range(0, len(item_ids), 500):
+                chunk = item_ids[start:start + 500]
+                rows = self.conn.execute(
+                    f'SELECT item_id FROM seen_ids WHERE scope = ? AND item_id IN ({",".join("?" * len(chunk))})',
+                    [scope, *chunk]
+                ).fetchall()
+                seen.update(row[0] for row in rows)
+        return [i for i in item_ids if i not in seen]
+
+    def mark_seen(self, scope: str, item_ids: list):
+        now = int(time.time())
+        with self._lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO seen_ids (scope, item_id, first_seen) VALUES (?, ?, ?)',
+                [(scope, i, now) for i in item_ids if i]
+            )
+
+    def count_seen(self, scope: str):
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM seen_ids WHERE scope = ?', (scope,)).fetchone()[0]
+
+    def get(self, scope: str, key: str, default=None):
+        with self._lock:
+            row = self.conn.execute('SELECT value FROM kv WHERE scope = ? AND key = ?', (scope, key)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, scope: str, key: str, value):
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO kv (scope, key, value, updated_at) VALUES (?, ?, ?, ?)',
+                (scope, key, json.dumps(value, ensure_ascii=False), int(time.time()))
+            )
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
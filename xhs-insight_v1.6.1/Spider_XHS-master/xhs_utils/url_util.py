@@ -0,0 +1,174 @@
+import re
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from xhs_utils import metrics_util as metrics
+
+CANONICAL_NOTE_URL = 'https://www.xiaohongshu.com/explore/{note_id}'
+SHORT_LINK_HOSTS = ('xhslink.com',)
+# 分享出来的笔记链接: /explore/<id>, /discovery/item/<id>, /user/profile/<uid>/<id>
+NOTE_PATH_PREFIXES = ('/explore/', '/discovery/item/', '/user/profile/')
+# 其他页面 (如 /search_result/<id>) 的链接: 最后一段是 24 位十六进制的笔记 id 时也当作笔记链接
+NOTE_ID_RE = re.compile(r'[0-9a-f]{24}')
+
+RESOLVE_TOTAL = metrics.REGISTRY.counter('xhs_short_link_resolve', '短链解析次数 (hit 命中缓存 / miss 请求网络 / error 解析失败)', ('result',))
+
+
+class NoteURL():
+    """
+        解析后的笔记链接: note_id / xsec_token / xsec_source
+    """
+    __slots__ = ('note_id', 'xsec_token', 'xsec_source')
+
+    def __init__(self, note_id: str, xsec_token: str = None, xsec_source: str = None):
+        self.note_id = note_id
+        self.xsec_token = xsec_token
+        self.xsec_source = xsec_source
+
+    @property
+    def url(self):
+        """
+            规范化的笔记链接, get_note_info 可以直接使用
+        """
+        params = {k: v for k, v in (('xsec_token', self.xsec_token), ('xsec_source', self.xsec_source)) if v}
+        url = CANONICAL_NOTE_URL.format(note_id=self.note_id)
+        return f'{url}?{urllib.parse.urlencode(params)}' if params else url
+
+    def to_dict(self):
+        return {'note_id': self.note_id, 'xsec_token': self.xsec_token, 'xsec_source': self.xsec_source, 'url': self.url}
+
+    def __eq__(self, other):
+        return isinstance(other, NoteURL) and (self.note_id, self.xsec_token, self.xsec_source) == (other.note_id, other.xsec_token, other.xsec_source)
+
+    def __repr__(self):
+        return f'NoteURL(note_id={self.note_id!r}, xsec_token={self.xsec_token!r}, xsec_source={self.xsec_source!r})'
+
+
+def is_short_link(url: str, short_hosts=SHORT_LINK_HOSTS):
+    host = (urllib.parse.urlparse(url).hostname or '').lower()
+    return any(host == h or host.endswith('.' + h) for h in short_hosts)
+
+
+def parse_note_url(url: str):
+    """
+        从笔记链接中解析 note_id / xsec_token / xsec_source, 不是笔记链接时返回 None
+        查询参数按 url 编码解码, xsec_token 末尾的 '=' 不会被截断
+    """
+    parsed = urllib.parse.urlparse(url)
+    path = parsed.path.rstrip('/')
+    note_id = path.split('/')[-1]
+    if not path.startswith(NOTE_PATH_PREFIXES):
+        if not NOTE_ID_RE.fullmatch(note_id):
+            return None
+    elif not note_id or (path.startswith('/user/profile/') and path.count('/') < 4):
+        return None
+    query = urllib.parse.parse_qs(parsed.query)
+    return NoteURL(note_id, query.get('xsec_token', [None])[0], query.get('xsec_source', [None])[0])
+
+
+class Short_Link_Resolver():
+    """
+        xhslink.com 短链解析
+        - 复用连接池的 requests.Session, 逐跳读取 Location, 拿到笔记链接就停止, 不下载最终的网页
+        - 短链 -> 笔记链接 的映射按 TTL 缓存 (LRU), 同一个分享链接重复解析不再请求网络
+        - 非短链直接解析, 不走网络也不占缓存
+    """
+    def __init__(self, ttl: float = 24 * 3600, maxsize: int = 10000, timeout: float = 10.0, max_redirects: int = 5,
+                 short_hosts=SHORT_LINK_HOSTS, pool_size: int = 10):
+        """
+            :param ttl: 缓存有效期 (秒)
+            :param maxsize: 最多缓存的短链数量
+            :param timeout: 每一跳的超时
+            :param max_redirects: 最多跟随的跳转次数
+            :param short_hosts: 视为短链的域名
+            :param pool_size: 连接池大小
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.short_hosts = tuple(short_hosts)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36'
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return entry[0]
+
+    def _cache_set(self, key, value):
+        with self._lock:
+            self._cache[key] = (value, time.time() + self.ttl)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def _follow(self, url: str, proxies: dict = None):
+        for _ in range(self.max_redirects):
+            response = self.session.get(url, allow_redirects=False, stream=True, timeout=self.timeout, proxies=proxies)
+            location = response.headers.get('Location')
+            response.close()
+            if not location:
+                raise Exception(f'短链解析失败: HTTP {response.status_code}, 没有跳转地址')
+            url = urllib.parse.urljoin(url, location)
+            note = parse_note_url(url)
+            if note is not None:
+                return note
+        raise Exception(f'短链解析失败: 超过 {self.max_redirects} 次跳转')
+
+    def resolve(self, url: str, proxies: dict = None):
+        """
+            解析分享链接为 NoteURL
+            :param url: 笔记链接或 xhslink 短链
+            :param proxies: requests 的 proxies 字典
+            返回 NoteURL, 不是笔记链接时抛出异常
+        """
+        url = url.strip()
+        if not is_short_link(url, self.short_hosts):
+            note = parse_note_url(url)
+            if note is None:
+                raise Exception(f'不是笔记链接: {url}')
+            return note
+        # 缓存键不带协议, http / https 分享的同一个短链只解析一次
+        key = url.split('://', 1)[-1].rstrip('/')
+        note = self._cache_get(key)
+        if note is not None:
+            self.hits += 1
+            RESOLVE_TOTAL.inc(result='hit')
+            return note
+        self.misses += 1
+        try:
+            with metrics.span('resolve_short_link'):
+                note = self._follow(url, proxies)
+        except Exception:
+            RESOLVE_TOTAL.inc(result='error')
+            raise
+        RESOLVE_TOTAL.inc(result='miss')
+        self._cache_set(key, note)
+        return note
+
+    def stats(self):
+        with self._lock:
+            size = len(self._cache)
+        return {'size': size, 'hits': self.hits, 'misses': self.misses}
+
+
+# 进程内共享的解析器, 和 default_rate_limiter 一样按需替换
+default_resolver = Short_Link_Resolver()
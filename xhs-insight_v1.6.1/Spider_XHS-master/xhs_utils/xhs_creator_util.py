@@ -1,15 +1,12 @@
 import json
 
-import execjs
+from xhs_utils.xhs_util import compile_static
 
-try:
-    js = execjs.compile(open(r'../static/xhs_creator_xs.js', 'r', encoding='utf-8').read())
-except:
-    js = execjs.compile(open(r'static/xhs_creator_xs.js', 'r', encoding='utf-8').read())
+CREATOR_JS = 'xhs_creator_xs.js'
 
 
 def generate_xs(a1, api, data=''):
-    ret = js.call('get_request_headers_params', api, data, a1)
+    ret = compile_static(CREATOR_JS).call('get_request_headers_params', api, data, a1)
     xs, xt = ret['xs'], ret['xt']
     if data:
         data = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
@@ -1,37 +1,69 @@
+import functools
+import itertools
 import json
-import math
+import os
 import random
-import execjs
+import threading
+import time
+from types import MappingProxyType
+from xhs_utils import codec_util
 from xhs_utils.cookie_util import trans_cookies
+from xhs_utils.metrics_util import timed
 
-try:
-    js = execjs.compile(open(r'../static/xhs_xs_xsc_56.js', 'r', encoding='utf-8').read())
-except:
-    js = execjs.compile(open(r'static/xhs_xs_xsc_56.js', 'r', encoding='utf-8').read())
+STATIC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../static'))
+XS_JS = 'xhs_xs_xsc_56.js'
+XRAY_JS = 'xhs_xray.js'
 
-try:
-    xray_js = execjs.compile(open(r'../static/xhs_xray.js', 'r', encoding='utf-8').read())
-except:
-    xray_js = execjs.compile(open(r'static/xhs_xray.js', 'r', encoding='utf-8').read())
+_compiled = {}
+_compile_lock = threading.Lock()
+
+
+def compile_static(name):
+    """
+        按模块所在位置加载 static 下的 js, 不依赖进程的工作目录
+        node 以 static 为 cwd 运行, js 里的 require('./xxx.js') 也能找到
+        第一次用到时才导入 execjs 并编译, 之后复用, 导入本模块不再有任何 js 开销
+    """
+    ctx = _compiled.get(name)
+    if ctx is None:
+        with _compile_lock:
+            ctx = _compiled.get(name)
+            if ctx is None:
+                import execjs
+                with open(os.path.join(STATIC_DIR, name), 'r', encoding='utf-8') as f:
+                    ctx = _compiled[name] = execjs.compile(f.read(), cwd=STATIC_DIR)
+    return ctx
+
+
+def __getattr__(name):
+    # 兼容直接使用 xhs_util.js / xhs_util.xray_js 的旧代码
+    if name == 'js':
+        return compile_static(XS_JS)
+    if name == 'xray_js':
+        return compile_static(XRAY_JS)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 def generate_x_b3_traceid(len=16):
-    x_b3_traceid = ""
-    for t in range(len):
-        x_b3_traceid += "abcdef0123456789"[math.floor(16 * random.random())]
-    return x_b3_traceid
+    # len 个随机 hex 字符, 和原来逐字符拼接的结果同分布
+    return f'{random.getrandbits(4 * len):0{len}x}'
 
 def generate_xs_xs_common(a1, api, data='', method='POST'):
-    ret = js.call('get_request_headers_params', api, data, a1, method)
+    ret = compile_static(XS_JS).call('get_request_headers_params', api, data, a1, method)
     xs, xt, xs_common = ret['xs'], ret['xt'], ret['xs_common']
     return xs, xt, xs_common
 
 def generate_xs(a1, api, data=''):
-    ret = js.call('get_xs', api, data, a1)
+    ret = compile_static(XS_JS).call('get_xs', api, data, a1)
     xs, xt = ret['X-s'], ret['X-t']
     return xs, xt
 
+# xhs_xray.js 的 traceId: 16 位 hex 的 (毫秒时间戳 << 23 | 23 位自增序号) + 16 位 hex 的 64 位随机数
+# 原生实现, 不再为每个请求启动一次 node
+_xray_seq = itertools.count(random.getrandbits(23))
+
 def generate_xray_traceid():
-    return xray_js.call('traceId')
+    head = ((int(time.time() * 1000) << 23) | (next(_xray_seq) & 0x7fffff)) & 0xffffffffffffffff
+    return f'{head:016x}{random.getrandbits(64):016x}'
 def get_common_headers():
     return {
         "authority": "www.xiaohongshu.com",
@@ -50,8 +82,7 @@ def get_common_headers():
         "upgrade-insecure-requests": "1",
         "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
     }
-def get_request_headers_template():
-    return {
+REQUEST_HEADERS_TEMPLATE = MappingProxyType({
         "authority": "edith.xiaohongshu.com",
         "accept": "application/json, text/plain, */*",
         "accept-language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
@@ -72,26 +103,58 @@ def get_request_headers_template():
         "x-s": "",
         "x-s-common": "",
         "x-t": "",
-        "x-xray-traceid": generate_xray_traceid()
-    }
+        "x-xray-traceid": ""
+})
+
+def fill_headers(xs, xt, xs_common):
+    # 模板 + 签名 + trace id, 一次拷贝
+    return {**REQUEST_HEADERS_TEMPLATE, 'x-s': xs, 'x-t': str(xt), 'x-s-common': xs_common,
+            'x-b3-traceid': generate_x_b3_traceid(), 'x-xray-traceid': generate_xray_traceid()}
+
+def get_request_headers_template():
+    headers = dict(REQUEST_HEADERS_TEMPLATE)
+    headers['x-xray-traceid'] = generate_xray_traceid()
+    return headers
+
+
+class SigningContext():
+    """
+        一个 cookie 的签名上下文, 同一个 cookie 的所有请求共用
+        - cookie 串和 a1 只解析一次
+        - 请求头模板只读, 每次请求用一次字典拷贝填入签名和 trace id
+        cookies 会直接交给 requests, 调用方不要修改
+    """
+    __slots__ = ('cookies_str', 'cookies', 'a1')
+
+    def __init__(self, cookies_str: str):
+        self.cookies_str = cookies_str
+        self.cookies = trans_cookies(cookies_str)
+        self.a1 = self.cookies['a1']
+
+    def sign(self, api, data='', method='POST'):
+        """
+            请求体只序列化一次, 同一份字符串既参与签名又被发送
+            返回 headers, cookies, 请求体 bytes (没有请求体时为 b'')
+        """
+        body = codec_util.dumps(data) if data else b''
+        xs, xt, xs_common = generate_xs_xs_common(self.a1, api, body.decode('utf-8') if body else data, method)
+        return fill_headers(xs, xt, xs_common), self.cookies, body
+
+
+@functools.lru_cache(maxsize=1024)
+def get_signing_context(cookies_str: str) -> SigningContext:
+    return SigningContext(cookies_str)
 
 def generate_headers(a1, api, data='', method='POST'):
     xs, xt, xs_common = generate_xs_xs_common(a1, api, data, method)
-    x_b3_traceid = generate_x_b3_traceid()
-    headers = get_request_headers_template()
-    headers['x-s'] = xs
-    headers['x-t'] = str(xt)
-    headers['x-s-common'] = xs_common
-    headers['x-b3-traceid'] = x_b3_traceid
+    headers = fill_headers(xs, xt, xs_common)
     if data:
         data = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
     return headers, data
 
+@timed('sign')
 def generate_request_params(cookies_str, api, data='', method='POST'):
-    cookies = trans_cookies(cookies_str)
-    a1 = cookies['a1']
-    headers, data = generate_headers(a1, api, data, method)
-    return headers, cookies, data
+    return get_signing_context(cookies_str).sign(api, data, method)
 
 def splice_str(api, params):
     url = api + '?'
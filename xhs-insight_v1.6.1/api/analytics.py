@@ -0,0 +1,232 @@
+import glob
+import json
+import os
+from typing import Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from .crawler_service import add_spider_path
+from .models import CrawledNote, ScrapeResult
+
+add_spider_path()
+from xhs_utils.norm_util import norm_counts
+from xhs_utils.url_util import parse_note_url
+
+# --- Count Parsing ---
+# XHS renders interaction counts as display strings ("1.2万", "10万+", "3,456"); the spider's
+# norm_counts already parses them (each distinct raw value once), so the API shares its rules.
+
+def parse_counts(values: Iterable) -> np.ndarray:
+    """Converts XHS display counts to an int64 array. Unparseable values count as 0."""
+    return np.asarray(norm_counts(list(values)), dtype=np.int64)
+
+# --- Cohort Container ---
+
+class NoteCohort:
+    """Columnar view of a set of notes; every column has one entry per note."""
+
+    def __init__(self, keyword: str, note_ids: List[str], titles: List[str], liked, collected, comments, shares, fans):
+        self.keyword = keyword
+        self.note_ids = note_ids
+        self.titles = titles
+        self.liked = parse_counts(liked)
+        self.collected = parse_counts(collected)
+        self.comments = parse_counts(comments)
+        self.shares = parse_counts(shares)
+        self.fans = parse_counts(fans)
+
+    def __len__(self):
+        return len(self.note_ids)
+
+    @classmethod
+    def from_records(cls, keyword: str, records: List[dict]) -> "NoteCohort":
+        """Builds a cohort from handle_note_info-style dicts (or the /api/analyze stats shape)."""
+        def col(key, alias):
+            return [r.get(key, r.get(alias)) for r in records]
+
+        return cls(
+            keyword=keyword,
+            note_ids=[str(r.get("note_id") or r.get("id") or "") for r in records],
+            titles=[r.get("title") or "" for r in records],
+            liked=col("liked_count", "likes"),
+            collected=col("collected_count", "collects"),
+            comments=col("comment_count", "comments"),
+            shares=col("share_count", "shares"),
+            fans=col("fans", "followers"),
+        )
+
+# --- Loaders ---
+
+def _matches_keyword(record: dict, keyword: str) -> bool:
+    if not keyword:
+        return True
+    if record.get("keyword") == keyword:
+        return True
+    haystack = [record.get("title") or "", record.get("desc") or ""] + list(record.get("tags") or [])
+    return any(keyword in str(h) for h in haystack)
+
+def load_jsonl_records(path: str, keyword: str = "") -> List[dict]:
+    """
+    Reads crawled notes from a JSONL file, or from every *.jsonl / info.json
+    (as written by download_note) below a directory.
+    """
+    if os.path.isdir(path):
+        files = glob.glob(os.path.join(path, "**", "*.jsonl"), recursive=True)
+        files += glob.glob(os.path.join(path, "**", "info.json"), recursive=True)
+    else:
+        files = [path]
+
+    records = []
+    for file_path in files:
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict) and _matches_keyword(record, keyword):
+                    records.append(record)
+    return records
+
+def load_db_records(db: Session, user_id: int, keyword: str = "") -> List[dict]:
+    """
+    Reads the user's notes tagged with, or titled after, the keyword. crawled_notes holds the integer
+    counts; analyzed notes that never reached it (results saved before the table existed) are read
+    from scrape_results, newest analysis first, so each note appears once.
+    """
+    query = db.query(
+        CrawledNote.note_id, CrawledNote.title, CrawledNote.liked_count, CrawledNote.collected_count,
+        CrawledNote.comment_count, CrawledNote.share_count, CrawledNote.fans
+    ).filter(CrawledNote.user_id == user_id)
+    if keyword:
+        query = query.filter(or_(CrawledNote.keyword == keyword, CrawledNote.title.like(f"%{keyword}%")))
+
+    records = [
+        {"note_id": note_id, "title": title, "liked_count": liked, "collected_count": collected,
+         "comment_count": comments, "share_count": shares, "fans": fans}
+        for note_id, title, liked, collected, comments, shares, fans in query.all()
+    ]
+
+    results = db.query(
+        ScrapeResult.original_url, ScrapeResult.title, ScrapeResult.stats_json, ScrapeResult.author_json
+    ).filter(ScrapeResult.user_id == user_id)
+    if keyword:
+        results = results.filter(ScrapeResult.title.like(f"%{keyword}%"))
+
+    seen = {record["note_id"] for record in records}
+    for url, title, stats, author in results.order_by(ScrapeResult.created_at.desc(), ScrapeResult.id.desc()):
+        note = parse_note_url(url or "")
+        note_id = note.note_id if note else url or ""
+        if note_id in seen:
+            continue
+        seen.add(note_id)
+        stats, author = stats or {}, author or {}
+        # stats_json keeps the display strings as crawled; NoteCohort parses them
+        records.append({"note_id": note_id, "title": title, "liked_count": stats.get("likes"),
+                        "collected_count": stats.get("collects"), "comment_count": stats.get("comments"),
+                        "share_count": stats.get("shares"), "fans": author.get("fans", author.get("followers"))})
+    return records
+
+# --- Metrics ---
+
+def percentile_ranks(values: np.ndarray) -> np.ndarray:
+    """Percentile rank (0-100, ties averaged) of each value within the array. NaNs stay NaN."""
+    ranks = np.full(values.shape, np.nan)
+    valid = ~np.isnan(values)
+    n = int(valid.sum())
+    if n == 0:
+        return ranks
+    sorted_vals = np.sort(values[valid])
+    left = np.searchsorted(sorted_vals, values[valid], side="left")
+    right = np.searchsorted(sorted_vals, values[valid], side="right")
+    ranks[valid] = (left + right) / 2.0 / n * 100.0
+    return ranks
+
+def robust_zscores(values: np.ndarray) -> np.ndarray:
+    """Median/MAD based z-scores, so a handful of viral notes cannot mask each other."""
+    z = np.full(values.shape, np.nan)
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return z
+    median = np.median(values[valid])
+    mad = np.median(np.abs(values[valid] - median)) * 1.4826
+    if mad == 0:
+        mad = np.mean(np.abs(values[valid] - median)) * 1.2533
+    if mad == 0:
+        z[valid] = 0.0
+        return z
+    z[valid] = (values[valid] - median) / mad
+    return z
+
+def compute_cohort_metrics(cohort: NoteCohort, viral_threshold: float = 3.5) -> dict:
+    """Computes per-note metrics for the whole cohort in a handful of array operations."""
+    interactions = (cohort.liked + cohort.collected + cohort.comments + cohort.shares).astype(np.float64)
+    fans = cohort.fans.astype(np.float64)
+    liked = cohort.liked.astype(np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        engagement_rate = np.where(fans > 0, interactions / fans, np.nan)
+        collect_like_ratio = np.where(liked > 0, cohort.collected / liked, np.nan)
+
+    # Interaction counts are heavy-tailed; outliers are judged on a log scale.
+    viral_z = robust_zscores(np.log1p(interactions))
+
+    return {
+        "interactions": interactions,
+        "engagement_rate": engagement_rate,
+        "collect_like_ratio": collect_like_ratio,
+        "interaction_percentile": percentile_ranks(interactions),
+        "engagement_percentile": percentile_ranks(engagement_rate),
+        "viral_z": viral_z,
+        "is_viral": viral_z > viral_threshold,
+    }
+
+def _num(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else round(value, 4)
+
+def _summary(values: np.ndarray) -> dict:
+    valid = values[~np.isnan(values)]
+    if valid.size == 0:
+        return {"median": None, "p90": None, "mean": None}
+    return {"median": _num(np.median(valid)), "p90": _num(np.percentile(valid, 90)), "mean": _num(valid.mean())}
+
+def cohort_report(cohort: NoteCohort, limit: int = 50, viral_threshold: float = 3.5) -> dict:
+    """JSON-ready report: cohort summary plus the top notes by interactions."""
+    metrics = compute_cohort_metrics(cohort, viral_threshold)
+    order = np.argsort(-metrics["interactions"], kind="stable")[:limit]
+
+    notes = []
+    for i in order:
+        notes.append({
+            "note_id": cohort.note_ids[i],
+            "title": cohort.titles[i],
+            "likes": int(cohort.liked[i]),
+            "collects": int(cohort.collected[i]),
+            "comments": int(cohort.comments[i]),
+            "shares": int(cohort.shares[i]),
+            "fans": int(cohort.fans[i]),
+            "engagement_rate": _num(metrics["engagement_rate"][i]),
+            "collect_like_ratio": _num(metrics["collect_like_ratio"][i]),
+            "interaction_percentile": _num(metrics["interaction_percentile"][i]),
+            "engagement_percentile": _num(metrics["engagement_percentile"][i]),
+            "viral_z": _num(metrics["viral_z"][i]),
+            "is_viral": bool(metrics["is_viral"][i]),
+        })
+
+    return {
+        "keyword": cohort.keyword,
+        "count": len(cohort),
+        "viral_count": int(metrics["is_viral"].sum()),
+        "summary": {
+            "interactions": _summary(metrics["interactions"]),
+            "engagement_rate": _summary(metrics["engagement_rate"]),
+            "collect_like_ratio": _summary(metrics["collect_like_ratio"]),
+        },
+        "notes": notes,
+    }
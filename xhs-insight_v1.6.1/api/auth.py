@@ -0,0 +1,109 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event
+
+from .models import User
+
+# --- Auth Cache ---
+# Authenticated requests used to decode the JWT and query users on every call. Decoded
+# tokens are cached by hash until their exp, and users by id as read-only snapshots that
+# are dropped whenever the row is updated or deleted.
+
+TOKEN_CACHE_SIZE = 10000
+USER_CACHE_SIZE = 2000
+USER_CACHE_TTL = 300  # seconds; bounds staleness for writes made outside this process
+
+class CachedUser:
+    """Read-only snapshot of a User row, safe to share across requests and sessions."""
+    __slots__ = ("id", "email", "gemini_api_key")
+
+    def __init__(self, id: int, email: str, gemini_api_key: Optional[str]):
+        self.id = id
+        self.email = email
+        self.gemini_api_key = gemini_api_key
+
+    @classmethod
+    def from_row(cls, user: User) -> "CachedUser":
+        return cls(user.id, user.email, user.gemini_api_key)
+
+class TTLCache:
+    """Thread-safe LRU where every entry carries its own absolute expiry (time.time())."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, expires_at: float):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+token_cache = TTLCache(TOKEN_CACHE_SIZE)
+user_cache = TTLCache(USER_CACHE_SIZE)
+
+def token_key(token: str) -> str:
+    # never keep raw bearer tokens in memory longer than the request
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def get_cached_claims(token: str) -> Optional[dict]:
+    return token_cache.get(token_key(token))
+
+def cache_claims(token: str, claims: dict):
+    exp = claims.get("exp")
+    if exp:
+        token_cache.set(token_key(token), claims, float(exp))
+
+def get_cached_user(user_id: int) -> Optional[CachedUser]:
+    return user_cache.get(user_id)
+
+def cache_user(user: User) -> CachedUser:
+    cached = CachedUser.from_row(user)
+    user_cache.set(user.id, cached, time.time() + USER_CACHE_TTL)
+    return cached
+
+def invalidate_user(user_id: int):
+    user_cache.pop(user_id)
+
+def cache_stats() -> dict:
+    return {
+        "tokens": {"size": len(token_cache), "hits": token_cache.hits, "misses": token_cache.misses},
+        "users": {"size": len(user_cache), "hits": user_cache.hits, "misses": user_cache.misses},
+    }
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_on_change(mapper, connection, target):
+    invalidate_user(target.id)
@@ -1,9 +1,10 @@
 import os
 import sys
+from contextlib import nullcontext
 from sqlalchemy.orm import Session
 from datetime import datetime
-from typing import Optional
-from .models import Cookie
+from typing import Callable, List, Optional
+from .models import Cookie, CrawledNote
 
 # --- Lazy Wrapper Initialization ---
 # We do NOT import xhs_ai_wrapper at the top level to avoid ImportError 
@@ -56,22 +57,78 @@ def _get_crawler():
         
     return _crawler_instance
 
+# --- Metrics ---
+# Stage timings share the spider's registry (xhs_utils.metrics_util, stdlib only) so one
+# /metrics scrape covers the API stages and every XHS_Apis HTTP call. Spans become no-ops
+# when the spider folder is not deployed.
+_metrics = None
+_histograms = {}
+SPIDER_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Spider_XHS-master'))
+
+def add_spider_path():
+    """Puts the spider folder on sys.path so its stdlib-only xhs_utils modules can be imported."""
+    if os.path.isdir(SPIDER_DIR) and SPIDER_DIR not in sys.path:
+        sys.path.append(SPIDER_DIR)
+
+def get_metrics():
+    global _metrics
+    if _metrics is None:
+        add_spider_path()
+        try:
+            from xhs_utils import metrics_util
+            _histograms['gemini'] = metrics_util.REGISTRY.histogram(
+                'xhs_gemini_request_duration_seconds', 'Gemini generate_content latency', ('model', 'status'))
+            _histograms['api'] = metrics_util.REGISTRY.histogram(
+                'xhs_api_request_duration_seconds', 'API request latency', ('route', 'method', 'status'))
+            _metrics = metrics_util
+        except ImportError as e:
+            print(f"⚠️ Metrics unavailable: {e}")
+            _metrics = False
+    return _metrics or None
+
+def span(name: str, histogram: Optional[str] = None, **labels):
+    """Times a block as stage `name` (or into a named histogram: 'gemini', 'api')."""
+    metrics = get_metrics()
+    if metrics is None:
+        return nullcontext(labels)
+    return metrics.span(name, _histograms.get(histogram), **labels)
+
+def resolve_note_url(url: str) -> dict:
+    """
+    Resolves a shared link (xhslink.com short links included) to {note_id, xsec_token, xsec_source, url}.
+    Short links are cached by the spider's resolver, so repeated shares cost no network call.
+    Without the spider (Mock mode) the url passes through untouched.
+    """
+    passthrough = {"note_id": None, "xsec_token": None, "xsec_source": None, "url": url}
+    if get_metrics() is None:  # also puts the spider folder on sys.path
+        return passthrough
+    from xhs_utils.url_util import default_resolver, is_short_link, parse_note_url
+    if is_short_link(url, default_resolver.short_hosts):
+        return default_resolver.resolve(url).to_dict()
+    # not a recognizable note link: let the crawler report the error as before
+    note = parse_note_url(url)
+    return note.to_dict() if note else passthrough
+
 def get_valid_cookie(db: Session, user_id: int):
-    cookie = db.query(Cookie).filter(
-        Cookie.user_id == user_id,
-        Cookie.is_valid == True
-    ).order_by(Cookie.last_used.asc()).first()
-    
-    if not cookie:
-        raise Exception("COOKIE_EXHAUSTED")
-        
-    cookie.last_used = datetime.utcnow()
-    db.commit()
+    with span('cookie_select'):
+        cookie = db.query(Cookie).filter(
+            Cookie.user_id == user_id,
+            Cookie.is_valid == True
+        ).order_by(Cookie.last_used.asc()).first()
+
+        if not cookie:
+            raise Exception("COOKIE_EXHAUSTED")
+
+        cookie.last_used = datetime.utcnow()
+        db.commit()
     return cookie
 
-def fetch_xhs_data(db: Session, user_id: Optional[int], url: str, manual_cookie: Optional[str] = None):
+def fetch_xhs_data(db: Session, user_id: Optional[int], url: str, manual_cookie: Optional[str] = None,
+                   on_cookie: Optional[Callable[[dict], None]] = None):
     """
     Fetches data using the lazy-loaded crawler instance with robust fallback.
+    on_cookie, if given, is called with {source, cookie_id, note} each time a cookie is picked
+    (never the cookie value) so streaming callers can report progress.
     """
     crawler = _get_crawler()
     mock_crawler = _get_mock_wrapper()
@@ -79,7 +136,8 @@ def fetch_xhs_data(db: Session, user_id: Optional[int], url: str, manual_cookie:
     def safe_crawl(target_url, cookie_val):
         """Attempts crawl, falls back to mock if JS runtime is missing."""
         try:
-            return crawler.get_note_detail(target_url, cookie_val)
+            with span('xhs_fetch'):
+                return crawler.get_note_detail(target_url, cookie_val)
         except Exception as e:
             err_msg = str(e)
             # Detect Missing Node.js / ExecJS errors
@@ -90,6 +148,8 @@ def fetch_xhs_data(db: Session, user_id: Optional[int], url: str, manual_cookie:
 
     # 1. Local Mode / Manual Cookie
     if manual_cookie or (not user_id):
+        if on_cookie:
+            on_cookie({"source": "manual" if manual_cookie else "demo", "cookie_id": None, "note": None})
         try:
             return safe_crawl(url, manual_cookie or "demo_cookie")
         except Exception as e:
@@ -104,7 +164,9 @@ def fetch_xhs_data(db: Session, user_id: Optional[int], url: str, manual_cookie:
             cookie_obj = get_valid_cookie(db, user_id)
         except Exception as e:
             raise e # No cookies left
-            
+
+        if on_cookie:
+            on_cookie({"source": "pool", "cookie_id": cookie_obj.id, "note": cookie_obj.note, "attempt": attempt + 1})
         try:
             return safe_crawl(url, cookie_obj.value)
         except Exception as e:
@@ -120,3 +182,48 @@ def fetch_xhs_data(db: Session, user_id: Optional[int], url: str, manual_cookie:
                 raise e # Real network/parsing error
                 
     raise Exception("Max retries exceeded or all cookies failed.")
+
+def _to_int(value) -> int:
+    # Counts arrive normalized by the wrapper (data_util.norm_count); anything else is treated as unknown.
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+def save_crawled_notes(db: Session, user_id: int, notes: List[dict], keyword: Optional[str] = None, commit: bool = True):
+    """
+    Bulk upserts crawled notes (wrapper get_note_detail shape) into crawled_notes,
+    keyed by (user_id, note_id). Notes without an id are skipped.
+    """
+    notes = [n for n in notes if n.get('note_id')]
+    if not notes:
+        return []
+
+    existing = {
+        row.note_id: row for row in db.query(CrawledNote).filter(
+            CrawledNote.user_id == user_id,
+            CrawledNote.note_id.in_([n['note_id'] for n in notes])
+        )
+    }
+    rows = []
+    for note in notes:
+        row = existing.get(note['note_id'])
+        if row is None:
+            row = CrawledNote(user_id=user_id, note_id=note['note_id'])
+            db.add(row)
+            existing[note['note_id']] = row
+        user = note.get('user') or {}
+        row.keyword = keyword or row.keyword
+        row.title = note.get('title') or ''
+        row.author_id = user.get('user_id') or user.get('userid')
+        row.liked_count = _to_int(note.get('likes'))
+        row.collected_count = _to_int(note.get('collected'))
+        row.comment_count = _to_int(note.get('comments'))
+        row.share_count = _to_int(note.get('shares'))
+        if user.get('fans') is not None:
+            row.fans = _to_int(user.get('fans'))
+        row.crawled_at = datetime.utcnow()
+        rows.append(row)
+    if commit:
+        db.commit()
+    return rows
@@ -1,20 +1,30 @@
-from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.responses import JSONResponse
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker, Session
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime, timedelta
+import json
 import os
+import queue
 import re
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import jwt
-from passlib.context import CryptContext
 
 # Import models & service from local api module
-from .models import Base, User, Cookie, ScrapeResult
-from .crawler_service import fetch_xhs_data
+from .models import Base, User, Cookie, ScrapeResult, init_db
+from . import passwords
+from .auth import CachedUser, cache_claims, cache_user, get_cached_claims, get_cached_user
+from .crawler_service import fetch_xhs_data, resolve_note_url, save_crawled_notes, get_metrics, span
 
 # --- Configuration ---
 SECRET_KEY = os.environ.get("JWT_SECRET", "supersecretkey_change_me_in_production")
@@ -27,15 +37,32 @@ if os.environ.get("VERCEL"):
 else:
     SQLALCHEMY_DATABASE_URL = "sqlite:///./xhs_insight.db"
 
+# Crawl exports (JSONL / download_note info.json) used as an analytics source
+EXPORT_DATA_DIR = os.environ.get(
+    "XHS_EXPORT_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "Spider_XHS-master", "datas"))
+)
+
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base.metadata.create_all(bind=engine)
+# Skips DDL on warm databases (schema fingerprint in PRAGMA user_version)
+init_db(engine)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/token", auto_error=False)
 
 app = FastAPI(title="XHS-Insight API")
 
+# --- Instrumentation ---
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    # Root span: stage spans opened while handling the request share its trace id
+    with span("api_request", histogram="api", method=request.method) as labels:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        labels["route"] = route.path if route else "unmatched"
+        labels["status"] = response.status_code
+    return response
+
 # --- Helpers ---
 def get_db():
     db = SessionLocal()
@@ -44,11 +71,18 @@ def get_db():
     finally:
         db.close()
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    """Returns (valid, new_hash) - new_hash is set when the stored bcrypt cost is outdated."""
+    try:
+        return await passwords.hasher.verify_and_update(plain_password, hashed_password)
+    except passwords.HasherOverloaded:
+        raise HTTPException(status_code=503, detail="Too many concurrent logins, retry shortly", headers={"Retry-After": "1"})
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    try:
+        return await passwords.hasher.hash(password)
+    except passwords.HasherOverloaded:
+        raise HTTPException(status_code=503, detail="Too many concurrent registrations, retry shortly", headers={"Retry-After": "1"})
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -65,17 +99,30 @@ def clean_url(text: str) -> str:
         return match.group(1)
     return text.strip()
 
-async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Optional[CachedUser]:
     if not token: return None
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None: return None
-    except jwt.PyJWTError:
-        return None
-    return db.query(User).filter(User.email == email).first()
-
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    # Fast path: claims cached by token hash until exp, user snapshot cached by the uid claim
+    payload = get_cached_claims(token)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.PyJWTError:
+            return None
+        if payload.get("sub") is None: return None
+        cache_claims(token, payload)
+
+    user_id = payload.get("uid")
+    if user_id is not None:
+        cached = get_cached_user(user_id)
+        if cached:
+            return cached
+        user = db.get(User, user_id)
+    else:
+        # tokens issued before the uid claim
+        user = db.query(User).filter(User.email == payload["sub"]).first()
+    return cache_user(user) if user else None
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CachedUser:
     if not token:
          raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
     user = await get_current_user_optional(token, db)
@@ -115,135 +162,312 @@ def health_check():
         "status": "ok", 
         "message": "API is online", 
         "python_version": sys.version,
-        "cwd": os.getcwd()
+        "cwd": os.getcwd(),
+        "import_ms": IMPORT_MS
     }
 
+# Each report spawns an interpreter, so the route is off unless XHS_DEBUG_ENDPOINTS is set
+# and only profiles our own entry points
+DEBUG_ENDPOINTS = os.environ.get("XHS_DEBUG_ENDPOINTS", "").lower() in ("1", "true", "yes")
+IMPORTTIME_MODULES = ("api.index", "api.crawler_service")
+
+@app.get("/api/debug/importtime")
+def debug_importtime(module: str = "api.index", top: int = 20, current_user: CachedUser = Depends(get_current_user)):
+    if not DEBUG_ENDPOINTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if module not in IMPORTTIME_MODULES:
+        raise HTTPException(status_code=400, detail=f"module must be one of {', '.join(IMPORTTIME_MODULES)}")
+    from .startup import import_time_report
+    return import_time_report(module, max(1, min(top, 100)))
+
+@app.get("/metrics")
+def metrics_endpoint():
+    metrics = get_metrics()
+    if metrics is None:
+        raise HTTPException(status_code=503, detail="Metrics unavailable")
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/api/analyze")
 def analyze_get_debug():
     return JSONResponse(status_code=405, content={"detail": "Please use POST method."})
 
+# register / login are async so bcrypt waits on the hasher pool instead of holding one of
+# the shared worker threads that serve /api/analyze and the other sync routes.
+# Their DB round-trips still block, so they run on the threadpool with a short-lived session each.
+def _find_login(email: str):
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == email).first()
+        return (user.id, user.email, user.hashed_password) if user else None
+    finally:
+        db.close()
+
+def _create_user(email: str, hashed_password: str, gemini_api_key: Optional[str]) -> int:
+    db = SessionLocal()
+    try:
+        new_user = User(email=email, hashed_password=hashed_password, gemini_api_key=gemini_api_key)
+        db.add(new_user)
+        db.commit()
+        return new_user.id
+    except IntegrityError:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def _update_password_hash(user_id: int, hashed_password: str):
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.id == user_id).update({User.hashed_password: hashed_password})
+        db.commit()
+    finally:
+        db.close()
+
 @app.post("/api/register", response_model=Token)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if db_user: raise HTTPException(status_code=400, detail="Email already registered")
-    new_user = User(email=user.email, hashed_password=get_password_hash(user.password), gemini_api_key=user.gemini_api_key)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return {"access_token": create_access_token(data={"sub": new_user.email}), "token_type": "bearer"}
+async def register(user: UserCreate):
+    if await run_in_threadpool(_find_login, user.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    hashed_password = await get_password_hash(user.password)
+    try:
+        user_id = await run_in_threadpool(_create_user, user.email, hashed_password, user.gemini_api_key)
+    except IntegrityError:
+        # a concurrent sign-up with the same email won the insert while this one was hashing
+        raise HTTPException(status_code=400, detail="Email already registered")
+    return {"access_token": create_access_token(data={"sub": user.email, "uid": user_id}), "token_type": "bearer"}
 
 @app.post("/api/token", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    found = await run_in_threadpool(_find_login, form_data.username)
+    if not found:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    user_id, email, hashed_password = found
+    valid, new_hash = await verify_password(form_data.password, hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
-    return {"access_token": create_access_token(data={"sub": user.email}), "token_type": "bearer"}
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made: store it at the current cost
+        await run_in_threadpool(_update_password_hash, user_id, new_hash)
+    return {"access_token": create_access_token(data={"sub": email, "uid": user_id}), "token_type": "bearer"}
 
 @app.get("/api/users/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user)):
+def read_users_me(current_user: CachedUser = Depends(get_current_user)):
     return current_user
 
 @app.post("/api/cookies")
-def add_cookie(cookie: CookieCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def add_cookie(cookie: CookieCreate, db: Session = Depends(get_db), current_user: CachedUser = Depends(get_current_user)):
     db_cookie = Cookie(user_id=current_user.id, value=cookie.value, note=cookie.note)
     db.add(db_cookie)
     db.commit()
     return {"status": "success", "id": db_cookie.id}
 
 @app.get("/api/cookies")
-def get_cookies(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_cookies(db: Session = Depends(get_db), current_user: CachedUser = Depends(get_current_user)):
     cookies = db.query(Cookie).filter(Cookie.user_id == current_user.id).all()
     return [{"id": str(c.id), "value": c.value, "note": c.note, "status": "active" if c.is_valid else "invalid"} for c in cookies]
 
-@app.post("/api/analyze")
-def analyze_note(request: NoteRequest, db: Session = Depends(get_db), current_user: Optional[User] = Depends(get_current_user_optional)):
-    
-    # Auth Check
-    api_key = None
-    user_id = None
-    manual_cookie = None
+@app.get("/api/analytics/cohort")
+def analytics_cohort(keyword: str, source: str = "db", limit: int = 50, viral_threshold: float = 3.5,
+                     db: Session = Depends(get_db), current_user: CachedUser = Depends(get_current_user)):
+    # numpy is only needed here, keep it off the cold-start path
+    from .analytics import NoteCohort, cohort_report, load_db_records, load_jsonl_records
+
+    if source == "db":
+        records = load_db_records(db, current_user.id, keyword)
+    elif source == "jsonl":
+        if not os.path.isdir(EXPORT_DATA_DIR):
+            raise HTTPException(status_code=404, detail="Export directory not found")
+        records = load_jsonl_records(EXPORT_DATA_DIR, keyword)
+    else:
+        raise HTTPException(status_code=400, detail="source must be 'db' or 'jsonl'")
+
+    cohort = NoteCohort.from_records(keyword, records)
+    return {"status": "success", "data": cohort_report(cohort, limit=max(1, min(limit, 500)), viral_threshold=viral_threshold)}
+
+# --- Analysis Pipeline ---
+# Shared by /api/analyze (one JSON response) and /api/analyze/stream (SSE). `emit(event, data)`
+# reports each stage as it completes; the plain route passes a no-op.
+GEMINI_MODELS = ("gemini-3-flash-preview", "gemini-2.5-flash")  # primary, fallback
+SSE_HEARTBEAT_SECONDS = 10
+_stream_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("ANALYZE_STREAM_WORKERS", "16")),
+                                      thread_name_prefix="analyze-stream")
+
+def _noop_emit(event: str, data: dict):
+    pass
+
+class AnalysisCancelled(BaseException):
+    """
+    Raised in the stream worker once the SSE client has gone away. Like asyncio.CancelledError it is a
+    BaseException, so the stage-level `except Exception` fallbacks let it through and nothing is persisted.
+    """
 
+def resolve_credentials(request: NoteRequest, current_user: Optional[CachedUser]):
+    # Auth Check
     if current_user:
-        api_key = current_user.gemini_api_key
-        user_id = current_user.id
+        api_key, user_id, manual_cookie = current_user.gemini_api_key, current_user.id, None
     elif request.gemini_api_key:
-        api_key = request.gemini_api_key
-        manual_cookie = request.cookie_value
+        api_key, user_id, manual_cookie = request.gemini_api_key, None, request.cookie_value
     else:
         raise HTTPException(status_code=401, detail="Missing Credentials")
 
     if not api_key:
          raise HTTPException(status_code=400, detail="Gemini API Key missing")
+    return api_key, user_id, manual_cookie
+
+def stream_gemini(api_key: str, prompt: str, emit, cancelled: Optional[threading.Event] = None) -> str:
+    """Streams the analysis from Gemini, emitting each chunk; falls back to the next model only
+    if the previous one failed before producing any text. Returns the full text.
+    Once `cancelled` is set the stream is abandoned at the next chunk (AnalysisCancelled)."""
+    from google import genai
+    client = genai.Client(api_key=api_key)
+    for i, model in enumerate(GEMINI_MODELS):
+        chunks = []
+        try:
+            with span('gemini', histogram='gemini', model=model):
+                for chunk in client.models.generate_content_stream(model=model, contents=prompt):
+                    if cancelled is not None and cancelled.is_set():
+                        raise AnalysisCancelled()
+                    if chunk.text:
+                        chunks.append(chunk.text)
+                        emit("ai_token", {"model": model, "text": chunk.text})
+            return "".join(chunks)
+        except Exception as e:
+            if chunks or i == len(GEMINI_MODELS) - 1:
+                raise
+            print(f"⚠️ {model} Failed: {e}. Switching to {GEMINI_MODELS[i + 1]}.")
+
+def run_analysis(db: Session, current_user: Optional[CachedUser], url: str, api_key: str,
+                 user_id: Optional[int], manual_cookie: Optional[str], emit=_noop_emit,
+                 cancelled: Optional[threading.Event] = None) -> dict:
+    resolved = resolve_note_url(clean_url(url))
+    cleaned_url = resolved["url"]
+    emit("resolved", resolved)
+
+    # 1. Fetch
+    raw_data = fetch_xhs_data(db, user_id, cleaned_url, manual_cookie=manual_cookie,
+                              on_cookie=lambda info: emit("cookie", info))
+    stats = {"likes": raw_data.get('likes', 0), "collects": raw_data.get('collected', 0), "comments": raw_data.get('comments', 0), "shares": raw_data.get('shares', 0)}
+    emit("note", {"title": raw_data.get('title', 'Untitled'), "stats": stats,
+                  "cover_image": (raw_data.get('images_list') or [''])[0], "author": raw_data.get('user', {})})
+
+    # 2. Analyze
+    ai_result = {"viral_reasons": [], "improvements": [], "psychology": ""}
+    try:
+        prompt = f"Analyze Xiaohongshu note.\nTitle: {raw_data.get('title')}\nContent: {raw_data.get('desc')}\nReturn JSON with viral_reasons(3), improvements(2), psychology."
+        stream_gemini(api_key, prompt, emit, cancelled)
 
-    cleaned_url = clean_url(request.url)
+        # Simplified mock parsing for stability
+        ai_result["viral_reasons"] = ["AI Analysis Successful", "Engaging Title"]
+        ai_result["psychology"] = "User target identified."
 
-    try:
-        # 1. Fetch
-        raw_data = fetch_xhs_data(db, user_id, cleaned_url, manual_cookie=manual_cookie)
-        
-        # 2. Analyze
-        ai_result = {"viral_reasons": [], "improvements": [], "psychology": ""}
-        try:
-            from google import genai
-            client = genai.Client(api_key=api_key)
-            prompt = f"Analyze Xiaohongshu note.\nTitle: {raw_data.get('title')}\nContent: {raw_data.get('desc')}\nReturn JSON with viral_reasons(3), improvements(2), psychology."
-            
-            try:
-                # Primary: Gemini 3.0 Flash Preview
-                response = client.models.generate_content(model='gemini-3-flash-preview', contents=prompt)
-            except Exception as e:
-                print(f"⚠️ Gemini 3.0 Failed: {e}. Switching to Gemini 2.5.")
-                # Fallback: Gemini 2.5 Flash
-                response = client.models.generate_content(model='gemini-2.5-flash', contents=prompt)
-            
-            # Simplified mock parsing for stability
-            ai_result["viral_reasons"] = ["AI Analysis Successful", "Engaging Title"]
-            ai_result["psychology"] = "User target identified."
-            
-            # Basic check for text response
-            if response.text:
-                 pass 
+    except Exception as e:
+        print(f"AI Error: {e}")
+        ai_result["viral_reasons"] = [f"AI Error: {str(e)}"]
+    emit("ai_done", ai_result)
+
+    # 3. Save
+    result_data = {
+        "id": str(int(datetime.utcnow().timestamp() * 1000)),
+        "original_url": cleaned_url,
+        "title": raw_data.get('title', 'Untitled'),
+        "content": raw_data.get('desc', ''),
+        "cover_image": (raw_data.get('images_list') or [''])[0],
+        "stats_json": stats,
+        "author_json": raw_data.get('user', {}),
+        "ai_viral_reasons": ai_result.get('viral_reasons', []),
+        "ai_improvements": ai_result.get('improvements', []),
+        "ai_psychology": ai_result.get('psychology', '')
+    }
 
-        except Exception as e:
-            print(f"AI Error: {e}")
-            ai_result["viral_reasons"] = [f"AI Error: {str(e)}"]
-
-        # 3. Save
-        result_data = {
-            "id": str(int(datetime.utcnow().timestamp() * 1000)),
-            "original_url": cleaned_url,
-            "title": raw_data.get('title', 'Untitled'),
-            "content": raw_data.get('desc', ''),
-            "cover_image": (raw_data.get('images_list') or [''])[0],
-            "stats_json": {"likes": raw_data.get('likes', 0), "collects": raw_data.get('collected', 0), "comments": raw_data.get('comments', 0)},
-            "author_json": raw_data.get('user', {}),
-            "ai_viral_reasons": ai_result.get('viral_reasons', []),
-            "ai_improvements": ai_result.get('improvements', []),
-            "ai_psychology": ai_result.get('psychology', '')
-        }
-
-        if current_user:
-            db_result = ScrapeResult(
-                user_id=current_user.id,
-                original_url=result_data['original_url'],
-                title=result_data['title'],
-                content=result_data['content'],
-                cover_image=result_data['cover_image'],
-                stats_json=result_data['stats_json'],
-                author_json=result_data['author_json'],
-                ai_viral_reasons=result_data['ai_viral_reasons'],
-                ai_improvements=result_data['ai_improvements'],
-                ai_psychology=result_data['ai_psychology']
-            )
+    if current_user:
+        db_result = ScrapeResult(
+            user_id=current_user.id,
+            original_url=result_data['original_url'],
+            title=result_data['title'],
+            content=result_data['content'],
+            cover_image=result_data['cover_image'],
+            stats_json=result_data['stats_json'],
+            author_json=result_data['author_json'],
+            ai_viral_reasons=result_data['ai_viral_reasons'],
+            ai_improvements=result_data['ai_improvements'],
+            ai_psychology=result_data['ai_psychology']
+        )
+        with span('db_write'):
             db.add(db_result)
+            save_crawled_notes(db, current_user.id, [raw_data], commit=False)
             db.commit()
-            result_data['id'] = str(db_result.id)
-        
-        return {"status": "success", "data": result_data}
-        
+        result_data['id'] = str(db_result.id)
+        emit("persisted", {"id": result_data['id']})
+
+    return result_data
+
+def _error_response(e: Exception):
+    error_str = str(e)
+    if error_str == "COOKIE_EXHAUSTED":
+        return 503, "No valid cookies available."
+    print(f"Server Error: {error_str}")
+    return 500, f"Internal Error: {error_str}"
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+@app.post("/api/analyze")
+def analyze_note(request: NoteRequest, db: Session = Depends(get_db), current_user: Optional[CachedUser] = Depends(get_current_user_optional)):
+    api_key, user_id, manual_cookie = resolve_credentials(request, current_user)
+    try:
+        return {"status": "success", "data": run_analysis(db, current_user, request.url, api_key, user_id, manual_cookie)}
     except Exception as e:
-        error_str = str(e)
-        if error_str == "COOKIE_EXHAUSTED":
-            raise HTTPException(status_code=503, detail="No valid cookies available.")
-        print(f"Server Error: {error_str}")
-        raise HTTPException(status_code=500, detail=f"Internal Error: {error_str}")
+        status_code, detail = _error_response(e)
+        raise HTTPException(status_code=status_code, detail=detail)
+
+@app.post("/api/analyze/stream")
+async def analyze_note_stream(request: NoteRequest, http_request: Request,
+                              current_user: Optional[CachedUser] = Depends(get_current_user_optional)):
+    """
+    Same pipeline as /api/analyze, streamed as server-sent events:
+    resolved -> cookie -> note -> ai_token* -> ai_done -> persisted -> done (or error).
+    Credential errors are still plain HTTP errors since they happen before the stream opens.
+    When the client disconnects the worker stops at the next Gemini chunk and saves nothing.
+    """
+    api_key, user_id, manual_cookie = resolve_credentials(request, current_user)
+    events = queue.Queue()
+    cancelled = threading.Event()
+
+    def worker():
+        # own session: the request-scoped one may be closed before the stream finishes
+        db = SessionLocal()
+        try:
+            result = run_analysis(db, current_user, request.url, api_key, user_id, manual_cookie,
+                                  emit=lambda event, data: events.put((event, data)), cancelled=cancelled)
+            events.put(("done", {"status": "success", "data": result}))
+        except Exception as e:
+            status_code, detail = _error_response(e)
+            events.put(("error", {"status_code": status_code, "detail": detail}))
+        finally:
+            db.close()
+            events.put(None)
+
+    _stream_executor.submit(worker)
+
+    async def event_source():
+        try:
+            while True:
+                try:
+                    item = await run_in_threadpool(events.get, timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # a client that left while nothing was being sent is only noticed here
+                    if await http_request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    return
+                yield _sse(*item)
+        finally:
+            # also runs when the server closes the generator after a failed send
+            cancelled.set()
+
+    return StreamingResponse(event_source(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# Module import time of this cold start (see /api/debug/importtime for the breakdown)
+IMPORT_MS = round((time.perf_counter() - _IMPORT_STARTED) * 1000, 1)
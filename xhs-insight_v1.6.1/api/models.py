@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean, JSON
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Boolean, JSON, Index
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
+import zlib
 
 Base = declarative_base()
 
@@ -14,6 +15,7 @@ class User(Base):
     cookies = relationship("Cookie", back_populates="owner")
     groups = relationship("AnalysisGroup", back_populates="owner")
     results = relationship("ScrapeResult", back_populates="owner")
+    crawled_notes = relationship("CrawledNote", back_populates="owner")
 
 class Cookie(Base):
     __tablename__ = "cookies"
@@ -59,4 +61,59 @@ class ScrapeResult(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     
     owner = relationship("User", back_populates="results")
-    group = relationship("AnalysisGroup", back_populates="results")
\ No newline at end of file
+    group = relationship("AnalysisGroup", back_populates="results")
+
+class CrawledNote(Base):
+    """One row per crawled note with interaction counts stored as integers, so cohorts sort and rank in SQL."""
+    __tablename__ = "crawled_notes"
+    # save_crawled_notes upserts on this pair; a unique index (not a table constraint) so init_db can add it to old sqlite files
+    __table_args__ = (Index("uq_crawled_notes_user_note", "user_id", "note_id", unique=True),)
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    note_id = Column(String, index=True)
+    keyword = Column(String, nullable=True, index=True)
+    title = Column(String)
+    author_id = Column(String, nullable=True)
+
+    liked_count = Column(Integer, default=0, index=True)
+    collected_count = Column(Integer, default=0, index=True)
+    comment_count = Column(Integer, default=0)
+    share_count = Column(Integer, default=0)
+    fans = Column(Integer, nullable=True)
+
+    crawled_at = Column(DateTime, default=datetime.utcnow)
+
+    owner = relationship("User", back_populates="crawled_notes")
+
+def schema_fingerprint() -> int:
+    """CRC of every table/column/index name, small enough for sqlite's PRAGMA user_version."""
+    shape = [(t.name, [c.name for c in t.columns], sorted(i.name for i in t.indexes)) for t in Base.metadata.sorted_tables]
+    return zlib.crc32(repr(shape).encode()) & 0x7fffffff
+
+def init_db(engine) -> bool:
+    """
+    Runs create_all only when the schema changed since the last run.
+    On sqlite the fingerprint lives in PRAGMA user_version, so a warm database costs one
+    pragma read instead of a reflection query per table. Returns True when DDL ran.
+    """
+    if engine.dialect.name != "sqlite":
+        Base.metadata.create_all(bind=engine)
+        return True
+    fingerprint = schema_fingerprint()
+    with engine.connect() as conn:
+        if conn.exec_driver_sql("PRAGMA user_version").scalar() == fingerprint:
+            return False
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        _upgrade_sqlite(conn)
+        conn.exec_driver_sql(f"PRAGMA user_version = {fingerprint}")
+    return True
+
+def _upgrade_sqlite(conn):
+    """create_all skips tables that already exist, so indexes added later are created here."""
+    # Files from before the unique index may hold duplicate (user_id, note_id) rows: keep the newest of each.
+    conn.exec_driver_sql(
+        "DELETE FROM crawled_notes WHERE id NOT IN (SELECT MAX(id) FROM crawled_notes GROUP BY user_id, note_id)")
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
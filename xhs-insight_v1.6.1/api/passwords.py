@@ -0,0 +1,108 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from .crawler_service import get_metrics
+
+# --- Password Hashing ---
+# bcrypt burns ~100-300 ms of CPU per call by design. Running it inline in sync routes parked
+# one shared FastAPI worker thread per login, so a login burst starved every other route.
+# Hashes now run on a small dedicated pool (the bcrypt C/Rust core releases the GIL, so
+# threads run in parallel) behind a bounded queue; callers past the bound get a 503.
+
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+HASH_QUEUE_LIMIT = int(os.environ.get("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+
+def make_context(rounds: int = BCRYPT_ROUNDS) -> CryptContext:
+    # min == max == default: a hash at any other cost reports needs_update and is
+    # transparently rehashed on the next successful login (cost raised or lowered)
+    return CryptContext(schemes=["bcrypt"], deprecated="auto",
+                        bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds)
+
+class HasherOverloaded(Exception):
+    pass
+
+class PasswordHasher:
+    def __init__(self, workers: int = HASH_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT, rounds: int = BCRYPT_ROUNDS):
+        self.context = make_context(rounds)
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self.pending = 0  # queued + running
+        self.running = 0
+        self.rejected = 0
+        self.completed = 0
+
+        metrics = get_metrics()
+        if metrics:
+            self._queue_gauge = metrics.REGISTRY.gauge("xhs_password_hash_queue_depth", "Password hashes waiting for a worker")
+            self._running_gauge = metrics.REGISTRY.gauge("xhs_password_hash_in_progress", "Password hashes currently running")
+            self._wait_hist = metrics.REGISTRY.histogram("xhs_password_hash_wait_seconds", "Time spent queued for a hash worker", ("op",))
+            self._run_hist = metrics.REGISTRY.histogram("xhs_password_hash_duration_seconds", "bcrypt hash / verify time", ("op",))
+            self._rejected = metrics.REGISTRY.counter("xhs_password_hash_rejected", "Hash requests refused because the queue was full", ("op",))
+        else:
+            self._queue_gauge = self._running_gauge = self._wait_hist = self._run_hist = self._rejected = None
+
+    def _update_gauges(self):
+        if self._queue_gauge:
+            self._queue_gauge.set(self.pending - self.running)
+            self._running_gauge.set(self.running)
+
+    def _run(self, op: str, enqueued: float, func, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self.running += 1
+            self._update_gauges()
+        try:
+            return func(*args)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self.running -= 1
+                self.pending -= 1
+                self.completed += 1
+                self._update_gauges()
+            if self._wait_hist:
+                self._wait_hist.observe(started - enqueued, op=op)
+                self._run_hist.observe(finished - started, op=op)
+
+    async def _submit(self, op: str, func, *args):
+        with self._lock:
+            if self.pending >= self.queue_limit:
+                self.rejected += 1
+                if self._rejected:
+                    self._rejected.inc(op=op)
+                raise HasherOverloaded(op)
+            self.pending += 1
+            self._update_gauges()
+        future = self._executor.submit(self._run, op, time.perf_counter(), func, *args)
+        future.add_done_callback(self._release_if_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _release_if_cancelled(self, future):
+        # a request that disconnected before its hash started never reaches _run
+        if future.cancelled():
+            with self._lock:
+                self.pending -= 1
+                self._update_gauges()
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """Returns (valid, new_hash); new_hash is set when the stored cost differs from BCRYPT_ROUNDS."""
+        return await self._submit("verify", self.context.verify_and_update, password, hashed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workers": self.workers, "queue_limit": self.queue_limit, "pending": self.pending,
+                    "running": self.running, "completed": self.completed, "rejected": self.rejected}
+
+hasher = PasswordHasher()
@@ -0,0 +1,77 @@
+"""
+Cold-start profiling: a `python -X importtime` report for any module, as a function,
+an API endpoint (/api/debug/importtime, enabled with XHS_DEBUG_ENDPOINTS=1) and a CLI:
+
+    python -m api.startup                 # profile api.index
+    python -m api.startup xhs_ai_wrapper --top 15
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SPIDER_DIR = os.path.join(ROOT_DIR, "Spider_XHS-master")
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def parse_importtime(stderr: str) -> list:
+    """Parses -X importtime output into [{module, self_ms, cumulative_ms, depth}] in import order."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append({
+                "module": module,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": (len(indent) - 1) // 2,
+            })
+    return rows
+
+def import_time_report(module: str = "api.index", top: int = 20, timeout: float = 60.0) -> dict:
+    """
+    Imports `module` in a fresh interpreter with -X importtime and summarizes it.
+    Runs from a scratch directory so relative sqlite paths don't touch the real database.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT_DIR, SPIDER_DIR, env.get("PYTHONPATH")]))
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              cwd=workdir, env=env, capture_output=True, text=True, timeout=timeout)
+        wall_ms = (time.perf_counter() - started) * 1000
+    rows = parse_importtime(proc.stderr)
+    top_level = [r for r in rows if r["depth"] == 0]
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+        "wall_ms": round(wall_ms, 1),
+        "import_ms": round(sum(r["cumulative_ms"] for r in top_level), 1),
+        "top_cumulative": sorted(top_level, key=lambda r: r["cumulative_ms"], reverse=True)[:top],
+        "top_self": sorted(rows, key=lambda r: r["self_ms"], reverse=True)[:top],
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time report (python -X importtime)")
+    parser.add_argument("module", nargs="?", default="api.index")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    report = import_time_report(args.module, args.top)
+    if not report["ok"]:
+        print(f"import {args.module} failed: {report['error']}")
+        return 1
+    print(f"{args.module}: {report['import_ms']:.1f} ms imports, {report['wall_ms']:.1f} ms wall (incl. interpreter start)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  top-level module")
+    for row in report["top_cumulative"]:
+        print(f"{row['cumulative_ms']:>14.1f} {row['self_ms']:>9.1f}  {row['module']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
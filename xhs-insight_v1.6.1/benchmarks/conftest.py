@@ -0,0 +1,9 @@
+"""
+The benchmark suite needs the pytest-benchmark plugin; the shared fixtures live in ../conftest.py.
+
+    pip install -r benchmarks/requirements.txt
+    python -m pytest benchmarks --benchmark-only
+"""
+import pytest
+
+pytest.importorskip("pytest_benchmark")
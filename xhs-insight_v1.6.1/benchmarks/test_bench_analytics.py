@@ -0,0 +1,47 @@
+"""
+Cohort analytics over the API database: crawled_notes and older scrape_results merge into one cohort.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+NOTES = 2000
+URL = "https://www.xiaohongshu.com/explore/{:024x}?xsec_token=XT"
+
+
+@pytest.fixture()
+def session(tmp_path):
+    from api.models import User, init_db
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    init_db(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(id=1, email="cohort@example.com", hashed_password="x"))
+    db.commit()
+    yield db
+    db.close()
+
+
+def test_cohort_from_db(benchmark, session):
+    from api.analytics import NoteCohort, cohort_report, load_db_records
+    from api.models import CrawledNote, ScrapeResult
+
+    session.add_all(CrawledNote(user_id=1, note_id=f"{i:024x}", keyword="露营", title=f"露营 {i}", liked_count=i,
+                                collected_count=i // 2, comment_count=3, share_count=1, fans=1000)
+                    for i in range(NOTES))
+    # analyzed before crawled_notes existed: display-string counts, and one note already crawled
+    session.add_all([
+        ScrapeResult(user_id=1, original_url=URL.format(NOTES), title="露营 旧", stats_json={"likes": "1.2万", "collects": "10万+"},
+                     author_json={"fans": "3千"}),
+        ScrapeResult(user_id=1, original_url=URL.format(0), title="露营 0", stats_json={"likes": 999}, author_json={}),
+    ])
+    session.commit()
+
+    def run():
+        records = load_db_records(session, 1, "露营")
+        return cohort_report(NoteCohort.from_records("露营", records), limit=1)
+
+    report = benchmark(run)
+    assert report["count"] == NOTES + 1
+    top = report["notes"][0]
+    assert (top["note_id"], top["likes"], top["collects"], top["fans"]) == (f"{NOTES:024x}", 12000, 100000, 3000)
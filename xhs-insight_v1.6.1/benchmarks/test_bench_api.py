@@ -0,0 +1,53 @@
+"""POST /api/analyze end-to-end: FastAPI -> crawler_service -> XHS_Wrapper -> mock XHS (Gemini stubbed)."""
+import json
+
+NOTE_URL = "https://www.xiaohongshu.com/explore/66f0000000000000000000aa?xsec_token=XT&xsec_source=pc_search"
+
+
+def test_analyze_anonymous(benchmark, api_client, cookie):
+    payload = {"url": f"看看这篇 {NOTE_URL}", "gemini_api_key": "bench-key", "cookie_value": cookie}
+
+    response = benchmark(api_client.post, "/api/analyze", json=payload)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["status"] == "success"
+    assert body["data"]["original_url"] == NOTE_URL
+    # the real wrapper must have answered, not the Mock-mode fallback
+    assert "Mock" not in body["data"]["title"]
+
+
+def _read_events(body: str) -> list:
+    events = []
+    for block in body.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_analyze_stream(benchmark, api_client, cookie):
+    payload = {"url": NOTE_URL, "gemini_api_key": "bench-key", "cookie_value": cookie}
+
+    response = benchmark(api_client.post, "/api/analyze/stream", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _read_events(response.text)
+    names = [name for name, _ in events]
+    assert names[:3] == ["resolved", "cookie", "note"]
+    assert names.count("ai_token") == 3
+    assert names[-2:] == ["ai_done", "done"]  # anonymous: nothing persisted
+    assert events[1][1]["source"] == "manual"
+    assert "Mock" not in events[2][1]["title"]
+    assert events[-1][1]["data"]["original_url"] == NOTE_URL
+
+
+def test_authenticated_me(benchmark, api_client):
+    # token claims and the user row are cached after the first call: no JWT decode, no query
+    response = api_client.post("/api/register", json={"email": "bench-me@example.com", "password": "pw", "gemini_api_key": "k"})
+    if response.status_code == 400:
+        response = api_client.post("/api/token", data={"username": "bench-me@example.com", "password": "pw"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = benchmark(api_client.get, "/api/users/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == "bench-me@example.com"
@@ -0,0 +1,39 @@
+"""
+Author enrichment: distinct authors of a note cohort fetched concurrently and cached in a users table,
+so a second cohort with the same authors costs no requests.
+"""
+import pytest
+
+from mock_xhs_server import fake_note_rows
+
+AUTHORS = 40
+NOTES = 120
+
+
+@pytest.mark.parametrize("concurrency", [1, 8])
+def test_enrich_cohort(benchmark, mock_server_factory, offline_apis, cookie, tmp_path, concurrency):
+    from pipelines.author_enrich import Author_Cache, Author_Enricher
+    from xhs_utils.record_util import Note
+
+    server = mock_server_factory(latency=0.1)
+    enricher = Author_Enricher(cookie, offline_apis(server), Author_Cache(str(tmp_path / "users.db"), 3600),
+                               concurrency=concurrency, batch_size=16)
+    notes = fake_note_rows(NOTES, AUTHORS, Note.FIELDS)
+
+    def run():
+        server.reset_count()
+        return enricher.enrich(notes)
+
+    enriched = benchmark.pedantic(run, rounds=1, iterations=1)
+    assert server.request_count == AUTHORS  # one request per distinct author
+    assert all(note["author_fans"] is not None for note in enriched)
+    first = enriched[0]
+    assert first["engagement_per_fan"] == (round(116 / first["author_fans"], 4) if first["author_fans"] else None)
+    assert "author_fans" not in notes[0]
+
+    # a second cohort with the same authors is served from the users table
+    server.reset_count()
+    success, msg, stats = enricher.refresh(enricher.author_ids(notes))
+    assert success, msg
+    assert stats == {"authors": AUTHORS, "cached": AUTHORS, "fetched": 0, "failed": 0}
+    assert server.request_count == 0
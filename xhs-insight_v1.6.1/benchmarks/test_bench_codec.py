@@ -0,0 +1,38 @@
+"""JSON codec backends on a real mock comment page: decode from response bytes, encode a request body."""
+import pytest
+import requests
+
+from xhs_utils import codec_util
+
+BACKENDS = ["json", "orjson", "msgspec"]
+
+
+def _codec(name):
+    try:
+        return codec_util.make_codec(name)
+    except ImportError:
+        pytest.skip(f"{name} not installed")
+
+
+@pytest.fixture(scope="module")
+def page_bytes(mock_server):
+    response = requests.get(f"{mock_server.url}/api/sns/web/v2/comment/page?note_id=66f0000000000000000000aa&cursor=")
+    assert response.status_code == 200
+    return response.content
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_decode_response(benchmark, page_bytes, name):
+    codec = _codec(name)
+    data = benchmark(codec.loads, page_bytes)
+    assert data["data"]["comments"]
+
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_encode_body(benchmark, page_bytes, name):
+    codec = _codec(name)
+    payload = codec_util.Codec().loads(page_bytes)["data"]
+    body = benchmark(codec.dumps, payload)
+    # every backend produces the same compact utf-8 body the signature is computed over
+    assert codec_util.Codec().loads(body) == payload
+    assert b'":' in body and b'": ' not in body and b"\\u" not in body
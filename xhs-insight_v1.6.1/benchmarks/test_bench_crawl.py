@@ -0,0 +1,41 @@
+"""End-to-end crawl timings against the local mock server (sign + HTTP + parse)."""
+import pytest
+
+NOTE_URL = "https://www.xiaohongshu.com/explore/66f0000000000000000000aa?xsec_token=XT&xsec_source=pc_search"
+
+
+def test_single_note(benchmark, xhs_apis, cookie):
+    success, msg, res_json = benchmark(xhs_apis.get_note_info, NOTE_URL, cookie)
+    assert success, msg
+    assert res_json["data"]["items"][0]["id"] == "66f0000000000000000000aa"
+
+
+def test_full_comment_tree(benchmark, xhs_apis, cookie, mock_server):
+    config = mock_server.config
+    success, msg, comments = benchmark.pedantic(xhs_apis.get_note_all_comment, args=(NOTE_URL, cookie), rounds=3, iterations=1)
+    assert success, msg
+    assert len(comments) == config.comment_total
+    assert all(len(c["sub_comments"]) == config.sub_comment_total for c in comments)
+
+
+def test_full_comment_tree_records(benchmark, xhs_apis, cookie, mock_server):
+    config = mock_server.config
+    success, msg, comments = benchmark.pedantic(xhs_apis.get_note_all_comment_records, args=(NOTE_URL, cookie), rounds=3, iterations=1)
+    assert success, msg
+    assert len(comments) == config.comment_total
+    assert all(len(c.sub_comments) == config.sub_comment_total for c in comments)
+    assert comments[0].to_dict()["note_url"] == NOTE_URL
+
+
+@pytest.mark.parametrize("require_num", [20, 100])
+def test_search_pagination(benchmark, xhs_apis, cookie, require_num):
+    success, msg, notes = benchmark.pedantic(xhs_apis.search_some_note, args=("测试", require_num, cookie), rounds=5, iterations=1)
+    assert success, msg
+    assert len(notes) == require_num
+
+
+def test_user_all_notes(benchmark, xhs_apis, cookie, mock_server):
+    user_url = "https://www.xiaohongshu.com/user/profile/5f0000000000000000000001?xsec_token=XT&xsec_source=pc_note"
+    success, msg, notes = benchmark.pedantic(xhs_apis.get_user_all_notes, args=(user_url, cookie), rounds=3, iterations=1)
+    assert success, msg
+    assert len(notes) == mock_server.config.user_note_total
@@ -0,0 +1,28 @@
+"""
+Homefeed harvesting: every channel paged concurrently with its own cursor vs one channel at a time,
+with notes shared between channels written once.
+"""
+import json
+
+import pytest
+
+CHANNELS, PAGES = 6, 4
+
+
+@pytest.mark.parametrize("concurrency", [1, CHANNELS + 1])
+def test_harvest_round(benchmark, mock_server_factory, offline_apis, cookie, tmp_path, concurrency):
+    from pipelines.feed_harvester import Feed_Harvester
+
+    server = mock_server_factory(latency=0.2, homefeed_channels=CHANNELS, homefeed_pages=PAGES, homefeed_pool=300)
+    path = tmp_path / "feed.jsonl"
+
+    def run():
+        harvester = Feed_Harvester(cookie, offline_apis(server), max_pages=PAGES, concurrency=concurrency)
+        return harvester, harvester.export([str(path)])
+
+    harvester, (success, msg, stats) = benchmark.pedantic(run, rounds=2, iterations=1)
+    assert success, msg
+    assert stats["pages"] == (CHANNELS + 1) * PAGES and stats["errors"] == 0
+    ids = [json.loads(line)["note_id"] for line in path.read_text(encoding="utf-8").splitlines()]
+    # channels overlap; each note is written once
+    assert len(ids) == len(set(ids)) == stats["new"] == len(harvester.seen) < (CHANNELS + 1) * PAGES * 20
@@ -0,0 +1,35 @@
+"""
+Inbox incremental sync: a steady-state poll costs one request per stream instead of re-paging the whole history.
+"""
+import pytest
+
+
+@pytest.mark.parametrize("mode", ["full", "incremental"])
+def test_poll(benchmark, mock_server_factory, offline_apis, cookie, tmp_path, mode):
+    from pipelines.inbox_sync import Inbox_Sync
+    from xhs_utils.state_util import StateStore
+
+    inbox_server = mock_server_factory(latency=0.05, inbox_total=45)
+    inbox = Inbox_Sync(cookie, StateStore(str(tmp_path / "state.db")), offline_apis(inbox_server))
+    success, msg, stats = inbox.export([str(tmp_path / "inbox.db")])
+    assert success, msg
+    assert stats == {"mentions": 45, "likes": 45, "connections": 45, "errors": 0}
+    inbox_server.config.inbox_total = 50  # five new notifications per stream since the last poll
+
+    def full():
+        apis = inbox.xhs_apis
+        return [len(fn(cookie)[2]) for fn in (apis.get_all_metions, apis.get_all_likesAndcollects, apis.get_all_new_connections)]
+
+    def incremental():
+        return [event for event in inbox.sync() if event["type"] == "new_message"]
+
+    inbox_server.reset_count()
+    result = benchmark.pedantic(full if mode == "full" else incremental, rounds=1, iterations=1)
+    if mode == "full":
+        assert result == [50] * 3 and inbox_server.request_count == 9
+    else:
+        assert len(result) == 15 and inbox_server.request_count == 3
+        assert [e["data"]["title"] for e in result if e["stream"] == "likes"] == [f"消息 {i}" for i in range(49, 44, -1)]
+        inbox_server.reset_count()
+        assert [e["type"] for e in inbox.sync()] == ["stream_done"] * 3
+        assert inbox_server.request_count == 3
@@ -0,0 +1,26 @@
+"""
+Crawl orchestrator: an end-to-end multi-process run against the mock server, including a job left behind
+by a crashed worker.
+"""
+import sqlite3
+
+
+def test_orchestrator_run(benchmark, mock_server, cookie, tmp_path):
+    from pipelines.orchestrator import Crawl_Orchestrator
+    from xhs_utils.queue_util import Job_Queue
+
+    output = tmp_path / "crawl.db"
+    orchestrator = Crawl_Orchestrator(cookie, str(tmp_path / "jobs.db"), str(output), str(tmp_path / "media"),
+                                      workers=2, lease=2, rate_limit=False)
+    orchestrator.add_search("测试", require_num=20)
+    orchestrator.add_note("https://www.xiaohongshu.com/explore/66f0000000000000000000dd?xsec_token=XT&xsec_source=pc_search",
+                          comments=True)
+    # a job claimed by a worker that died before finishing
+    Job_Queue(orchestrator.queue_path).claim("dead-worker", lease=0.5)
+
+    stats = benchmark.pedantic(orchestrator.run, kwargs={"poll_interval": 0.2}, rounds=1, iterations=1)
+    assert stats == {"search": {"done": 1}, "note": {"done": 21}, "comments": {"done": 1}}
+    config = mock_server.config
+    with sqlite3.connect(output) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0] == 21
+        assert conn.execute("SELECT COUNT(*) FROM comments").fetchone()[0] == config.comment_total * (1 + config.sub_comment_total)
@@ -0,0 +1,71 @@
+"""
+Slotted Note / Comment / User records vs raw response dicts: parse time and retained memory
+for 100k comments shaped like /api/sns/web/v2/comment/page items.
+"""
+import gc
+import json
+import tracemalloc
+
+import pytest
+
+from xhs_utils.data_util import handle_comment_info
+from xhs_utils.record_util import Comment
+
+NOTE_ID = "66f0000000000000000000aa"
+NOTE_URL = f"https://www.xiaohongshu.com/explore/{NOTE_ID}?xsec_token=XT&xsec_source=pc_search"
+COMMENTS = 100_000
+
+
+def _raw_comment(i: int) -> dict:
+    # the fields the real endpoint returns per comment, most of which exports never read
+    user_id = f"5f{i % 5000:022x}"
+    return {
+        "id": f"67{i:022x}", "note_id": NOTE_ID, "content": f"这条笔记太有用了，收藏了慢慢看 {i}",
+        "like_count": str(i % 3000), "create_time": 1700000000000 + i * 1000, "ip_location": ("北京", "上海", "广东")[i % 3],
+        "status": 0, "liked": False, "at_users": [], "show_tags": [],
+        "user_info": {"user_id": user_id, "nickname": f"用户{i % 5000}", "xsec_token": "AB" + "x" * 42,
+                      "image": f"https://sns-avatar-qc.xhscdn.com/avatar/{user_id}.jpg?imageView2/2/w/120/format/jpg"},
+        "pictures": [], "sub_comment_count": "0", "sub_comment_has_more": False, "sub_comment_cursor": "", "sub_comments": [],
+        "target_comment": {"id": "", "user_info": {"user_id": "", "nickname": "", "image": "", "xsec_token": ""}},
+    }
+
+
+@pytest.fixture(scope="module")
+def page_text():
+    return json.dumps([_raw_comment(i) for i in range(COMMENTS)], ensure_ascii=False)
+
+
+def _retained_bytes(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        kept = build()
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+        del kept
+
+
+def test_comment_memory(benchmark, page_text):
+    raw = _retained_bytes(lambda: json.loads(page_text))
+    records = benchmark.pedantic(
+        _retained_bytes, args=(lambda: [Comment.from_raw(c, NOTE_URL, NOTE_ID) for c in json.loads(page_text)],),
+        rounds=1, iterations=1)
+    benchmark.extra_info.update(comments=COMMENTS, raw_mb=round(raw / 1e6, 1), records_mb=round(records / 1e6, 1))
+    assert records * 3 < raw
+
+
+def test_parse_records(benchmark, page_text):
+    raws = json.loads(page_text)[:10_000]
+    comments = benchmark(lambda: [Comment.from_raw(c, NOTE_URL, NOTE_ID) for c in raws])
+    assert len(comments) == len(raws)
+
+
+def test_parse_dicts(benchmark, page_text):
+    # the export-shaped dicts handle_comment_info returns (now Comment.from_raw(...).to_dict())
+    raws = json.loads(page_text)[:10_000]
+    for raw in raws:
+        raw["note_url"] = NOTE_URL
+    rows = benchmark(lambda: [handle_comment_info(c) for c in raws])
+    assert rows[0]["comment_id"] == raws[0]["id"]
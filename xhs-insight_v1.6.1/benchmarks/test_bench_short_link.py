@@ -0,0 +1,29 @@
+"""xhslink short links: the first share pays one redirect hop, repeats are served from the TTL cache."""
+from xhs_utils.url_util import Short_Link_Resolver, parse_note_url
+
+
+def _resolver(mock_server):
+    host = mock_server.url.split("://", 1)[1].split(":")[0]
+    return Short_Link_Resolver(short_hosts=(host,))
+
+
+def test_resolve_short_link_cold(benchmark, mock_server):
+    resolver = _resolver(mock_server)
+    codes = iter(range(10 ** 6))
+
+    note = benchmark(lambda: resolver.resolve(f"{mock_server.url}/xhslink/c{next(codes)}"))
+    assert note.xsec_source == "app_share"
+    assert note.xsec_token.endswith("=")  # url-decoded, not truncated at '='
+    assert parse_note_url(note.url) == note
+
+
+def test_resolve_short_link_cached(benchmark, mock_server):
+    resolver = _resolver(mock_server)
+    short = f"{mock_server.url}/xhslink/shared"
+    first = resolver.resolve(short)
+    before = mock_server.request_count
+
+    note = benchmark(resolver.resolve, short)
+    assert note == first
+    assert mock_server.request_count == before  # no network call after the first share
+    assert resolver.stats()["misses"] == 1
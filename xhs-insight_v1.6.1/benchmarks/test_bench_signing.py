@@ -0,0 +1,53 @@
+"""Request signing throughput (x-s / x-s-common / x-t / xray trace id)."""
+import json
+import time
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def xhs_util():
+    from xhs_utils import xhs_util
+    return xhs_util
+
+
+def test_sign_get(benchmark, xhs_util, cookie):
+    api = "/api/sns/web/v2/comment/page?note_id=66f0000000000000000000aa&cursor=&top_comment_id=&image_formats=jpg,webp,avif&xsec_token=XT"
+    headers, cookies, _ = benchmark(xhs_util.generate_request_params, cookie, api, "", "GET")
+    assert headers["x-s"] and headers["x-t"]
+
+
+def test_sign_post(benchmark, xhs_util, cookie):
+    data = {"source_note_id": "66f0000000000000000000aa", "image_formats": ["jpg", "webp", "avif"],
+            "extra": {"need_body_topic": "1"}, "xsec_source": "pc_search", "xsec_token": "XT"}
+    headers, _, trans_data = benchmark(xhs_util.generate_request_params, cookie, "/api/sns/web/v1/feed", data, "POST")
+    assert headers["x-s"] and json.loads(trans_data)["source_note_id"] == data["source_note_id"]
+
+
+def test_xray_traceid(benchmark, xhs_util):
+    trace_id = benchmark(xhs_util.generate_xray_traceid)
+    assert len(trace_id) == 32
+    assert abs((int(trace_id[:16], 16) >> 23) - time.time() * 1000) < 60_000  # ms timestamp << 23 | seq
+
+
+def _legacy_headers(xhs_util, cookie):
+    # what every request paid before SigningContext: re-parse the cookie string, rebuild the
+    # template and start node for an xray id that was then overwritten
+    from xhs_utils.cookie_util import trans_cookies
+    cookies = trans_cookies(cookie)
+    headers = dict(xhs_util.REQUEST_HEADERS_TEMPLATE)
+    headers["x-xray-traceid"] = xhs_util.compile_static(xhs_util.XRAY_JS).call("traceId")
+    headers.update({"x-s": "XS", "x-t": "1", "x-s-common": "XSC", "x-b3-traceid": xhs_util.generate_x_b3_traceid()})
+    return headers, cookies["a1"]
+
+
+def _context_headers(xhs_util, cookie):
+    context = xhs_util.get_signing_context(cookie)
+    return xhs_util.fill_headers("XS", 1, "XSC"), context.a1
+
+
+@pytest.mark.parametrize("build", [_legacy_headers, _context_headers], ids=["legacy", "signing_context"])
+def test_header_build(benchmark, xhs_util, cookie, build):
+    """Header construction alone, with the x-s signature held constant."""
+    headers, a1 = benchmark(build, xhs_util, cookie)
+    assert a1 and headers["x-s"] == "XS" and len(headers["x-xray-traceid"]) == 32
@@ -0,0 +1,44 @@
+"""
+Single-flight in front of XHS_Apis: a burst of identical note lookups should cost one upstream request
+(and one signature), with an optional short-TTL cache behind it.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+BURST = 8
+NOTE_ID = "66f0000000000000000000ee"
+
+
+def _burst(apis, cookie):
+    barrier = threading.Barrier(BURST)
+
+    def one(i):
+        barrier.wait()
+        # the same share link opened by every caller of one account
+        url = f"https://www.xiaohongshu.com/explore/{NOTE_ID}?xsec_token=XT&xsec_source=app_share"
+        success, msg, res_json = apis.get_note_info(url, cookie)
+        assert success, msg
+        res_json["data"]["items"][0]["mutated_by"] = i  # callers may mutate their copy
+        return res_json
+
+    with ThreadPoolExecutor(BURST) as pool:
+        return list(pool.map(one, range(BURST)))
+
+
+@pytest.mark.parametrize("mode", ["off", "single_flight"])
+def test_identical_burst(benchmark, mock_server_factory, offline_apis, cookie, mode):
+    from xhs_utils.flight_util import Single_Flight
+
+    slow_server = mock_server_factory(latency=0.3)
+    apis = offline_apis(slow_server, single_flight=Single_Flight() if mode == "single_flight" else False)
+
+    def run():
+        slow_server.reset_count()
+        return _burst(apis, cookie)
+
+    results = benchmark.pedantic(run, rounds=3, iterations=1)
+    assert [r["data"]["items"][0]["mutated_by"] for r in results] == list(range(BURST))
+    assert all(r["data"]["items"][0]["id"] == NOTE_ID for r in results)
+    assert slow_server.request_count == (1 if mode == "single_flight" else BURST)
@@ -0,0 +1,40 @@
+"""
+User profile incremental sync: a re-sync only pages until the first known note, crawls the new notes,
+and refreshes the recent window with the xsec_token from the page it just read rather than a stored one.
+"""
+USER_URL = "https://www.xiaohongshu.com/user/profile/5f00000000000000000000aa?xsec_token=UT&xsec_source=pc_note"
+
+
+def test_resync_uses_page_tokens(benchmark, mock_server_factory, offline_apis, cookie, tmp_path):
+    from pipelines.user_sync import User_Sync
+    from xhs_utils.state_util import StateStore
+
+    user_server = mock_server_factory(user_note_total=30)
+    apis = offline_apis(user_server)
+    store = StateStore(str(tmp_path / "state.db"))
+    sync = User_Sync(cookie, store, apis, recent_window=5)
+    success, msg, result = sync.sync(USER_URL)
+    assert success, msg
+    assert len(result["new"]) == 30 and result["refreshed"] == []
+
+    # the stored tokens have expired since; two notes were published on top
+    scope = "user:5f00000000000000000000aa"
+    store.set(scope, "known_notes", [{**note, "xsec_token": "STALE"} for note in store.get(scope, "known_notes")])
+    user_server.config.user_note_total = 32
+    detail_urls = []
+    get_note_info = apis.get_note_info
+
+    def recording_get_note_info(note_url, cookies_str, proxies=None):
+        detail_urls.append(note_url)
+        return get_note_info(note_url, cookies_str, proxies)
+
+    apis.get_note_info = recording_get_note_info
+    user_server.reset_count()
+    success, msg, result = benchmark.pedantic(sync.sync, args=(USER_URL,), rounds=1, iterations=1)
+    assert success, msg
+    assert len(result["new"]) == 2 and len(result["refreshed"]) == 5
+    assert len(detail_urls) == 7 and not any("STALE" in url for url in detail_urls)
+    assert user_server.request_count == 1 + 7  # one profile page, then the details
+    # the fresh tokens are stored for the next run; notes beyond the page keep theirs as a fallback
+    tokens = [note["xsec_token"] for note in store.get(scope, "known_notes")]
+    assert "STALE" not in tokens[:20] and tokens[-1] == "STALE"
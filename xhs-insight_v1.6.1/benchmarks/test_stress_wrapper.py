@@ -0,0 +1,28 @@
+"""
+Concurrency stress test for XHS_Wrapper: many threads crawling at once from an unrelated working directory,
+with no os.chdir anywhere.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from test_wrapper import check_note, note_cookie, note_url
+
+WORKERS = 16
+CALLS = 48
+
+
+def test_threads(benchmark, xhs_wrapper, tmp_path):
+    cwd = os.getcwd()
+
+    def run():
+        with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+            return list(executor.map(lambda i: xhs_wrapper.get_note_detail(note_url(i), note_cookie(i)), range(CALLS)))
+
+    results = benchmark.pedantic(run, rounds=1, iterations=1)
+
+    for i, result in enumerate(results):
+        check_note(result, i)
+    assert os.getcwd() == cwd == str(tmp_path)
+    assert len(xhs_wrapper.built) == 1, "concurrent first calls must share one XHS_Apis"
+    assert xhs_wrapper.server.max_in_flight > 1, "requests were serialized"
+    benchmark.extra_info.update(notes=CALLS, threads=WORKERS, max_in_flight=xhs_wrapper.server.max_in_flight)
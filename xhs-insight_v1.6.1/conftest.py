@@ -0,0 +1,153 @@
+"""
+Fixtures shared by tests/ (plain pytest) and benchmarks/ (needs pytest-benchmark).
+
+    python -m pytest tests
+    pip install -r benchmarks/requirements.txt
+    python -m pytest benchmarks --benchmark-only
+"""
+import os
+import sys
+import types
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+TESTS_DIR = os.path.join(ROOT_DIR, "tests")
+SPIDER_DIR = os.path.join(ROOT_DIR, "Spider_XHS-master")
+
+for path in (TESTS_DIR, ROOT_DIR, SPIDER_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from mock_xhs_server import MockConfig, MockXHSServer, fake_cookie  # noqa: E402
+
+
+def _no_proxy_for_loopback():
+    # never route loopback traffic through a system proxy
+    os.environ["NO_PROXY"] = ",".join(filter(None, [os.environ.get("NO_PROXY"), "127.0.0.1", "localhost"]))
+
+
+@pytest.fixture(scope="session")
+def mock_server():
+    _no_proxy_for_loopback()
+    # sized so one comment tree is ~40 signed requests; signing dominates the wall time
+    config = MockConfig(comment_total=40, sub_comment_total=11)
+    with MockXHSServer(config) as server:
+        # the wrapper and every XHS_Apis() created without base_url will hit the mock
+        os.environ["XHS_BASE_URL"] = server.url
+        yield server
+        os.environ.pop("XHS_BASE_URL", None)
+
+
+@pytest.fixture()
+def mock_server_factory():
+    """
+    Starts a dedicated mock server per call, e.g. mock_server_factory(latency=0.2, inbox_total=45), for tests
+    that need latency or data sizes of their own. Every server is stopped when the test ends.
+    """
+    _no_proxy_for_loopback()
+    servers = []
+
+    def start(**config):
+        server = MockXHSServer(MockConfig(**config)).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture(scope="session")
+def offline_apis():
+    """
+    offline_apis(server) -> XHS_Apis against a mock server with no rate limiting and no request merging,
+    so request counts and timings are our own; creator=True builds XHS_Creator_Apis instead.
+    """
+    def build(server, creator=False, **kwargs):
+        if creator:
+            from apis.xhs_creator_apis import XHS_Creator_Apis
+            return XHS_Creator_Apis(**{"rate_limiter": False, "base_url": server.url, **kwargs})
+        from apis.xhs_pc_apis import XHS_Apis
+        return XHS_Apis(**{"rate_limiter": False, "base_url": server.url, "single_flight": False, **kwargs})
+
+    return build
+
+
+@pytest.fixture(scope="session")
+def cookie():
+    return fake_cookie()
+
+
+@pytest.fixture(scope="session")
+def xhs_apis(mock_server):
+    from apis.xhs_pc_apis import XHS_Apis
+    # no rate limiting: the benchmarks measure our own overhead, not the pacing
+    return XHS_Apis(rate_limiter=False, base_url=mock_server.url)
+
+
+@pytest.fixture()
+def xhs_wrapper(mock_server_factory, tmp_path, monkeypatch):
+    """
+    XHS_Wrapper crawling a mock server with 0.2s latency (so overlapping requests show up in max_in_flight),
+    run from a directory unrelated to the spider; .server is the mock, .built the XHS_Apis instances it made.
+    """
+    server = mock_server_factory(latency=0.2)
+    monkeypatch.setenv("XHS_BASE_URL", server.url)
+    monkeypatch.chdir(tmp_path)
+    import xhs_ai_wrapper
+    from apis import xhs_pc_apis
+
+    built = []
+    original_init = xhs_pc_apis.XHS_Apis.__init__
+
+    def counting_init(self, *args, **kwargs):
+        built.append(self)
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(xhs_pc_apis.XHS_Apis, "__init__", counting_init)
+    wrapper = xhs_ai_wrapper.XHS_Wrapper()
+    wrapper.server, wrapper.built = server, built
+    return wrapper
+
+
+@pytest.fixture(scope="session")
+def api_client(mock_server, tmp_path_factory):
+    """FastAPI TestClient with a throwaway sqlite db and an offline Gemini stub."""
+    from fastapi.testclient import TestClient
+
+    workdir = tmp_path_factory.mktemp("api")
+    original = os.getcwd()
+    os.chdir(workdir)  # SQLALCHEMY_DATABASE_URL is relative to the cwd
+
+    # keep the AI stage offline and constant-time
+    google = types.ModuleType("google")
+    genai = types.ModuleType("google.genai")
+
+    class _Models:
+        def generate_content(self, model, contents):
+            return types.SimpleNamespace(text="{}")
+
+        def generate_content_stream(self, model, contents):
+            for text in ("{", '"viral_reasons": []', "}"):
+                yield types.SimpleNamespace(text=text)
+
+    class Client:
+        def __init__(self, api_key=None):
+            self.models = _Models()
+
+    genai.Client = Client
+    google.genai = genai
+    saved = {name: sys.modules.get(name) for name in ("google", "google.genai")}
+    sys.modules.update({"google": google, "google.genai": genai})
+
+    from api.index import app
+    with TestClient(app) as client:
+        yield client
+
+    for name, module in saved.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+    os.chdir(original)
@@ -0,0 +1,419 @@
+"""
+Local stand-in for the XHS web API (edith.xiaohongshu.com).
+
+Implements the contracts XHS_Apis relies on with deterministic fake data:
+  POST /api/sns/web/v1/feed              note detail
+  POST /api/sns/web/v1/search/notes      search pagination
+  GET  /api/sns/web/v1/user_posted       creator notes (cursor)
+  GET  /api/sns/web/v1/user/otherinfo    user profile
+  GET  /api/sns/web/v2/comment/page      top-level comments (cursor)
+  GET  /api/sns/web/v2/comment/sub/page  replies (cursor)
+  GET  /web_api/sns/v5/creator/note/user/posted   creator-center notes (page number)
+  GET  /api/sns/web/v1/you/{mentions,likes,connections}   notification inbox (cursor, newest first)
+  GET  /xhslink/<code>                   short link, 302 to the note page
+  GET  /health                           proxy / health-check target
+
+Point the spider at it with XHS_Apis(base_url=server.url) or XHS_BASE_URL.
+
+    python tests/mock_xhs_server.py --port 8800 --latency 0.05
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Set
+from urllib.parse import parse_qs, urlparse
+
+
+class MockConfig:
+    def __init__(self, latency: float = 0.0, page_size: int = 20, search_total: int = 200, user_note_total: int = 90,
+                 comment_total: int = 100, sub_comment_total: int = 25, creator_note_total: int = 300, homefeed_channels: int = 6,
+                 homefeed_pages: int = 5, homefeed_pool: int = 400, inbox_total: int = 45, error_rate: float = 0.0, error_status: int = 461,
+                 valid_cookies: Optional[Set[str]] = None, seed: int = 0):
+        self.latency = latency                  # seconds added to every response
+        self.page_size = page_size              # items per page for cursor endpoints
+        self.search_total = search_total        # notes per search keyword
+        self.user_note_total = user_note_total  # notes per creator
+        self.comment_total = comment_total      # top-level comments per note
+        self.sub_comment_total = sub_comment_total  # replies per top-level comment
+        self.creator_note_total = creator_note_total  # posted notes in the creator center
+        self.homefeed_channels = homefeed_channels  # categories besides homefeed_recommend
+        self.homefeed_pages = homefeed_pages    # pages per channel before the feed runs dry
+        self.homefeed_pool = homefeed_pool      # distinct notes all channels draw from, so channels overlap
+        self.inbox_total = inbox_total          # messages per inbox stream; raise it to simulate new notifications
+        self.error_rate = error_rate            # fraction of requests answered with error_status
+        self.error_status = error_status
+        self.valid_cookies = valid_cookies      # accepted web_session values, None accepts any cookie
+        self.seed = seed
+
+
+def _hex_id(*parts) -> str:
+    return hashlib.md5("/".join(str(p) for p in parts).encode()).hexdigest()[:24]
+
+def _count(seed: str, high: int) -> str:
+    """XHS-style display count, e.g. '1.2万' above ten thousand."""
+    n = int(hashlib.md5(seed.encode()).hexdigest()[:8], 16) % high
+    return f"{n / 10000:.1f}万" if n >= 10000 else str(n)
+
+def _user(user_id: str) -> dict:
+    return {"user_id": user_id, "nickname": f"user_{user_id[:6]}", "avatar": f"https://sns-avatar.example/{user_id}.jpg",
+            "image": f"https://sns-avatar.example/{user_id}.jpg"}
+
+def _interact(seed: str) -> dict:
+    return {"liked_count": _count(seed + "l", 50000), "collected_count": _count(seed + "c", 20000),
+            "comment_count": _count(seed + "m", 3000), "share_count": _count(seed + "s", 1000), "sticky": False}
+
+def _note_card(note_id: str) -> dict:
+    user_id = _hex_id("author", note_id[:4])
+    return {
+        "note_id": note_id,
+        "type": "normal",
+        "title": f"测试笔记 {note_id[:6]}",
+        "desc": "这是一条由本地模拟服务器生成的笔记内容 #测试[话题]#",
+        "user": _user(user_id),
+        "interact_info": _interact(note_id),
+        "image_list": [
+            {"info_list": [{"url": f"https://sns-webpic.example/{note_id}_{i}_prv.jpg"},
+                           {"url": f"https://sns-webpic.example/{note_id}_{i}_dft.jpg"}]}
+            for i in range(3)
+        ],
+        "tag_list": [{"id": "t1", "name": "测试", "type": "topic"}],
+        "time": 1700000000000,
+        "ip_location": "上海",
+    }
+
+def _comment(note_id: str, comment_id: str, root_id: Optional[str] = None) -> dict:
+    comment = {
+        "id": comment_id,
+        "note_id": note_id,
+        "content": f"评论 {comment_id[:6]}",
+        "like_count": _count(comment_id, 2000),
+        "create_time": 1700000000000,
+        "ip_location": "北京",
+        "show_tags": [],
+        "user_info": _user(_hex_id("commenter", comment_id[:3])),
+        "pictures": [],
+    }
+    if root_id:
+        comment["target_comment"] = {"id": root_id}
+    return comment
+
+
+class MockXHSHandler(BaseHTTPRequestHandler):
+    server_version = "MockXHS/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def config(self) -> MockConfig:
+        return self.server.config
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- plumbing ---
+    def _send(self, status: int, payload: dict):
+        if getattr(self, "_in_flight", False):
+            self._in_flight = False
+            with self.server.lock:
+                self.server.in_flight -= 1
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _ok(self, data: dict):
+        self._send(200, {"code": 0, "success": True, "msg": "成功", "data": data})
+
+    def _cookie_valid(self) -> bool:
+        if self.config.valid_cookies is None:
+            return True
+        cookies = dict(
+            part.strip().split("=", 1) for part in self.headers.get("Cookie", "").split(";") if "=" in part
+        )
+        return cookies.get("web_session") in self.config.valid_cookies
+
+    def _preamble(self) -> bool:
+        """Applies latency, error injection and auth. Returns False when a response was already sent."""
+        with self.server.lock:
+            self.server.request_count += 1
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+            roll = self.server.rng.random()
+        self._in_flight = True
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        if roll < self.config.error_rate:
+            self._send(self.config.error_status, {"code": 300013, "success": False, "msg": "访问频次异常，请勿频繁操作"})
+            return False
+        if not self._cookie_valid():
+            self._send(401, {"code": -100, "success": False, "msg": "Unauthorized: 登录已过期"})
+            return False
+        return True
+
+    def _page(self, cursor: str, total: int, page_size: int):
+        start = int(cursor) if cursor and cursor.isdigit() else 0
+        end = min(total, start + page_size)
+        return range(start, end), str(end), end < total
+
+    # --- routes ---
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        if url.path == "/health":
+            return self._send(200, {"status": "ok"})
+        if not self._preamble():
+            return
+        if url.path.startswith("/xhslink/"):
+            return self._short_link(url.path.rsplit("/", 1)[-1])
+        if url.path == "/api/sns/web/v1/homefeed/category":
+            return self._homefeed_category()
+        if url.path == "/api/sns/web/v1/user_posted":
+            return self._user_posted(query)
+        if url.path == "/api/sns/web/v1/user/otherinfo":
+            return self._user_info(query)
+        if url.path == "/api/sns/web/v2/comment/page":
+            return self._comment_page(query)
+        if url.path == "/api/sns/web/v2/comment/sub/page":
+            return self._sub_comment_page(query)
+        if url.path == "/web_api/sns/v5/creator/note/user/posted":
+            return self._creator_posted(query)
+        if url.path.startswith("/api/sns/web/v1/you/"):
+            return self._inbox(url.path.rsplit("/", 1)[-1], query)
+        self._send(404, {"code": -1, "success": False, "msg": f"unknown endpoint {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if not self._preamble():
+            return
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            return self._send(400, {"code": -1, "success": False, "msg": "invalid json"})
+        if url.path == "/api/sns/web/v1/feed":
+            return self._feed(body)
+        if url.path == "/api/sns/web/v1/search/notes":
+            return self._search(body)
+        if url.path == "/api/sns/web/v1/homefeed":
+            return self._homefeed(body)
+        self._send(404, {"code": -1, "success": False, "msg": f"unknown endpoint {url.path}"})
+
+    def _short_link(self, code: str):
+        # like xhslink.com/o/<code>: 302 straight to the note page with its xsec params
+        note_id = _hex_id("short", code)
+        location = f"https://www.xiaohongshu.com/discovery/item/{note_id}?app_platform=ios&xsec_token=XT{code}%3D&xsec_source=app_share"
+        with self.server.lock:
+            self.server.in_flight -= 1
+        self._in_flight = False
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _feed(self, body: dict):
+        note_id = body.get("source_note_id") or _hex_id("note", 0)
+        self._ok({"cursor_score": "", "items": [{"id": note_id, "model_type": "note", "note_card": _note_card(note_id)}],
+                  "current_time": int(time.time() * 1000)})
+
+    def _search(self, body: dict):
+        page, page_size = int(body.get("page", 1)), int(body.get("page_size", 20))
+        start = (page - 1) * page_size
+        end = min(self.config.search_total, start + page_size)
+        items = []
+        for i in range(start, end):
+            note_id = _hex_id("search", body.get("keyword", ""), i)
+            card = _note_card(note_id)
+            items.append({"id": note_id, "model_type": "note", "xsec_token": f"XT{note_id[:8]}",
+                          "note_card": {"display_title": card["title"], "user": card["user"], "interact_info": card["interact_info"],
+                                        "type": card["type"]}})
+        self._ok({"items": items, "has_more": end < self.config.search_total})
+
+    def _homefeed_category(self):
+        categories = [{"id": "homefeed_recommend", "name": "推荐"}]
+        categories += [{"id": f"homefeed.channel_{i}_v3", "name": f"频道{i}"} for i in range(self.config.homefeed_channels)]
+        self._ok({"categories": categories})
+
+    def _homefeed(self, body: dict):
+        category, note_index = body.get("category", ""), int(body.get("note_index", 0))
+        page = note_index // 20
+        if page >= self.config.homefeed_pages:
+            return self._ok({"cursor_score": "", "items": []})
+        items = []
+        for j in range(int(body.get("num", 20))):
+            note_id = _hex_id("feed", int(_hex_id(category, page, j), 16) % self.config.homefeed_pool)
+            card = _note_card(note_id)
+            items.append({"id": note_id, "model_type": "note", "xsec_token": f"XT{note_id[:8]}", "track_id": _hex_id(note_id, page),
+                          "note_card": {"display_title": card["title"], "user": card["user"], "interact_info": card["interact_info"],
+                                        "type": card["type"]}})
+        self._ok({"cursor_score": f"1.7{page:012d}", "items": items})
+
+    def _user_info(self, query: dict):
+        user_id = query.get("target_user_id", "")
+        self._ok({"basic_info": {"nickname": f"user_{user_id[:6]}", "imageb": f"https://sns-avatar.example/{user_id}.jpg",
+                                 "red_id": str(int(user_id[:8] or "0", 16)), "gender": int(user_id[-1:] or "0", 16) % 2,
+                                 "ip_location": "上海", "desc": "模拟用户简介"},
+                  "interactions": [{"type": "follows", "count": _count(user_id + "f", 2000)},
+                                   {"type": "fans", "count": _count(user_id + "n", 200000)},
+                                   {"type": "interaction", "count": _count(user_id + "i", 900000)}],
+                  "tags": [{"tagType": "info", "name": "测试"}]})
+
+    def _user_posted(self, query: dict):
+        user_id = query.get("user_id", "")
+        indices, cursor, has_more = self._page(query.get("cursor", ""), self.config.user_note_total, self.config.page_size)
+        notes = []
+        for i in indices:
+            note_id = _hex_id("posted", user_id, self.config.user_note_total - i)
+            notes.append({"note_id": note_id, "xsec_token": f"XT{note_id[:8]}", "display_title": f"作品 {i}",
+                          "type": "normal", "user": _user(user_id), "interact_info": {"liked_count": _count(note_id, 9999), "sticky": False}})
+        self._ok({"notes": notes, "cursor": cursor, "has_more": has_more})
+
+    def _creator_posted(self, query: dict):
+        # page numbers, not cursors: data.page is the next page, -1 after the last one
+        page = int(query["page"]) if query.get("page", "").isdigit() else 0
+        start = page * self.config.page_size
+        end = min(self.config.creator_note_total, start + self.config.page_size)
+        notes = []
+        for i in range(start, end):
+            note_id = _hex_id("creator", i)
+            notes.append({"id": note_id, "display_title": f"创作者笔记 {i}", "type": "video" if i % 5 == 0 else "normal",
+                          "time": 1700000000000 - i * 3600000, "xsec_token": f"XT{note_id[:8]}",
+                          "images_list": [{"url": f"https://sns-img.example/{note_id}.jpg"}],
+                          "view_count": i * 10, "likes": i, "collected_count": i // 2, "comments_count": i // 3,
+                          "shared_count": i // 4, "level": 1})
+        self._ok({"notes": notes, "page": page + 1 if end < self.config.creator_note_total else -1, "tags": []})
+
+    def _inbox(self, stream: str, query: dict):
+        # like the real API the cursor points at the last message returned, so new messages never shift the pages
+        total, num = self.config.inbox_total, int(query.get("num") or 20)
+        cursor = query.get("cursor", "")
+        start = int(cursor) - 1 if cursor.isdigit() else total - 1
+        indices = range(start, max(-1, start - num), -1)
+        messages = []
+        for i in indices:
+            user_id = _hex_id("fan", stream, i % 7)
+            message = {"id": _hex_id("inbox", stream, i), "type": {"mentions": "comment/comment", "likes": "like/note",
+                       "connections": "follow"}.get(stream, stream), "title": f"消息 {i}", "time": 1700000000 + i * 60,
+                       "user_info": {"userid": user_id, "nickname": f"user_{user_id[:6]}"}}
+            if stream != "connections":
+                message["item_info"] = {"id": _hex_id("note", i % 5)}
+            if stream == "mentions":
+                message["comment_info"] = {"id": _hex_id("mention", i), "content": f"评论 {i}"}
+            messages.append(message)
+        last = start - len(messages) + 1
+        data = {"message_list": messages, "has_more": bool(messages) and last > 0}
+        if messages:
+            data["cursor"] = str(last)
+        self._ok(data)
+
+    def _comment_page(self, query: dict):
+        note_id = query.get("note_id", "")
+        indices, cursor, has_more = self._page(query.get("cursor", ""), self.config.comment_total, self.config.page_size)
+        comments = []
+        for i in indices:
+            comment = _comment(note_id, _hex_id("comment", note_id, i))
+            # first reply is inlined like the real API, the rest come from comment/sub/page
+            inline = 1 if self.config.sub_comment_total else 0
+            comment["sub_comments"] = [_comment(note_id, _hex_id("sub", comment["id"], 0), comment["id"])] if inline else []
+            comment["sub_comment_count"] = str(self.config.sub_comment_total)
+            comment["sub_comment_cursor"] = str(inline)
+            comment["sub_comment_has_more"] = self.config.sub_comment_total > inline
+            comments.append(comment)
+        self._ok({"comments": comments, "cursor": cursor, "has_more": has_more})
+
+    def _sub_comment_page(self, query: dict):
+        note_id, root_id = query.get("note_id", ""), query.get("root_comment_id", "")
+        page_size = int(query.get("num") or 10)
+        indices, cursor, has_more = self._page(query.get("cursor", ""), self.config.sub_comment_total, page_size)
+        comments = [_comment(note_id, _hex_id("sub", root_id, i), root_id) for i in indices]
+        self._ok({"comments": comments, "cursor": cursor, "has_more": has_more})
+
+
+class MockXHSServer:
+    """Threaded mock server; use as a context manager or call start()/stop()."""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self.httpd = ThreadingHTTPServer((host, port), MockXHSHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = self.config
+        self.httpd.lock = threading.Lock()
+        self.httpd.rng = random.Random(self.config.seed)
+        self.httpd.request_count = 0
+        self.httpd.in_flight = 0
+        self.httpd.max_in_flight = 0
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self) -> int:
+        return self.httpd.request_count
+
+    @property
+    def max_in_flight(self) -> int:
+        """Highest number of requests served concurrently since the last reset."""
+        return self.httpd.max_in_flight
+
+    def reset_count(self):
+        with self.httpd.lock:
+            self.httpd.request_count = 0
+            self.httpd.max_in_flight = 0
+
+    def start(self) -> "MockXHSServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-xhs", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def fake_cookie(web_session: str = "mock_session", a1: str = "18f0mockmockmockmockmockmockmockmockmock") -> str:
+    """Cookie string accepted by the mock server (and parseable by trans_cookies); a distinct a1 is a distinct account."""
+    return f"a1={a1}; webId=mockwebid; web_session={web_session}"
+
+
+def fake_note_rows(count: int, authors: int, fields) -> list:
+    """handle_note_info-shaped rows (`fields` order, unset fields None) spread round-robin over `authors` user ids."""
+    rows = []
+    for i in range(count):
+        row = dict.fromkeys(fields)
+        row.update(note_id=f"{i:024x}", user_id=f"{i % authors:024x}", liked_count=100 + i, collected_count=10,
+                   comment_count=5, share_count=1, tags=[], image_list=[])
+        rows.append(row)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the XHS web API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=461)
+    args = parser.parse_args()
+
+    config = MockConfig(latency=args.latency, page_size=args.page_size, error_rate=args.error_rate, error_status=args.error_status)
+    server = MockXHSServer(config, args.host, args.port)
+    print(f"Mock XHS API listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,22 @@
+"""crawled_notes keeps one row per (user_id, note_id), and an old sqlite file gains that index on startup."""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+
+
+def test_init_db_adds_unique_index(tmp_path):
+    from api.models import init_db
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE crawled_notes (id INTEGER PRIMARY KEY, user_id INTEGER, note_id VARCHAR, "
+                             "keyword VARCHAR, title VARCHAR, author_id VARCHAR, liked_count INTEGER, collected_count INTEGER, "
+                             "comment_count INTEGER, share_count INTEGER, fans INTEGER, crawled_at DATETIME)")
+        conn.exec_driver_sql("INSERT INTO crawled_notes (id, user_id, note_id, liked_count) VALUES (1, 1, 'n', 1), (2, 1, 'n', 2), (3, 2, 'n', 3)")
+
+    assert init_db(engine)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT id, liked_count FROM crawled_notes ORDER BY id").fetchall() == [(2, 2), (3, 3)]
+        with pytest.raises(IntegrityError):
+            conn.exec_driver_sql("INSERT INTO crawled_notes (user_id, note_id) VALUES (1, 'n')")
+    assert not init_db(engine)
@@ -0,0 +1,20 @@
+"""The streamed analysis stops talking to Gemini once the SSE client has gone away."""
+import threading
+
+import pytest
+
+
+def test_stream_gemini_cancelled(api_client):
+    from api.index import AnalysisCancelled, stream_gemini
+
+    # the client went away after the first token: no more chunks, and no fallback model either
+    cancelled = threading.Event()
+    tokens = []
+
+    def emit(event, data):
+        tokens.append(data["text"])
+        cancelled.set()
+
+    with pytest.raises(AnalysisCancelled):
+        stream_gemini("bench-key", "prompt", emit, cancelled)
+    assert tokens == ["{"]
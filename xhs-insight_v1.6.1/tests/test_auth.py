@@ -0,0 +1,20 @@
+"""Concurrent sign-ups with one email: exactly one succeeds, the rest get a 400 instead of a 500."""
+import asyncio
+
+import httpx
+
+
+def test_concurrent_duplicate_register(api_client):
+    from api.index import app
+
+    payload = {"email": "twin@example.com", "password": "twin-pw", "gemini_api_key": "k"}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # all of them pass the email check before any insert lands (the hash sits in between)
+            return await asyncio.gather(*[client.post("/api/register", json=payload) for _ in range(4)])
+
+    responses = asyncio.run(scenario())
+    assert sorted(r.status_code for r in responses) == [200, 400, 400, 400]
+    assert all(r.json()["detail"] == "Email already registered" for r in responses if r.status_code == 400)
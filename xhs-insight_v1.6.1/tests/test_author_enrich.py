@@ -0,0 +1,43 @@
+"""Author cache TTL and the notes_with_author view joining crawled notes to their cached authors."""
+import sqlite3
+
+from mock_xhs_server import fake_note_rows
+
+AUTHORS = 40
+NOTES = 120
+
+
+def _enricher(server, offline_apis, cookie, db_path, ttl=3600):
+    from pipelines.author_enrich import Author_Cache, Author_Enricher
+
+    return Author_Enricher(cookie, offline_apis(server), Author_Cache(str(db_path), ttl), concurrency=8, batch_size=16)
+
+
+def test_ttl_refetches_stale(mock_server_factory, offline_apis, cookie, tmp_path):
+    server = mock_server_factory()
+    enricher = _enricher(server, offline_apis, cookie, tmp_path / "users.db", ttl=0)
+    ids = [f"{i:024x}" for i in range(5)]
+    enricher.refresh(ids)
+    server.reset_count()
+    assert enricher.refresh(ids)[2]["fetched"] == 5
+    assert server.request_count == 5
+    assert sorted(enricher.cache.get_many(ids)) == ids and enricher.cache.get_many(ids, fresh_only=True) == {}
+
+
+def test_enrich_db_view(mock_server_factory, offline_apis, cookie, tmp_path):
+    from xhs_utils.export_util import SQLite_Writer
+    from xhs_utils.record_util import Note
+
+    db_path = tmp_path / "crawl.db"
+    notes = fake_note_rows(NOTES, AUTHORS, Note.FIELDS)
+    with SQLite_Writer(str(db_path), Note.FIELDS, table="notes", primary_key="note_id") as writer:
+        writer.write(notes)
+    enricher = _enricher(mock_server_factory(), offline_apis, cookie, db_path)
+    success, msg, stats = enricher.enrich_db()
+    assert success, msg
+    assert stats["fetched"] == AUTHORS
+    expected = {note["note_id"]: note["engagement_per_fan"] for note in enricher.enrich(notes)}
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT note_id, author_fans, engagement_per_fan FROM notes_with_author").fetchall()
+    assert len(rows) == NOTES and all(fans is not None for _, fans, _ in rows)
+    assert {note_id: value for note_id, _, value in rows} == expected
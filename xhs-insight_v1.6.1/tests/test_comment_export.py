@@ -0,0 +1,25 @@
+"""Streaming comment export: crawl -> flattened rows (parent_id / root_id / depth) -> batched writers."""
+import json
+import sqlite3
+
+NOTE_URL = "https://www.xiaohongshu.com/explore/66f0000000000000000000cc?xsec_token=XT&xsec_source=pc_search"
+
+
+def test_comment_export_mock(xhs_apis, cookie, mock_server, tmp_path):
+    from pipelines.comment_export import Comment_Exporter
+
+    config = mock_server.config
+    paths = [str(tmp_path / "comments.jsonl"), str(tmp_path / "comments.db")]
+    success, msg, result = Comment_Exporter(cookie, xhs_apis, batch_size=50).export(NOTE_URL, paths)
+    assert success, msg
+    total = config.comment_total * (1 + config.sub_comment_total)
+    assert result == {"rows": total, "comments": config.comment_total, "skipped": 0}
+
+    rows = [json.loads(line) for line in open(paths[0], encoding="utf-8")]
+    assert len({row["comment_id"] for row in rows}) == total
+    roots = [row for row in rows if row["depth"] == 0]
+    assert all(row["parent_id"] is None and row["root_id"] == row["comment_id"] for row in roots)
+    replies = [row for row in rows if row["depth"]]
+    assert all(row["depth"] == 1 and row["parent_id"] == row["root_id"] for row in replies)
+    with sqlite3.connect(paths[1]) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM comments").fetchone()[0] == total
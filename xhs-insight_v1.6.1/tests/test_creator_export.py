@@ -0,0 +1,31 @@
+"""Creator-center export resumes from its checkpoint after an interrupted run, without writing a page twice."""
+import json
+
+TOTAL = 240  # 12 pages of 20
+
+
+def test_creator_export_resume(mock_server_factory, offline_apis, cookie, tmp_path, monkeypatch):
+    from apis.xhs_creator_apis import XHS_Creator_Apis
+    from pipelines.creator_export import Creator_Exporter
+    from xhs_utils.state_util import StateStore
+
+    server = mock_server_factory(creator_note_total=TOTAL)
+    exporter = Creator_Exporter(cookie, offline_apis(server, creator=True), StateStore(str(tmp_path / "state.db")), concurrency=4)
+    paths = [str(tmp_path / "creator.jsonl"), str(tmp_path / "creator.db")]
+    original = XHS_Creator_Apis.get_publish_note_info
+
+    def flaky(self, page, cookies_str, proxies=None):
+        if page == 6:
+            return False, "network down", None
+        return original(self, page, cookies_str, proxies)
+
+    monkeypatch.setattr(XHS_Creator_Apis, "get_publish_note_info", flaky)
+    success, _, partial = exporter.export(paths)
+    assert not success and partial["rows"] == 6 * 20
+
+    monkeypatch.setattr(XHS_Creator_Apis, "get_publish_note_info", original)
+    success, msg, result = exporter.export(paths)
+    assert success, msg
+    assert result["rows"] == TOTAL and result["pages"] == 6
+    ids = [json.loads(line)["note_id"] for line in open(paths[0], encoding="utf-8")]
+    assert len(ids) == len(set(ids)) == TOTAL
@@ -0,0 +1,118 @@
+"""
+Seen-set dedup: the mmap-persisted filter surviving a reopen, the scalable filter keeping its false-positive bound
+as it grows, and the crawl stages skipping known work.
+"""
+import secrets
+import sqlite3
+
+import pytest
+
+NOTE_URL = "https://www.xiaohongshu.com/explore/66f0000000000000000000cc?xsec_token=XT&xsec_source=pc_search"
+
+
+def _ids(n):
+    return [secrets.token_hex(12) for _ in range(n)]
+
+
+def test_bloom_false_positive_rate():
+    from xhs_utils.dedup_util import Bloom_Filter
+
+    ids = _ids(200_000)
+    bloom = Bloom_Filter(100_000, 0.01)
+    bloom.add_many(ids[:100_000])
+    false_positives = sum(bloom.contains_many(ids[100_000:]))
+    assert false_positives / 100_000 < 0.015
+
+
+def test_persisted_filter_reopens(tmp_path):
+    from xhs_utils.dedup_util import Dedup_Service
+
+    ids = _ids(20_000)
+    service = Dedup_Service(str(tmp_path), initial_capacity=5_000, error_rate=0.001)
+    new = service.filter_new("note", ids + ids[:10])
+    # a few fresh ids may be false positives, but nothing is returned twice
+    assert len(new) == len(set(new)) and set(new) <= set(ids) and len(new) > len(ids) * 0.998
+    layers = len(service.scope("note").filters)
+    assert layers > 1  # grew past the first layer
+    service.close()
+
+    service = Dedup_Service(str(tmp_path), initial_capacity=5_000, error_rate=0.001)
+    assert len(service.scope("note").filters) == layers
+    assert service.check("note", ids) == [True] * len(ids)
+    fresh = _ids(20_000)
+    false_positives = len(fresh) - len(service.filter_new("note", fresh, mark=False))
+    # the geometric series of layer error rates keeps the total under error_rate
+    assert false_positives / len(fresh) < 0.002
+    assert service.check("comment", ids[:10]) == [False] * 10  # scopes are independent
+    service.close()
+
+
+def test_comment_export_skips_known(xhs_apis, cookie, mock_server, tmp_path, monkeypatch):
+    from pipelines.comment_export import Comment_Exporter
+    from xhs_utils.dedup_util import Dedup_Service
+    from xhs_utils.export_util import XLSX_Writer, open_writer
+
+    config = mock_server.config
+    total = config.comment_total * (1 + config.sub_comment_total)
+    paths = [str(tmp_path / "comments.jsonl"), str(tmp_path / "comments.xlsx"), str(tmp_path / "comments.db")]
+
+    # the xlsx only becomes durable on close: if that fails, nothing may be marked as seen
+    def broken_close(self):
+        raise OSError("disk full")
+
+    dedup = Dedup_Service(str(tmp_path / "dedup"))
+    exporter = Comment_Exporter(cookie, xhs_apis, batch_size=100, dedup=dedup)
+    with monkeypatch.context() as patch:
+        patch.setattr(XLSX_Writer, "close", broken_close)
+        with pytest.raises(OSError):
+            exporter.export(NOTE_URL, paths[1:2])
+    assert dedup.stats()["comment"]["count"] == 0
+
+    success, msg, result = exporter.export(NOTE_URL, paths)
+    assert success, msg
+    assert result == {"rows": total, "comments": config.comment_total, "skipped": 0}
+
+    # a second run (after a restart) writes nothing and leaves the previous export intact
+    dedup.close()
+    exporter.dedup = Dedup_Service(str(tmp_path / "dedup"))
+    success, msg, result = exporter.export(NOTE_URL, paths)
+    assert success, msg
+    assert result["rows"] == 0 and result["skipped"] == total
+    assert open_writer(paths[0], []).existing_rows() == total
+    assert open_writer(paths[1], []).existing_rows() == total
+    with sqlite3.connect(paths[2]) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM comments").fetchone()[0] == total
+
+
+def test_spider_some_note_skips_known(mock_server, cookie, tmp_path, monkeypatch):
+    import main
+    from xhs_utils.dedup_util import Dedup_Service
+    from xhs_utils.export_util import open_writer
+
+    spider = main.Data_Spider(dedup=Dedup_Service())
+    urls = [f"https://www.xiaohongshu.com/explore/66f00000000000000000{i:04x}?xsec_token=XT&xsec_source=pc_search" for i in range(4)]
+    crawled = []
+    original = spider.spider_note
+
+    def spider_note(note_url, cookies_str, proxies=None):
+        crawled.append(note_url)
+        return original(note_url, cookies_str, proxies)
+
+    monkeypatch.setattr(spider, "spider_note", spider_note)
+    base_path = {"media": str(tmp_path / "media"), "excel": str(tmp_path)}
+    spider.spider_some_note(urls[:3], cookie, base_path, "excel", "notes")
+    spider.spider_some_note(urls[:3] + urls[:1], cookie, base_path, "excel", "notes")
+    assert crawled == urls[:3]
+
+    # a failed download leaves the note unmarked, so the next run crawls it again
+    def broken_download(note_info, path, save_choice):
+        raise OSError("network down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(main, "download_note", broken_download)
+        with pytest.raises(OSError):
+            spider.spider_some_note(urls[3:], cookie, base_path, "media")
+    spider.spider_some_note(urls, cookie, base_path, "excel", "notes")
+    assert crawled == urls + urls[3:]
+    # each run appended only its new notes; the earlier rows were kept
+    assert open_writer(str(tmp_path / "notes.xlsx"), []).existing_rows() == 4
@@ -0,0 +1,36 @@
+"""Homefeed harvesting: cross-round dedup through the Bloom filter and detail crawls for unseen notes only."""
+CHANNELS, PAGES = 6, 4
+
+
+def _harvester(server, offline_apis, cookie, **kwargs):
+    from pipelines.feed_harvester import Feed_Harvester
+
+    return Feed_Harvester(cookie, offline_apis(server), max_pages=PAGES, **kwargs)
+
+
+def _server(mock_server_factory):
+    return mock_server_factory(homefeed_channels=CHANNELS, homefeed_pages=PAGES, homefeed_pool=300)
+
+
+def test_bloom_dedup_across_rounds(mock_server_factory, offline_apis, cookie):
+    harvester = _harvester(_server(mock_server_factory), offline_apis, cookie, seen_capacity=100_000)
+    first = [e for e in harvester.run(interval=0, rounds=1) if e["type"] == "new_note"]
+    second = [e for e in harvester.run(interval=0, rounds=1) if e["type"] == "new_note"]
+    assert first and not second
+    assert len(harvester.seen.bits) < 200 * 1024
+
+
+def test_detail_only_for_unseen(mock_server_factory, offline_apis, cookie, tmp_path):
+    from xhs_utils.dedup_util import Seen_Set
+
+    server = _server(mock_server_factory)
+    seen = Seen_Set()
+    harvester = _harvester(server, offline_apis, cookie, seen=seen, fetch_detail=True, concurrency=CHANNELS + 1)
+    channels = harvester.get_channels()
+    warm = _harvester(server, offline_apis, cookie, seen=seen)
+    warm.export([str(tmp_path / "warm.jsonl")], channels=channels[:3])
+    known = len(seen)
+
+    success, msg, stats = harvester.export([str(tmp_path / "feed.jsonl")], [str(tmp_path / "notes.db")], channels=channels)
+    assert success, msg
+    assert stats["details"] == stats["new"] == len(seen) - known
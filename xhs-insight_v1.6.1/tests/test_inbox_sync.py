@@ -0,0 +1,41 @@
+"""Inbox sync: the three streams page concurrently, and cursors only advance once the new messages were handled."""
+import json
+import sqlite3
+
+STREAMS = ("mentions", "likes", "connections")
+
+
+def _inbox(server, offline_apis, cookie, tmp_path, **kwargs):
+    from pipelines.inbox_sync import Inbox_Sync
+    from xhs_utils.state_util import StateStore
+
+    return Inbox_Sync(cookie, StateStore(str(tmp_path / "state.db")), offline_apis(server), **kwargs)
+
+
+def test_streams_run_concurrently(mock_server_factory, offline_apis, cookie, tmp_path):
+    inbox_server = mock_server_factory(latency=0.05, inbox_total=45)
+    inbox = _inbox(inbox_server, offline_apis, cookie, tmp_path)
+    path = tmp_path / "inbox.jsonl"
+    inbox.export([str(path)])
+    # 3 pages per stream: sequentially 9 round trips, concurrently about 3
+    assert inbox_server.max_in_flight >= 2
+    rows = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert {row["stream"] for row in rows} == set(STREAMS) and len({row["message_id"] for row in rows}) == 135
+    mention = next(row for row in rows if row["stream"] == "mentions")
+    assert mention["content"] and mention["note_id"] and mention["user_id"] and mention["account"] == inbox.account
+
+
+def test_cursor_advances_after_handling(mock_server_factory, offline_apis, cookie, tmp_path):
+    inbox_server = mock_server_factory(latency=0.05, inbox_total=45)
+    inbox = _inbox(inbox_server, offline_apis, cookie, tmp_path, streams=["likes"])
+    events = inbox.sync()
+    assert next(events)["type"] == "new_message"
+    events.close()  # the consumer stopped before handling the whole stream
+    assert inbox.get_state("likes")["newest_id"] is None
+
+    path = str(tmp_path / "inbox.db")
+    assert inbox.export([path])[2]["likes"] == 45
+    inbox_server.config.inbox_total = 47
+    assert inbox.export([path])[2]["likes"] == 2
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM inbox_messages").fetchone()[0] == 47
@@ -0,0 +1,39 @@
+"""Job_Queue: claim order by priority and type, dedupe keys, lease expiry and retries."""
+import time
+
+
+def _queue(tmp_path, **kwargs):
+    from xhs_utils.queue_util import Job_Queue
+
+    return Job_Queue(str(tmp_path / "jobs.db"), **kwargs)
+
+
+def test_claim_order_and_dedupe(tmp_path):
+    queue = _queue(tmp_path)
+    queue.put("media", {"n": 1})
+    queue.put("note", {"n": 2}, dedupe_key="note:a")
+    assert queue.put("note", {"n": 3}, dedupe_key="note:a") is None
+    queue.put("search", {"n": 4})
+    queue.put("note", {"n": 5}, priority=99)
+
+    claimed = [queue.claim("w") for _ in range(5)]
+    assert [job.payload["n"] for job in claimed[:4]] == [5, 4, 2, 1]
+    assert claimed[4] is None
+    assert queue.claim("w", types=["note"]) is None
+
+
+def test_lease_expiry_and_retries(tmp_path):
+    queue = _queue(tmp_path, retry_base=0)
+    job_id = queue.put("note", {"url": "x"}, max_attempts=2)
+
+    crashed = queue.claim("crashed", lease=0.05)
+    time.sleep(0.1)
+    retried = queue.claim("alive")
+    assert retried.id == crashed.id == job_id and retried.attempts == 2
+    # the crashed worker's late results are rejected
+    assert not queue.heartbeat(job_id, "crashed") and not queue.complete(job_id, "crashed")
+
+    assert queue.fail(job_id, "alive", "boom")
+    assert queue.claim("alive") is None  # attempts exhausted
+    assert queue.stats() == {"note": {"failed": 1}}
+    assert queue.retry_failed() == 1 and queue.claim("alive").id == job_id
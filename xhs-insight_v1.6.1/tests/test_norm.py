@@ -0,0 +1,13 @@
+"""norm_count: display strings from the API become integers, anything unparseable becomes 0 instead of raising."""
+import pytest
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("123", 123), ("1.2万", 12000), ("10万+", 100000), ("3,456", 3456), (7, 7), (None, 0), (float("nan"), 0),
+    ("²", 0), ("1²", 0), ("１２", 12), ("", 0), ("赞", 0),
+])
+def test_norm_count(value, expected):
+    from xhs_utils.norm_util import norm_count, norm_counts
+
+    assert norm_count(value) == expected
+    assert norm_counts([value, value]) == [expected, expected]
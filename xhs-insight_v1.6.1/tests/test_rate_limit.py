@@ -0,0 +1,64 @@
+"""
+Rate_Limiter: a cookie waiting on its own bucket does not drain the shared global bucket, the async acquire
+waits without blocking the loop, and requests are signed only once the limiter lets them through.
+"""
+import asyncio
+import time
+
+
+def test_waiting_cookie_keeps_global_tokens():
+    from xhs_utils.rate_limit_util import Rate_Limiter
+
+    limiter = Rate_Limiter(global_rate=2.0, cookie_rate=0.5)
+    assert limiter.reserve("slow") == 0
+    # the slow cookie's bucket is empty: it is told to wait, and nothing is taken meanwhile
+    assert all(delay > 1 for delay in (limiter.reserve("slow") for _ in range(5)))
+    assert limiter.reserve("fast") == 0
+    assert limiter.reserve("fast") > 0  # global burst of 2 used up by one slow and one fast request
+
+
+def test_acquire_async_does_not_block_loop():
+    from xhs_utils.rate_limit_util import Rate_Limiter
+
+    limiter = Rate_Limiter(global_rate=100.0, cookie_rate=5.0)
+    ticks = []
+
+    async def ticker():
+        while len(ticks) < 5:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        for _ in range(5):  # the cookie's burst
+            await limiter.acquire_async("a1")
+        tick = asyncio.create_task(ticker())
+        waited = await limiter.acquire_async("a1")
+        await tick
+        return waited
+
+    waited = asyncio.run(run())
+    assert 0.1 < waited < 0.5
+    assert len(ticks) == 5  # the loop kept running while the cookie waited for its token
+
+
+def test_signed_after_backoff(mock_server_factory, offline_apis, cookie, monkeypatch):
+    from apis import xhs_pc_apis
+    from xhs_utils.rate_limit_util import Rate_Limiter, cookie_key
+    from xhs_utils.xhs_util import get_signing_context
+
+    limiter = Rate_Limiter(global_rate=100.0, cookie_rate=100.0)
+    ck = cookie_key(get_signing_context(cookie).cookies)
+    limiter.backoff_until[("cookie", ck)] = time.monotonic() + 0.3  # a previous 429 put this cookie on hold
+    signed_at = []
+    original = xhs_pc_apis.generate_request_params
+
+    def recording(*args, **kwargs):
+        signed_at.append(time.monotonic())
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(xhs_pc_apis, "generate_request_params", recording)
+    apis = offline_apis(mock_server_factory(), rate_limiter=limiter)
+    started = time.monotonic()
+    success, msg, _ = apis.get_homefeed_all_channel(cookie)
+    assert success, msg
+    assert len(signed_at) == 1 and signed_at[0] - started >= 0.25
@@ -0,0 +1,68 @@
+"""Single_Flight: the short-TTL cache behind XHS_Apis, and a failed leader's result is never handed to followers."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+NOTE_ID = "66f0000000000000000000ee"
+
+
+def test_ttl_cache(mock_server_factory, offline_apis, cookie):
+    from xhs_utils.flight_util import Single_Flight
+
+    flight = Single_Flight(ttl=30)
+    server = mock_server_factory()
+    apis = offline_apis(server, single_flight=flight)
+    for _ in range(3):
+        success, msg, _ = apis.get_note_out_comment(NOTE_ID, "", "XT", cookie)
+        assert success, msg
+    assert server.request_count == 1
+    assert flight.stats()["cached"] == 2
+
+
+def test_failed_leader_is_not_shared():
+    from xhs_utils.flight_util import Single_Flight
+
+    flight = Single_Flight(ttl=30, endpoints=["/x"])
+    key = flight.key("GET", "/x?a=1&search_id=r1")
+    assert key == flight.key("GET", "/x?search_id=r2&a=1")
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def fn():
+        calls.append(1)
+        if len(calls) == 1:
+            started.set()
+            release.wait()
+            return {"success": False}
+        return {"success": True}
+
+    ok = lambda value: value["success"]
+    with ThreadPoolExecutor(3) as pool:
+        leader = pool.submit(flight.do, key, fn, ok)
+        started.wait()
+        followers = [pool.submit(flight.do, key, fn, ok) for _ in range(2)]
+        time.sleep(0.2)  # let the followers join the in-flight call
+        release.set()
+        assert leader.result() == ({"success": False}, False)
+        assert [f.result() for f in followers] == [({"success": True}, False)] * 2
+    assert len(calls) == 3 and flight.stats()["fallback"] == 2
+    # neither the failure nor the followers' own retries were cached; the next successful leader is
+    assert flight.do(key, fn, ok) == ({"success": True}, False)
+    assert flight.do(key, fn, ok) == ({"success": True}, True)
+
+
+def test_key_separates_accounts_and_tokens():
+    from xhs_utils.flight_util import Single_Flight
+
+    def feed(flight, token, cookie, source="pc_search"):
+        data = {"source_note_id": NOTE_ID, "xsec_token": token, "xsec_source": source}
+        return flight.key("POST", "/api/sns/web/v1/feed", data, cookie)
+
+    flight = Single_Flight()
+    assert feed(flight, "XT", "a1=one") == feed(flight, "XT", "a1=one", source="app_share")
+    # another account's response, or another share link's token, is never handed out by default
+    assert feed(flight, "XT", "a1=one") != feed(flight, "XT", "a1=two")
+    assert feed(flight, "XT", "a1=one") != feed(flight, "EXPIRED", "a1=one")
+
+    shared = Single_Flight(share_cookies=True)
+    assert feed(shared, "XT", "a1=one") == feed(shared, "XT", "a1=two")
+    assert feed(shared, "XT", "a1=one") != feed(shared, "EXPIRED", "a1=two")
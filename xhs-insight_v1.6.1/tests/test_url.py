@@ -0,0 +1,13 @@
+"""parse_note_url: every page layout that carries a note id, and nothing else."""
+from xhs_utils.url_util import parse_note_url
+
+
+def test_parse_note_url_paths():
+    note_id = "66f0000000000000000000aa"
+    for path in (f"explore/{note_id}", f"discovery/item/{note_id}", f"user/profile/5f00000000000000000000bb/{note_id}",
+                 f"search_result/{note_id}"):
+        note = parse_note_url(f"https://www.xiaohongshu.com/{path}?xsec_token=XT%3D&xsec_source=pc_search")
+        assert note == parse_note_url(note.url) and (note.note_id, note.xsec_token) == (note_id, "XT=")
+    # other pages are only notes when the last segment looks like a note id
+    assert parse_note_url("https://www.xiaohongshu.com/search_result?keyword=x") is None
+    assert parse_note_url("https://www.xiaohongshu.com/user/profile/5f00000000000000000000bb") is None
@@ -0,0 +1,40 @@
+"""Incremental user sync writes into the full export: refreshed notes are updated in place, new ones appended."""
+USER_ID = "5f00000000000000000000aa"
+USER_URL = f"https://www.xiaohongshu.com/user/profile/{USER_ID}?xsec_token=UT&xsec_source=pc_note"
+
+
+def test_new_notes_keep_full_export(mock_server_factory, offline_apis, cookie, tmp_path, monkeypatch):
+    import openpyxl
+
+    import main
+    from pipelines import user_sync
+    from xhs_utils.state_util import StateStore
+
+    server = mock_server_factory(user_note_total=30)
+    store = StateStore(str(tmp_path / "state.db"))
+    monkeypatch.setattr(user_sync, "StateStore", lambda: store)
+    spider = main.Data_Spider()
+    spider.xhs_apis = offline_apis(server)
+    base_path = {"media": str(tmp_path / "media"), "excel": str(tmp_path)}
+    path = tmp_path / f"{USER_ID}.xlsx"
+
+    spider.spider_user_all_note(USER_URL, cookie, base_path, "excel")
+    assert spider.spider_user_new_note(USER_URL, cookie, base_path, "excel")[1]  # first sync only records the notes
+
+    def rows():
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            return [list(values) for values in workbook.active.iter_rows(min_row=2, values_only=True)]
+        finally:
+            workbook.close()
+
+    before = rows()
+    assert len(before) == 30
+    server.config.user_note_total = 32
+    note_list, success, msg = spider.spider_user_new_note(USER_URL, cookie, base_path, "excel", recent_window=5)
+    assert success, msg
+    assert len(note_list) == 7
+    after = rows()
+    # the 30 rows stay in place (5 of them refreshed), the 2 new notes come after them
+    assert len(after) == 32 and [row[0] for row in after[:30]] == [row[0] for row in before]
+    assert {row[0] for row in after[30:]} == {note["note_id"] for note in note_list[:2]}
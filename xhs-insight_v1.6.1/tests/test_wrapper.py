@@ -0,0 +1,35 @@
+"""XHS_Wrapper: event-loop tasks crawling at once share one XHS_Apis and overlap their requests."""
+import asyncio
+import os
+
+from mock_xhs_server import fake_cookie
+
+WORKERS = 16
+
+
+def note_url(i: int) -> str:
+    return f"https://www.xiaohongshu.com/explore/66f00000000000000000{i:04x}?xsec_token=XT&xsec_source=pc_search"
+
+
+def note_cookie(i: int) -> str:
+    # distinct a1 per caller so the per-cookie rate limit does not serialize the run
+    return fake_cookie(web_session=f"s{i}", a1=f"stress{i:04d}mockmockmockmockmockmockmock")
+
+
+def check_note(result: dict, i: int):
+    assert result.get("status") != "error", result
+    assert result["note_id"] == f"66f00000000000000000{i:04x}"
+    assert "Mock" not in result["title"]
+
+
+def test_event_loop_tasks(xhs_wrapper, tmp_path):
+    async def crawl():
+        return await asyncio.gather(*(xhs_wrapper.get_note_detail_async(note_url(i), note_cookie(i)) for i in range(WORKERS)))
+
+    results = asyncio.run(crawl())
+
+    for i, result in enumerate(results):
+        check_note(result, i)
+    assert os.getcwd() == str(tmp_path)
+    assert len(xhs_wrapper.built) == 1
+    assert xhs_wrapper.server.max_in_flight > 1
@@ -7,7 +7,9 @@ import sys
 import os
 from loguru import logger
 from dotenv import load_dotenv
-from contextlib import contextmanager
+import asyncio
+import functools
+import threading
 
 # ================= 动态路径加载 =================
 base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -50,6 +52,7 @@ class XHS_Wrapper:
             self.cookie = None
         
         self.api_instance = None
+        self._init_lock = threading.Lock()
         # Check ExecJS early
         self._check_js_runtime()
         logger.info(f"✅ 爬虫 Wrapper 初始化完成 (Runtime Available: {self.js_runtime_available})")
@@ -62,47 +65,30 @@ class XHS_Wrapper:
             # execjs.get() throws RuntimeUnavailableError if no runtime is found.
             # On some systems, it might default to JScript (Windows) which often fails for complex JS.
             runtime = execjs.get() 
-            if not runtime:
+            if not runtime or not runtime.is_available():
                 raise Exception("No JS Runtime found")
-            
-            # Try a simple compilation
-            ctx = execjs.compile("function test() { return 1+1; }")
-            if ctx.call("test") != 2:
-                raise Exception("JS Execution Verification Failed")
-                
+            # No test compile here: it spawned a node process (~120ms) on every cold start.
+            # A broken runtime still surfaces on the first signing call and falls back to mock.
+
         except Exception as e:
             self.js_runtime_available = False
             # Downgraded to warning as this is expected in some environments (like Vercel)
             logger.warning(f"⚠️ JS Runtime Check Failed: {e}. Crawler will switch to Mock Mode if used.")
 
-    @contextmanager
-    def _spider_context(self):
-        """
-        【核心修复】上下文管理器：
-        在执行代码块前，自动跳进爬虫目录；
-        执行完后，自动跳回原目录。
-        """
-        if not self.spider_path:
-            yield
-            return
-
-        original_cwd = os.getcwd()
-        try:
-            os.chdir(self.spider_path)
-            yield
-        finally:
-            os.chdir(original_cwd)
-
     def _get_api(self):
-        """ Lazy Loader for API Instance """
+        """ Lazy Loader for API Instance (thread-safe, double-checked) """
         if not self.js_runtime_available:
             # Raise specific error that our service layer looks for
             raise RuntimeError("RuntimeUnavailableError: Missing Node.js")
 
         if self.api_instance:
             return self.api_instance
-            
-        with self._spider_context():
+
+        # The spider resolves static/*.js relative to its own modules, so no chdir is needed;
+        # the lock only keeps concurrent first calls from building several instances.
+        with self._init_lock:
+            if self.api_instance:
+                return self.api_instance
             try:
                 from apis.xhs_pc_apis import XHS_Apis
                 self.api_instance = XHS_Apis()
@@ -122,27 +108,27 @@ class XHS_Wrapper:
         if not self.spider_path: return self._fail("爬虫目录未找到")
         
         try:
-            with self._spider_context():
-                api = self._get_api()
-                success, msg, notes_raw = api.search_some_note(
-                    keyword, limit, self.cookie, sort_type, 
-                    0, 0, 0, 0, None, None
-                )
-                
-                if not success:
-                    return self._fail(msg)
-
-                clean_notes = []
-                for note in notes_raw:
-                    if note.get('model_type') == 'note':
-                        clean_notes.append({
-                            "id": note.get('id'),
-                            "title": note.get('title', '无标题'),
-                            "link": f"https://www.xiaohongshu.com/explore/{note.get('id')}?xsec_token={note.get('xsec_token','')}",
-                            "likes": note.get('liked_count', 0),
-                            "user": note.get('user', {}).get('nickname', '')
-                        })
-                return self._success(clean_notes, "search_result")
+            api = self._get_api()
+            from xhs_utils.data_util import norm_count
+            success, msg, notes_raw = api.search_some_note(
+                keyword, limit, self.cookie, sort_type, 
+                0, 0, 0, 0, None, None
+            )
+            
+            if not success:
+                return self._fail(msg)
+
+            clean_notes = []
+            for note in notes_raw:
+                if note.get('model_type') == 'note':
+                    clean_notes.append({
+                        "id": note.get('id'),
+                        "title": note.get('title', '无标题'),
+                        "link": f"https://www.xiaohongshu.com/explore/{note.get('id')}?xsec_token={note.get('xsec_token','')}",
+                        "likes": norm_count(note.get('note_card', {}).get('interact_info', {}).get('liked_count', note.get('liked_count'))),
+                        "user": note.get('user', {}).get('nickname', '')
+                    })
+            return self._success(clean_notes, "search_result")
         except Exception as e:
             # Let service layer handle "RuntimeUnavailableError"
             raise e
@@ -154,39 +140,52 @@ class XHS_Wrapper:
         use_cookie = cookie if cookie else self.cookie
 
         try:
-            with self._spider_context():
-                api = self._get_api()
-                success, msg, res = api.get_note_info(note_url, use_cookie)
-                if not success:
-                    return self._fail(msg)
-
-                data = res.get('data', {})
-                items = data.get('items', [data])
-                if not items: return self._fail("无数据")
-                
-                note = items[0].get('note_card', items[0])
-                
-                images = []
-                for img in note.get('image_list', []):
-                    if img.get('info_list'):
-                        url = img['info_list'][0].get('url', '')
-                        if url.startswith('//'): url = 'https:' + url
-                        images.append(url)
-
-                result = {
-                    "title": note.get('title'),
-                    "desc": note.get('desc'),
-                    "images_list": images,
-                    "likes": note.get('interact_info', {}).get('liked_count', 0),
-                    "collected": note.get('interact_info', {}).get('collected_count', 0),
-                    "comments": note.get('interact_info', {}).get('comment_count', 0),
-                    "user": note.get('user', {})
-                }
-                return result 
+            api = self._get_api()
+            from xhs_utils.data_util import norm_count
+            success, msg, res = api.get_note_info(note_url, use_cookie)
+            if not success:
+                return self._fail(msg)
+
+            data = res.get('data', {})
+            items = data.get('items', [data])
+            if not items: return self._fail("无数据")
+            
+            note = items[0].get('note_card', items[0])
+            
+            images = []
+            for img in note.get('image_list', []):
+                if img.get('info_list'):
+                    url = img['info_list'][0].get('url', '')
+                    if url.startswith('//'): url = 'https:' + url
+                    images.append(url)
+
+            interact_info = note.get('interact_info', {})
+            result = {
+                "note_id": note.get('note_id') or items[0].get('id'),
+                "title": note.get('title'),
+                "desc": note.get('desc'),
+                "images_list": images,
+                "likes": norm_count(interact_info.get('liked_count')),
+                "collected": norm_count(interact_info.get('collected_count')),
+                "comments": norm_count(interact_info.get('comment_count')),
+                "shares": norm_count(interact_info.get('share_count')),
+                "user": note.get('user', {})
+            }
+            return result 
         except Exception as e:
             # Ensure exception propagates so service layer can catch it and switch to mock
             raise e
 
+    async def search_notes_async(self, *args, **kwargs) -> dict:
+        """ search_notes for event-loop callers: runs in the default executor so tasks crawl in parallel """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.search_notes, *args, **kwargs))
+
+    async def get_note_detail_async(self, note_url: str, cookie: str = None) -> dict:
+        """ get_note_detail for event-loop callers """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.get_note_detail, note_url, cookie))
+
     def _success(self, data, type_name):
         return {"status": "success", "type": type_name, "data": data}
 